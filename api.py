@@ -0,0 +1,426 @@
+import argparse
+import io
+import json
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import cache
+import database
+import dates
+import instrumentation
+import migrations
+import records
+import scheduling
+import search
+import services
+
+# API HTTP local com JSON para pacientes, médicos e consultas.
+#
+# Permite que vários postos da recepção usem o mesmo banco por meio de um
+# único processo. Cada requisição é atendida por uma thread de um conjunto
+# fixo (API_THREADS), e cada thread mantém a sua conexão com o banco entre uma
+# requisição e outra; as gravações são serializadas por database.transaction().
+# As rotas chamam as funções de services.py, as mesmas usadas pela interface.
+#
+# Rotas (datas em DD/MM/AAAA, como na interface):
+#   GET    /api/health
+#   GET    /api/patients?after=&limit=         POST /api/patients
+#   GET    /api/patients/<id>                  PUT/DELETE /api/patients/<id>
+#   GET    /api/patients/search?q=&limit=      GET /api/patients/choices?q=
+#   GET    /api/patients/duplicates?name=&age=&address=&contact=&cpf=&exclude_id=
+#   POST   /api/patients/<id>/merge            (corpo {"remove": [ids]}: junta os cadastros ao <id>)
+#   GET    /api/doctors?after=&limit=          POST /api/doctors
+#   GET    /api/doctors/<id>                   PUT/DELETE /api/doctors/<id>
+#   GET    /api/doctors/choices?q=             GET /api/specialties
+#   GET    /api/appointments?after=&limit=&date_from=&date_to=&doctor_id=&patient_id=
+#   POST   /api/appointments                   GET/DELETE /api/appointments/<id>
+#   GET    /api/appointments.csv?date_from=&date_to=&doctor_id=&patient_id=
+#   GET    /api/slots?specialty=&count=
+#   GET    /api/diagnostics?top=               (tempos dos comandos SQL e caches)
+#
+# As listas devolvem {"items": [...], "next": id}; next é o valor de after
+# para a página seguinte (null na última). Erros devolvem {"error": mensagem}
+# com 400 (dados inválidos), 404 (não encontrado), 409 (conflito de horário ou
+# registro alterado por outra estação) ou 503 (banco ocupado, tente de novo).
+#
+# Os registros trazem "version". Enviada no corpo do PUT (ou em ?version= no
+# DELETE), a gravação só acontece se ninguém alterou o registro desde a leitura.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+# Threads que atendem requisições (e conexões abertas com o banco)
+API_THREADS = 16
+
+# Segundos que uma conexão keep-alive ociosa segura uma thread
+KEEPALIVE_TIMEOUT = 5
+
+# Conexões aguardando atendimento na fila do sistema operacional
+LISTEN_BACKLOG = 128
+
+# Tamanho máximo do corpo de uma requisição
+MAX_BODY = 1024 * 1024
+
+# Linhas por bloco enviado na exportação CSV
+CSV_CHUNK_SIZE = 5000
+
+SLOT_FIELDS = ("date", "time", "doctor_id", "doctor_name", "slot_minutes")
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _objects(fields, rows):
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def _page(fields, rows, limit):
+    items = _objects(fields, rows)
+    return {"items": items, "next": items[-1]["id"] if len(items) == limit else None}
+
+
+def _int(query, name, default=None):
+    value = query.get(name, default)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise BadRequest(f"O parâmetro {name} deve ser um número.")
+
+
+def _limit(query):
+    return max(1, min(_int(query, "limit", services.PAGE_SIZE), services.MAX_PAGE_SIZE))
+
+
+# Filtros das consultas; as datas chegam em DD/MM/AAAA e são gravadas como AAAA-MM-DD
+def _appointment_filters(query):
+    filters = {"doctor_id": _int(query, "doctor_id"), "patient_id": _int(query, "patient_id")}
+    for name in ("date_from", "date_to"):
+        if query.get(name):
+            try:
+                filters[name] = dates.to_iso(query[name])
+            except ValueError:
+                raise BadRequest("Formato de data inválido. Use DD/MM/AAAA.")
+    return filters
+
+
+def _fields(body, *names):
+    if not isinstance(body, dict):
+        raise BadRequest("O corpo da requisição deve ser um objeto JSON.")
+    return [body.get(name) for name in names]
+
+
+def health(match, query, body):
+    return 200, {"status": "ok", "schema_version": migrations.current_version()}
+
+
+def list_patients(match, query, body):
+    limit = _limit(query)
+    return 200, _page(services.PATIENT_FIELDS, services.list_patients(_int(query, "after"), limit), limit)
+
+
+def get_patient(match, query, body):
+    return 200, dict(zip(services.PATIENT_FIELDS, services.get_patient(int(match[1]))))
+
+
+def create_patient(match, query, body):
+    patient_id = services.create_patient(*_fields(body, "name", "age", "address", "contact", "cpf"))
+    return 201, dict(zip(services.PATIENT_FIELDS, services.get_patient(patient_id)))
+
+
+def update_patient(match, query, body):
+    services.update_patient(int(match[1]), *_fields(body, "name", "age", "address", "contact", "version", "cpf"))
+    return get_patient(match, query, body)
+
+
+def delete_patient(match, query, body):
+    services.delete_patient(int(match[1]), _int(query, "version"))
+    return 204, None
+
+
+def search_patients(match, query, body):
+    rows = services.search_patients(query.get("q", ""), _int(query, "limit", search.SEARCH_LIMIT))
+    return 200, {"items": _objects(services.PATIENT_FIELDS, rows)}
+
+
+def patient_choices(match, query, body):
+    return 200, {"items": _objects(("id", "name"), services.patient_choices(query.get("q", "")))}
+
+
+def patient_duplicates(match, query, body):
+    rows = services.patient_duplicates(*(query.get(name) for name in ("name", "age", "address", "contact", "cpf")),
+                                       exclude_id=_int(query, "exclude_id"))
+    return 200, {"items": _objects(services.DUPLICATE_FIELDS, rows)}
+
+
+def merge_patients(match, query, body):
+    remove, = _fields(body, "remove")
+    if not isinstance(remove, list) or not all(isinstance(value, int) for value in remove):
+        raise BadRequest("Informe em remove a lista de ids dos cadastros a juntar.")
+    moved = services.merge_patients(int(match[1]), remove)
+    return 200, {"patient": dict(zip(services.PATIENT_FIELDS, services.get_patient(int(match[1])))),
+                 "moved_appointments": moved}
+
+
+def list_doctors(match, query, body):
+    limit = _limit(query)
+    return 200, _page(services.DOCTOR_FIELDS, services.list_doctors(_int(query, "after"), limit), limit)
+
+
+def get_doctor(match, query, body):
+    return 200, dict(zip(services.DOCTOR_FIELDS, services.get_doctor(int(match[1]))))
+
+
+def create_doctor(match, query, body):
+    doctor_id = services.create_doctor(*_fields(body, "name", "specialty", "schedule"))
+    return 201, dict(zip(services.DOCTOR_FIELDS, services.get_doctor(doctor_id)))
+
+
+def update_doctor(match, query, body):
+    services.update_doctor(int(match[1]), *_fields(body, "name", "specialty", "schedule", "version"))
+    return get_doctor(match, query, body)
+
+
+def delete_doctor(match, query, body):
+    services.delete_doctor(int(match[1]), _int(query, "version"))
+    return 204, None
+
+
+def doctor_choices(match, query, body):
+    return 200, {"items": _objects(("id", "name"), services.doctor_choices(query.get("q", "")))}
+
+
+def specialties(match, query, body):
+    return 200, {"items": services.specialties()}
+
+
+def list_appointments(match, query, body):
+    limit = _limit(query)
+    rows = services.list_appointments(_int(query, "after"), limit, **_appointment_filters(query))
+    return 200, _page(services.APPOINTMENT_FIELDS, rows, limit)
+
+
+def get_appointment(match, query, body):
+    return 200, dict(zip(services.APPOINTMENT_FIELDS, services.get_appointment(int(match[1]))))
+
+
+def schedule_appointment(match, query, body):
+    patient_id, doctor_id, date, time, duration = _fields(body, "patient_id", "doctor_id", "date", "time", "duration")
+    appointment_id = services.schedule_appointment(patient_id, doctor_id, date, time,
+                                                   scheduling.DEFAULT_DURATION if duration is None else duration)
+    return 201, dict(zip(services.APPOINTMENT_FIELDS, services.get_appointment(appointment_id)))
+
+
+def delete_appointment(match, query, body):
+    services.delete_appointment(int(match[1]), _int(query, "version"))
+    return 204, None
+
+
+def free_slots(match, query, body):
+    if not query.get("specialty"):
+        raise BadRequest("Informe a especialidade.")
+    slots = services.free_slots(query["specialty"], _int(query, "count", 10))
+    return 200, {"items": [dict(zip(SLOT_FIELDS, (dates.to_br(slot[0]),) + slot[1:])) for slot in slots]}
+
+
+def diagnostics(match, query, body):
+    return 200, {"statements": instrumentation.statement_stats(_int(query, "top", 50)),
+                 "slow_queries": instrumentation.slow_queries(), "caches": cache.stats()}
+
+
+# (método, caminho, função); os grupos do caminho chegam em match
+ROUTES = [(method, re.compile(pattern + "$"), handler) for method, pattern, handler in (
+    ("GET", r"/api/health", health),
+    ("GET", r"/api/patients", list_patients),
+    ("POST", r"/api/patients", create_patient),
+    ("GET", r"/api/patients/search", search_patients),
+    ("GET", r"/api/patients/choices", patient_choices),
+    ("GET", r"/api/patients/duplicates", patient_duplicates),
+    ("POST", r"/api/patients/(\d+)/merge", merge_patients),
+    ("GET", r"/api/patients/(\d+)", get_patient),
+    ("PUT", r"/api/patients/(\d+)", update_patient),
+    ("DELETE", r"/api/patients/(\d+)", delete_patient),
+    ("GET", r"/api/doctors", list_doctors),
+    ("POST", r"/api/doctors", create_doctor),
+    ("GET", r"/api/doctors/choices", doctor_choices),
+    ("GET", r"/api/doctors/(\d+)", get_doctor),
+    ("PUT", r"/api/doctors/(\d+)", update_doctor),
+    ("DELETE", r"/api/doctors/(\d+)", delete_doctor),
+    ("GET", r"/api/specialties", specialties),
+    ("GET", r"/api/appointments", list_appointments),
+    ("POST", r"/api/appointments", schedule_appointment),
+    ("GET", r"/api/appointments/(\d+)", get_appointment),
+    ("DELETE", r"/api/appointments/(\d+)", delete_appointment),
+    ("GET", r"/api/slots", free_slots),
+    ("GET", r"/api/diagnostics", diagnostics),
+)]
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_TIMEOUT
+    server_version = "HospitalAPI/1.0"
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        data = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        if data:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            raise BadRequest("Corpo da requisição grande demais.")
+        if not length:
+            return None
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            raise BadRequest("JSON inválido.")
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            body = self._read_body()
+            if method == "GET" and url.path == "/api/appointments.csv":
+                self._send_csv(_appointment_filters(query))
+                return
+            allowed = False
+            for route_method, pattern, handler in ROUTES:
+                match = pattern.match(url.path)
+                if match:
+                    allowed = True
+                    if route_method == method:
+                        self._send_json(*handler(match, query, body))
+                        return
+            if allowed:
+                self._send_json(405, {"error": "Método não permitido."})
+            else:
+                self._send_json(404, {"error": "Rota não encontrada."})
+        except services.NotFound as e:
+            self._send_json(404, {"error": str(e)})
+        except (scheduling.SchedulingConflict, records.StaleRecord) as e:
+            self._send_json(409, {"error": str(e)})
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+        except database.DatabaseBusy as e:
+            self._send_json(503, {"error": str(e)})
+        except sqlite3.Error as e:
+            self.log_error("Erro no banco de dados: %s", e)
+            self._send_json(500, {"error": f"Ocorreu um erro ao acessar o banco de dados: {e}"})
+
+    # O CSV é enviado em blocos (chunked), lido do cursor aos poucos como na
+    # exportação para arquivo, de modo que a memória não depende da tabela.
+    def _send_csv(self, filters):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv; charset=utf-8")
+        self.send_header("Content-Disposition", 'attachment; filename="consultas.csv"')
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        stream = _ChunkedWriter(self.wfile)
+        try:
+            services.export_appointments(stream, chunk_size=CSV_CHUNK_SIZE, **filters)
+        except sqlite3.Error as e:
+            # O cabeçalho já foi enviado: sem o bloco final, o cliente vê a resposta incompleta
+            self.log_error("Erro na exportação: %s", e)
+            self.close_connection = True
+            return
+        stream.close()
+
+
+# Arquivo de texto que envia o que recebe como blocos HTTP chunked
+class _ChunkedWriter(io.TextIOBase):
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text):
+        if text:
+            data = text.encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        return len(text)
+
+    def close(self):
+        if not self.closed:
+            self.wfile.write(b"0\r\n\r\n")
+        super().close()
+
+
+# Servidor HTTP que atende cada conexão numa thread de um conjunto fixo, em
+# vez de abrir uma thread (e uma conexão com o banco) por requisição.
+class APIServer(HTTPServer):
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(self, address, threads=API_THREADS, quiet=False):
+        super().__init__(address, APIHandler)
+        self.quiet = quiet
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix="api")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP local do sistema do hospital.")
+    parser.add_argument("--banco", default=database.DB_PATH, help="arquivo do banco de dados")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="endereço em que o servidor escuta")
+    parser.add_argument("--porta", type=int, default=DEFAULT_PORT, help="porta do servidor")
+    parser.add_argument("--threads", type=int, default=API_THREADS, help="requisições atendidas ao mesmo tempo")
+    parser.add_argument("--silencioso", action="store_true", help="não registra cada requisição")
+    parser.add_argument("--espera", type=float, default=database.BUSY_TIMEOUT,
+                        help="segundos de espera quando outro processo está gravando no banco")
+    parser.add_argument("--tentativas", type=int, default=database.BUSY_RETRIES,
+                        help="novas tentativas depois da espera, antes de responder 503")
+    args = parser.parse_args()
+
+    database.configure(args.banco)
+    database.configure_busy(args.espera, args.tentativas)
+    migrations.migrate()
+    server = APIServer((args.host, args.porta), args.threads, args.silencioso)
+    print(f"API em http://{args.host}:{args.porta}/api (Ctrl+C para encerrar)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
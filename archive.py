@@ -0,0 +1,243 @@
+import argparse
+import os
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import database
+import dates
+import events
+import export
+import migrations
+
+# Arquivo de consultas antigas.
+#
+# As consultas anteriores a um horizonte (ARCHIVE_HORIZON_DAYS) saem da tabela
+# appointments e vão para archived_appointments, num segundo arquivo SQLite ao
+# lado do banco principal (hospital.db -> hospital-arquivo.db). As listas, a
+# agenda e os conflitos de horário continuam lendo só appointments, que fica
+# do tamanho do movimento recente. O arquivo só é anexado (ATTACH) à conexão
+# de quem precisa do histórico, enquanto precisa (attached), e a visão
+# temporária all_appointments junta as duas tabelas com as mesmas colunas,
+# mais archived (0 ou 1).
+#
+# As consultas são movidas em lotes, cada um em duas transações: a primeira
+# copia o lote para o arquivo e a segunda o apaga do banco principal. Em WAL o
+# COMMIT não é atômico entre arquivos anexados, então nunca se grava nos dois
+# na mesma transação: uma queda entre as duas deixa o lote repetido (a cópia é
+# INSERT OR REPLACE e a próxima execução conclui a remoção), nunca perdido.
+# Os ids são AUTOINCREMENT e não voltam a ser usados em appointments.
+#
+# As tabelas de totais dos relatórios continuam contando as consultas
+# arquivadas: enquanto um lote é apagado do banco principal, os ids ficam na
+# tabela archive_moving, que o trigger de exclusão dos totais ignora.
+#
+# Os backups de backup.py levam o arquivo junto com o banco principal, do
+# mesmo instante, e a restauração devolve os dois.
+
+# Consultas com mais de tantos dias são arquivadas
+ARCHIVE_HORIZON_DAYS = 365
+
+# Consultas movidas por transação
+ARCHIVE_BATCH_SIZE = 5000
+
+ARCHIVE_COLUMNS = ("id", "patient_id", "doctor_id", "date", "time", "duration", "end_time")
+
+# Histórico de um paciente: quantidade máxima de consultas devolvidas
+HISTORY_LIMIT = 500
+
+
+class ArchiveCancelled(Exception):
+    pass
+
+
+# hospital.db -> hospital-arquivo.db, na pasta do banco principal
+def archive_path():
+    base, extension = os.path.splitext(database.database_path())
+    return f"{base}-arquivo{extension or '.db'}"
+
+
+def exists():
+    return os.path.exists(archive_path())
+
+
+# Anexa o arquivo à conexão desta thread como "archive" durante o bloco,
+# criando-o se preciso, com a visão all_appointments, e o desanexa ao sair,
+# para que a conexão (em geral a da thread trabalhadora) não fique presa ao
+# arquivo. Dentro de outro bloco attached, usa o que já está anexado. Com
+# create=False e sem arquivo, não anexa nada e devolve None. Não pode ser
+# usada dentro de uma transação.
+@contextmanager
+def attached(create=True):
+    conn = database.get_connection()
+    path = archive_path()
+    if getattr(conn, "archive_attached", None) == path:
+        yield conn
+        return
+    if not create and not os.path.exists(path):
+        yield None
+        return
+    conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    conn.execute("PRAGMA archive.journal_mode=WAL")
+    columns = ", ".join(ARCHIVE_COLUMNS)
+    with database.transaction():
+        create_tables(conn)
+    conn.execute(f"""CREATE TEMP VIEW IF NOT EXISTS all_appointments AS
+                     SELECT {columns}, 0 AS archived FROM main.appointments
+                     UNION ALL
+                     SELECT {columns}, 1 AS archived FROM archive.archived_appointments""")
+    conn.archive_attached = path
+    try:
+        yield conn
+    finally:
+        conn.archive_attached = None
+        conn.execute("DROP VIEW IF EXISTS temp.all_appointments")
+        conn.execute("DETACH DATABASE archive")
+
+
+# Tabela e índices do arquivo no banco schema de conn (o arquivo anexado ou,
+# na restauração de um backup, um arquivo novo aberto à parte)
+def create_tables(conn, schema="archive"):
+    conn.execute(f"""CREATE TABLE IF NOT EXISTS {schema}.archived_appointments (
+                         id INTEGER PRIMARY KEY,
+                         patient_id INTEGER,
+                         doctor_id INTEGER,
+                         date TEXT,
+                         time TEXT,
+                         duration INTEGER NOT NULL DEFAULT 30,
+                         end_time TEXT,
+                         archived_at TEXT NOT NULL)""")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_archived_date_time ON archived_appointments (date, time)")
+    conn.execute(f"""CREATE INDEX IF NOT EXISTS {schema}.idx_archived_patient_date
+                     ON archived_appointments (patient_id, date, time)""")
+    conn.execute(f"""CREATE INDEX IF NOT EXISTS {schema}.idx_archived_doctor_date
+                     ON archived_appointments (doctor_id, date, time)""")
+
+
+# Dentro da transação já aberta em conn, as consultas do lote ficam em
+# archive_moving enquanto são apagadas, e o trigger de exclusão dos totais as
+# ignora (sem alterar o esquema a cada lote). A tabela é esvaziada antes do
+# COMMIT, então as outras conexões sempre a veem vazia.
+@contextmanager
+def _keeping_report_totals(conn):
+    conn.execute("INSERT INTO main.archive_moving SELECT id FROM temp.archive_batch")
+    yield
+    conn.execute("DELETE FROM main.archive_moving")
+
+
+# Move para o arquivo as consultas com mais de days dias, em lotes de
+# batch_size. progress (export.ExportProgress) é atualizado a cada lote e
+# stop() interrompe entre dois lotes (ArchiveCancelled); os lotes já movidos
+# ficam no arquivo. Devolve quantas consultas foram movidas.
+def archive_appointments(days=ARCHIVE_HORIZON_DAYS, batch_size=ARCHIVE_BATCH_SIZE, progress=None):
+    progress = progress or export.ExportProgress()
+    cutoff = (date.today() - timedelta(days=days)).isoformat()
+    columns = ", ".join(ARCHIVE_COLUMNS)
+    with attached() as conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch (id INTEGER PRIMARY KEY)")
+        try:
+            while True:
+                if progress.stopped():
+                    raise ArchiveCancelled()
+                archived_at = datetime.now().isoformat(timespec="seconds")
+                # 1. Copia o lote mais antigo para o arquivo
+                with database.transaction():
+                    conn.execute("DELETE FROM temp.archive_batch")
+                    copied = conn.execute("""INSERT INTO temp.archive_batch
+                                             SELECT id FROM main.appointments WHERE date < ?
+                                             ORDER BY date, time LIMIT ?""", (cutoff, batch_size)).rowcount
+                    conn.execute(f"""INSERT OR REPLACE INTO archive.archived_appointments ({columns}, archived_at)
+                                     SELECT {columns}, ? FROM main.appointments
+                                     WHERE id IN (SELECT id FROM temp.archive_batch)""", (archived_at,))
+                if not copied:
+                    break
+                # 2. Apaga do banco principal o que já está no arquivo
+                with database.transaction():
+                    removed = conn.execute("""SELECT id FROM temp.archive_batch
+                                              WHERE id NOT IN (SELECT id FROM main.appointments)""").fetchall()
+                    conn.execute("""UPDATE report_patient_visits SET archived_last_date = MAX(
+                                        COALESCE(archived_last_date, ''),
+                                        (SELECT MAX(date) FROM main.appointments
+                                         WHERE patient_id = report_patient_visits.patient_id
+                                           AND id IN (SELECT id FROM temp.archive_batch)))
+                                    WHERE patient_id IN (SELECT patient_id FROM main.appointments
+                                                         WHERE id IN (SELECT id FROM temp.archive_batch))""")
+                    with _keeping_report_totals(conn):
+                        moved = conn.execute("""
+                            DELETE FROM main.appointments
+                            WHERE id IN (SELECT id FROM archive.archived_appointments
+                                         WHERE id IN (SELECT id FROM temp.archive_batch))""").rowcount
+                progress.rows += moved
+                if removed:
+                    # Excluídas por outra conexão entre as duas transações
+                    with database.transaction():
+                        conn.executemany("DELETE FROM archive.archived_appointments WHERE id = ?", removed)
+                progress.elapsed = time.perf_counter() - progress.started
+        finally:
+            if progress.rows:
+                # Sem estatísticas, o planejador percorre o arquivo inteiro nas
+                # consultas paginadas por all_appointments
+                conn.execute("ANALYZE archive")
+                events.publish("appointments", None, events.RELOAD)
+    return progress.rows
+
+
+# Consultas de um paciente, ativas e arquivadas, da mais recente para a mais
+# antiga: [(id, médico, data DD/MM/AAAA, hora, arquivada 0/1)]
+def patient_history(patient_id, limit=HISTORY_LIMIT):
+    with attached(create=False) as conn:
+        source = "all_appointments" if conn is not None else "(SELECT *, 0 AS archived FROM appointments)"
+        rows = database.fetchall(f"""
+            SELECT a.id, d.name, a.date, a.time, a.archived
+            FROM {source} a JOIN doctors d ON d.id = a.doctor_id
+            WHERE a.patient_id = ?
+            ORDER BY a.date DESC, a.time DESC LIMIT ?""", (patient_id, limit))
+    return [(row_id, doctor, dates.to_br(day), time, archived) for row_id, doctor, day, time, archived in rows]
+
+
+# Sem arquivo, só as consultas ativas (sem criar um arquivo vazio)
+def has_appointments(**filters):
+    with attached(create=False) as conn:
+        return export.has_appointments(archived=conn is not None, **filters)
+
+
+# Exporta as consultas ativas e arquivadas (ver export.export_appointments);
+# sem arquivo, só as ativas
+def export_appointments(file_path, progress=None, chunk_size=export.EXPORT_CHUNK_SIZE, **filters):
+    with attached(create=False) as conn:
+        return export.export_appointments(file_path, progress, chunk_size, archived=conn is not None, **filters)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arquivo de consultas antigas.")
+    parser.add_argument("--banco", default=database.DB_PATH, help="arquivo do banco de dados")
+    commands = parser.add_subparsers(dest="command")
+
+    move = commands.add_parser("arquivar", help="move as consultas antigas para o arquivo")
+    move.add_argument("--dias", type=int, default=ARCHIVE_HORIZON_DAYS,
+                      help=f"arquiva as consultas com mais de tantos dias (padrão: {ARCHIVE_HORIZON_DAYS})")
+    move.add_argument("--lote", type=int, default=ARCHIVE_BATCH_SIZE, help="consultas movidas por transação")
+
+    history = commands.add_parser("historico", help="consultas ativas e arquivadas de um paciente")
+    history.add_argument("--paciente", type=int, required=True, help="id do paciente")
+    history.add_argument("--limite", type=int, default=HISTORY_LIMIT)
+    args = parser.parse_args()
+
+    database.configure(args.banco)
+    migrations.migrate()
+    if args.command == "arquivar":
+        progress = export.ExportProgress()
+        try:
+            moved = archive_appointments(args.dias, args.lote, progress)
+        except KeyboardInterrupt:
+            parser.exit(1, f"Interrompido: {progress.rows} consultas já tinham sido arquivadas.\n")
+        print(f"{moved} consultas arquivadas em {archive_path()} ({progress.elapsed:.1f}s).")
+    elif args.command == "historico":
+        for row in patient_history(args.paciente, args.limite):
+            print(";".join(str(value) for value in row))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
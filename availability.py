@@ -0,0 +1,267 @@
+from datetime import datetime, timedelta
+
+import cache
+import database
+import dates
+import events
+import records
+from scheduling import to_minutes, from_minutes
+
+# Agenda estruturada dos médicos e busca dos próximos horários livres.
+#
+# Cada médico tem períodos semanais de atendimento (doctor_availability),
+# exceções por data (availability_exceptions) e a duração do horário
+# (doctors.slot_minutes). O dia é dividido em blocos de UNIT minutos e
+# representado como um inteiro em que cada bit é um bloco: a disponibilidade
+# do dia sai dos períodos e exceções, e a ocupação vem da tabela
+# appointment_occupancy, que guarda o bitmap das consultas já marcadas.
+# Verificar se um horário está livre é então um AND de bits, o que mantém a
+# busca rápida mesmo varrendo dezenas de médicos e meses à frente.
+#
+# As gravações da agenda são feitas dentro de uma transação já aberta (as
+# funções de services.py, que também conferem se o médico existe).
+
+# Tamanho do bloco dos bitmaps, em minutos
+UNIT = 5
+DAY_UNITS = 24 * 60 // UNIT
+BITMAP_BYTES = (DAY_UNITS + 7) // 8
+
+WEEKDAYS = ("Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo")
+
+# Quantos dias à frente a busca olha, e quantos dias são lidos do banco por vez
+SEARCH_DAYS = 120
+CHUNK_DAYS = 14
+
+
+# Bits dos blocos inteiramente dentro de [start, end) (minutos)
+def _available_bits(start, end):
+    first, last = -(-start // UNIT), end // UNIT
+    return ((1 << (last - first)) - 1) << first if last > first else 0
+
+
+# Bits dos blocos que tocam [start, end) (minutos)
+def _occupied_bits(start, end):
+    first, last = start // UNIT, min(-(-end // UNIT), DAY_UNITS)
+    return ((1 << (last - first)) - 1) << first if last > first else 0
+
+
+def _validate_period(start, end):
+    if not (dates.is_valid_time(start) and dates.is_valid_time(end)):
+        raise ValueError("Formato de hora inválido. Use HH:MM.")
+    if end <= start:
+        raise ValueError("O horário de término deve ser depois do início.")
+
+
+# Lista de especialidades, refeita só quando algum médico muda
+_specialties = cache.LRUCache("doctors", 1, keyed=False)
+
+
+def specialties():
+    return _specialties.get("all", lambda key: [row[0] for row in database.fetchall(
+        "SELECT DISTINCT specialty FROM doctors WHERE specialty IS NOT NULL ORDER BY specialty")])
+
+
+def slot_minutes(doctor_id):
+    doctor = records.get_doctor(doctor_id)
+    return doctor[4] if doctor else None
+
+
+def set_slot_minutes(doctor_id, minutes, version=None):
+    if minutes < UNIT or minutes % UNIT:
+        raise ValueError(f"A duração do horário deve ser múltipla de {UNIT} minutos.")
+    records.update_doctor_slot(doctor_id, minutes, version)
+
+
+# Períodos semanais do médico: (id, weekday, start_time, end_time), com weekday 0 = segunda
+def weekly_periods(doctor_id):
+    return database.fetchall("""
+        SELECT id, weekday, start_time, end_time FROM doctor_availability
+        WHERE doctor_id = ? ORDER BY weekday, start_time
+    """, (doctor_id,))
+
+
+def add_period(doctor_id, weekday, start, end):
+    _validate_period(start, end)
+    period_id = database.execute("""
+        INSERT INTO doctor_availability (doctor_id, weekday, start_time, end_time) VALUES (?, ?, ?, ?)
+    """, (doctor_id, weekday, start, end)).lastrowid
+    events.publish("doctor_availability", period_id, events.INSERT)
+    return period_id
+
+
+# Devolve se o período existia
+def remove_period(period_id):
+    removed = database.execute("DELETE FROM doctor_availability WHERE id = ?", (period_id,)).rowcount > 0
+    if removed:
+        events.publish("doctor_availability", int(period_id), events.DELETE)
+    return removed
+
+
+# Exceções a partir de date_from (AAAA-MM-DD): (id, date, start_time, end_time, available)
+def exceptions(doctor_id, date_from=None):
+    return database.fetchall("""
+        SELECT id, date, start_time, end_time, available FROM availability_exceptions
+        WHERE doctor_id = ? AND date >= ? ORDER BY date, start_time
+    """, (doctor_id, date_from or ""))
+
+
+# Folga (available=False) ou horário extra (available=True) numa data.
+# Sem start/end, a folga vale para o dia todo.
+def add_exception(doctor_id, date, start=None, end=None, available=False):
+    if start or end or available:
+        _validate_period(start or "", end or "")
+    exception_id = database.execute("""
+        INSERT INTO availability_exceptions (doctor_id, date, start_time, end_time, available)
+        VALUES (?, ?, ?, ?, ?)
+    """, (doctor_id, date, start or None, end or None, int(available))).lastrowid
+    events.publish("availability_exceptions", exception_id, events.INSERT)
+    return exception_id
+
+
+# Devolve se a exceção existia
+def remove_exception(exception_id):
+    removed = database.execute("DELETE FROM availability_exceptions WHERE id = ?", (exception_id,)).rowcount > 0
+    if removed:
+        events.publish("availability_exceptions", int(exception_id), events.DELETE)
+    return removed
+
+
+# Bitmap de disponibilidade por dia da semana: {doctor_id: [bits de segunda, ..., domingo]}
+def _weekly_masks(conn, placeholders, doctor_ids):
+    masks = {doctor_id: [0] * 7 for doctor_id in doctor_ids}
+    for doctor_id, weekday, start, end in conn.execute(f"""
+            SELECT doctor_id, weekday, start_time, end_time FROM doctor_availability
+            WHERE doctor_id IN ({placeholders})""", doctor_ids):
+        masks[doctor_id][weekday] |= _available_bits(to_minutes(start), to_minutes(end))
+    return masks
+
+
+# Exceções do intervalo: {(doctor_id, date): (bits extras, bits bloqueados)}
+def _exception_masks(conn, placeholders, doctor_ids, first, last):
+    masks = {}
+    for doctor_id, day, start, end, available in conn.execute(f"""
+            SELECT doctor_id, date, start_time, end_time, available FROM availability_exceptions
+            WHERE doctor_id IN ({placeholders}) AND date BETWEEN ? AND ?""", (*doctor_ids, first, last)):
+        extra, blocked = masks.get((doctor_id, day), (0, 0))
+        if available:
+            extra |= _available_bits(to_minutes(start), to_minutes(end))
+        elif start and end:
+            blocked |= _occupied_bits(to_minutes(start), to_minutes(end))
+        else:
+            blocked = (1 << DAY_UNITS) - 1
+        masks[(doctor_id, day)] = (extra, blocked)
+    return masks
+
+
+# Bitmaps de ocupação de wanted = {(doctor_id, date)}. Os que não estão na
+# tabela são calculados a partir das consultas, só com leituras, e gravados
+# para as próximas buscas quando dá (_store_occupancy).
+def _occupancy(conn, placeholders, doctor_ids, first, last, wanted):
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    bitmaps = {}
+    for doctor_id, day, bitmap in conn.execute(f"""
+            SELECT doctor_id, date, bitmap FROM appointment_occupancy
+            WHERE doctor_id IN ({placeholders}) AND date BETWEEN ? AND ?""", (*doctor_ids, first, last)):
+        bitmaps[(doctor_id, day)] = int.from_bytes(bitmap, "big")
+    missing = wanted - bitmaps.keys()
+    if not missing:
+        return bitmaps
+
+    computed = dict.fromkeys(missing, 0)
+    for doctor_id, day, start, end in conn.execute(f"""
+            SELECT doctor_id, date, time, end_time FROM appointments
+            WHERE doctor_id IN ({placeholders}) AND date BETWEEN ? AND ? AND end_time IS NOT NULL
+            """, (*doctor_ids, first, last)):
+        if (doctor_id, day) in computed:
+            computed[(doctor_id, day)] |= _occupied_bits(to_minutes(start), to_minutes(end))
+    _store_occupancy(data_version, computed)
+    bitmaps.update(computed)
+    return bitmaps
+
+
+# Grava os bitmaps calculados, se for possível sem atrasar a busca: com outra
+# thread ou estação gravando, fica para uma próxima busca. Também não grava se
+# o banco mudou desde a leitura (PRAGMA data_version), pois os triggers só
+# descartam bitmaps que já estão na tabela e um calculado antes de uma
+# consulta nova ficaria errado.
+def _store_occupancy(data_version, computed):
+    try:
+        with database.transaction(wait=False) as conn:
+            if conn.execute("PRAGMA data_version").fetchone()[0] != data_version:
+                return
+            conn.executemany("INSERT OR REPLACE INTO appointment_occupancy (doctor_id, date, bitmap) VALUES (?, ?, ?)",
+                             [(doctor_id, day, bits.to_bytes(BITMAP_BYTES, "big"))
+                              for (doctor_id, day), bits in computed.items()])
+    except database.DatabaseBusy:
+        pass
+
+
+# Horários livres de um dia: percorre cada trecho contínuo disponível em
+# passos da duração do horário, a partir do início do trecho, e devolve os
+# que começam a partir do bloco not_before.
+def _free_starts(available, occupied, slot_units, not_before):
+    starts = []
+    unit = 0
+    while unit < DAY_UNITS:
+        if not (available >> unit) & 1:
+            unit += 1
+            continue
+        run_end = unit
+        while run_end < DAY_UNITS and (available >> run_end) & 1:
+            run_end += 1
+        slot = (1 << slot_units) - 1
+        for start in range(unit, run_end - slot_units + 1, slot_units):
+            if start >= not_before and not (occupied >> start) & slot:
+                starts.append(start)
+        unit = run_end
+    return starts
+
+
+# Próximos count horários livres entre os médicos da especialidade, a partir
+# de start (datetime; agora, se omitido). Devolve tuplas
+# (date, time, doctor_id, doctor_name, slot_minutes) em ordem de data e hora.
+def next_free_slots(specialty, count=10, start=None, days=SEARCH_DAYS):
+    start = start or datetime.now()
+    conn = database.get_connection()
+    doctors = conn.execute("SELECT id, name, slot_minutes FROM doctors WHERE specialty = ? ORDER BY name",
+                           (specialty,)).fetchall()
+    if not doctors:
+        return []
+    doctor_ids = [doctor[0] for doctor in doctors]
+    placeholders = ", ".join("?" * len(doctor_ids))
+    weekly = _weekly_masks(conn, placeholders, doctor_ids)
+
+    slots = []
+    first_day = start.date()
+    for offset in range(0, days, CHUNK_DAYS):
+        chunk = [first_day + timedelta(days=n) for n in range(offset, min(offset + CHUNK_DAYS, days))]
+        first, last = chunk[0].isoformat(), chunk[-1].isoformat()
+        overrides = _exception_masks(conn, placeholders, doctor_ids, first, last)
+
+        available = {}
+        for day in chunk:
+            key_day = day.isoformat()
+            for doctor_id in doctor_ids:
+                extra, blocked = overrides.get((doctor_id, key_day), (0, 0))
+                bits = (weekly[doctor_id][day.weekday()] | extra) & ~blocked
+                if bits:
+                    available[(doctor_id, key_day)] = bits
+        if not available:
+            continue
+        occupied = _occupancy(conn, placeholders, doctor_ids, first, last, set(available))
+
+        for day in chunk:
+            key_day = day.isoformat()
+            not_before = -(-(start.hour * 60 + start.minute) // UNIT) if day == first_day else 0
+            found = []
+            for doctor_id, name, minutes in doctors:
+                bits = available.get((doctor_id, key_day))
+                if bits:
+                    slot_units = -(-minutes // UNIT)
+                    for unit in _free_starts(bits, occupied[(doctor_id, key_day)], slot_units, not_before):
+                        found.append((key_day, from_minutes(unit * UNIT), doctor_id, name, minutes))
+            found.sort(key=lambda slot: slot[1])
+            slots.extend(found)
+            if len(slots) >= count:
+                return slots[:count]
+    return slots
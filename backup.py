@@ -0,0 +1,439 @@
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import archive
+import database
+import migrations
+
+# Backup online do banco de dados com a API de backup do SQLite.
+#
+# A cópia é feita em passos de BACKUP_STEP_PAGES páginas por uma conexão
+# própria; entre um passo e outro os demais escritores continuam trabalhando
+# e o resultado é sempre um banco consistente. O modo agendado mantém
+# snapshots compactados e em rodízio numa pasta de backups. Cada backup é
+# registrado na tabela backup_log com duração e tamanho.
+#
+# O arquivo de consultas antigas (archive.py), se existir, é copiado do mesmo
+# instante que o banco principal e vai dentro do backup, como a tabela
+# archived_appointments; o backup continua sendo um arquivo só. Sem ele, uma
+# restauração perderia o histórico arquivado ou o deixaria fora de sincronia
+# com os totais e os ids do banco restaurado.
+#
+# A restauração verifica o arquivo antes de tocar no banco atual e o substitui
+# de forma atômica (cópia para um temporário, fsync e rename), só quando
+# nenhuma outra conexão está aberta no banco; o arquivo de consultas antigas
+# é refeito a partir do backup e trocado junto.
+
+# Páginas copiadas por passo da API de backup
+BACKUP_STEP_PAGES = 1024
+
+# Pausa entre passos nos backups agendados, para ceder espaço a escritores
+SCHEDULED_STEP_PAUSE = 0.005
+
+# Padrões do modo agendado
+DEFAULT_INTERVAL_MINUTES = 60
+DEFAULT_KEEP = 7
+
+# Nível de compressão gzip dos snapshots (1 = mais rápido, 9 = menor)
+COMPRESS_LEVEL = 3
+
+SNAPSHOT_PREFIX = "hospital-"
+SNAPSHOT_SUFFIX = ".db.gz"
+
+
+# Copia o banco atual (com o arquivo de consultas antigas, se houver) para
+# um arquivo SQLite em target_path.
+# progress(restantes, total) é chamado depois de cada passo.
+def _copy_to(target_path, pause=0.0, progress=None):
+    def step(status, remaining, total):
+        if progress is not None:
+            progress(remaining, total)
+        if pause and remaining:
+            time.sleep(pause)
+
+    archive_copy = target_path + ".arquivo"
+    source = database.connect()
+    try:
+        with_archive = archive.exists()
+        if with_archive:
+            source.execute("ATTACH DATABASE ? AS archive", (archive.archive_path(),))
+        # Mantém uma transação de leitura aberta durante toda a cópia: com WAL
+        # ela fixa um snapshot do banco sem bloquear os escritores, e a API de
+        # backup não precisa recomeçar quando outra conexão grava no meio. O
+        # banco principal é lido antes do arquivo: um lote arquivado entre as
+        # duas leituras aparece nos dois (o próximo arquivamento conclui a
+        # remoção), nunca em nenhum.
+        source.execute("BEGIN")
+        source.execute("SELECT 1 FROM main.sqlite_master LIMIT 1").fetchall()
+        if with_archive:
+            source.execute("SELECT 1 FROM archive.sqlite_master LIMIT 1").fetchall()
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target, pages=BACKUP_STEP_PAGES, progress=step)
+            # A cópia herda o modo WAL; o backup deve ser um arquivo único
+            target.execute("PRAGMA journal_mode = DELETE")
+            if with_archive:
+                copy = sqlite3.connect(archive_copy)
+                try:
+                    source.backup(copy, pages=BACKUP_STEP_PAGES, progress=step, name="archive")
+                    copy.execute("PRAGMA journal_mode = DELETE")
+                finally:
+                    copy.close()
+                _embed_archive(target, archive_copy)
+            pages = target.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            target.close()
+            source.execute("COMMIT")
+    finally:
+        source.close()
+        if os.path.exists(archive_copy):
+            os.remove(archive_copy)
+    return pages
+
+
+# Consultas arquivadas copiadas para dentro do backup (target)
+def _embed_archive(target, archive_copy):
+    columns = ", ".join(archive.ARCHIVE_COLUMNS + ("archived_at",))
+    target.execute("ATTACH DATABASE ? AS copied", (archive_copy,))
+    try:
+        with target:
+            archive.create_tables(target, "main")
+            target.execute(f"""INSERT INTO main.archived_appointments ({columns})
+                               SELECT {columns} FROM copied.archived_appointments""")
+    finally:
+        target.execute("DETACH DATABASE copied")
+
+
+def _log(path, pages, duration_ms, compressed):
+    database.execute("""
+        INSERT INTO backup_log (path, pages, duration_ms, size_bytes, compressed)
+        VALUES (?, ?, ?, ?, ?)
+    """, (path, pages, duration_ms, os.path.getsize(path), int(compressed)))
+
+
+# Backup manual para um arquivo .db. A cópia é gravada num arquivo temporário
+# ao lado do destino e só então renomeada, para nunca deixar um backup pela metade.
+def backup_to(path, progress=None):
+    started = time.perf_counter()
+    tmp_path = path + ".tmp"
+    try:
+        pages = _copy_to(tmp_path, progress=progress)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _log(path, pages, (time.perf_counter() - started) * 1000, False)
+    return path
+
+
+def _snapshots(directory):
+    names = [name for name in os.listdir(directory)
+             if name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX)]
+    # O nome traz a data e hora, então a ordem alfabética é a cronológica
+    return [os.path.join(directory, name) for name in sorted(names)]
+
+
+# Gera um snapshot compactado em directory e apaga os mais antigos, mantendo keep
+def snapshot(directory, keep=DEFAULT_KEEP, pause=SCHEDULED_STEP_PAUSE):
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(directory, f"{SNAPSHOT_PREFIX}{stamp}{SNAPSHOT_SUFFIX}")
+    tmp_db = os.path.join(directory, f".{SNAPSHOT_PREFIX}{stamp}.db.tmp")
+    tmp_gz = path + ".tmp"
+    try:
+        pages = _copy_to(tmp_db, pause=pause)
+        with open(tmp_db, 'rb') as source, gzip.open(tmp_gz, 'wb', compresslevel=COMPRESS_LEVEL) as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+        os.replace(tmp_gz, path)
+    finally:
+        for leftover in (tmp_db, tmp_gz):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    _log(path, pages, (time.perf_counter() - started) * 1000, True)
+
+    for old in _snapshots(directory)[:-keep] if keep > 0 else []:
+        os.remove(old)
+    return path
+
+
+# Gera snapshots periódicos numa thread própria até stop() ser chamado
+class BackupScheduler:
+    def __init__(self, directory, interval_minutes=DEFAULT_INTERVAL_MINUTES, keep=DEFAULT_KEEP, on_error=None):
+        self.directory = directory
+        self.interval = interval_minutes * 60
+        self.keep = keep
+        self.on_error = on_error
+        self.last_path = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="backup-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    self.last_path = snapshot(self.directory, self.keep)
+                    self.last_error = None
+                except Exception as e:
+                    self.last_error = e
+                    if self.on_error is not None:
+                        self.on_error(e)
+                # Sem conexão aberta entre um snapshot e outro, para não
+                # impedir uma restauração (database.exclusive_access)
+                database.close_thread_connection()
+                self._stop.wait(self.interval)
+        finally:
+            database.close_thread_connection()
+
+
+class RestoreError(Exception):
+    pass
+
+
+class RestoreCancelled(Exception):
+    pass
+
+
+# Andamento de uma restauração: páginas do backup já copiadas. stop()
+# interrompe a cópia; a troca do arquivo, depois dela, não é interrompida.
+class RestoreProgress:
+    def __init__(self):
+        self.pages = 0
+        self.total = 0
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def stopped(self):
+        return self._stop.is_set()
+
+    def copied(self):
+        return self.total > 0 and self.pages >= self.total
+
+
+# Tabelas que um backup precisa ter para ser aceito
+REQUIRED_TABLES = ("patients", "doctors", "appointments")
+
+
+def _open_readonly(path):
+    return sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+
+
+# Confere se o arquivo é um banco do sistema íntegro e compatível com esta versão.
+# full=True roda integrity_check (mais lento) em vez de quick_check.
+def verify_backup(path, full=False):
+    try:
+        conn = _open_readonly(path)
+    except sqlite3.Error as e:
+        raise RestoreError(f"Não foi possível abrir o arquivo: {e}")
+    try:
+        try:
+            check = "integrity_check" if full else "quick_check"
+            result = conn.execute(f"PRAGMA {check}").fetchall()
+        except sqlite3.DatabaseError as e:
+            raise RestoreError(f"O arquivo não é um banco de dados SQLite válido: {e}")
+        if result != [("ok",)]:
+            raise RestoreError("O backup está corrompido: " + "; ".join(row[0] for row in result[:5]))
+
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        missing = [table for table in REQUIRED_TABLES if table not in tables]
+        if missing:
+            raise RestoreError(f"O arquivo não é um banco do sistema (faltam as tabelas {', '.join(missing)}).")
+        # Backups anteriores às migrações não têm schema_version e são atualizados depois
+        if "schema_version" in tables:
+            version = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+            if version > migrations.latest_version():
+                raise RestoreError(f"O backup é de uma versão mais nova do sistema (esquema {version}).")
+    finally:
+        conn.close()
+
+
+def _fsync_directory(directory):
+    # No Windows não é possível abrir um diretório para fsync
+    if os.name != "nt":
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _has_archive(path):
+    conn = _open_readonly(path)
+    try:
+        return conn.execute("""SELECT 1 FROM sqlite_master
+                               WHERE type = 'table' AND name = 'archived_appointments'""").fetchone() is not None
+    finally:
+        conn.close()
+
+
+# Tira do banco restaurado (tmp_path) as consultas arquivadas que vieram no
+# backup e as grava num arquivo de consultas antigas novo em archive_tmp
+def _split_archive(tmp_path, archive_tmp):
+    columns = ", ".join(archive.ARCHIVE_COLUMNS + ("archived_at",))
+    conn = sqlite3.connect(archive_tmp, isolation_level=None)
+    try:
+        conn.execute("ATTACH DATABASE ? AS restored", (tmp_path,))
+        conn.execute("BEGIN")
+        archive.create_tables(conn, "main")
+        conn.execute(f"""INSERT INTO main.archived_appointments ({columns})
+                         SELECT {columns} FROM restored.archived_appointments""")
+        conn.execute("DROP TABLE restored.archived_appointments")
+        conn.execute("COMMIT")
+        conn.execute("DETACH DATABASE restored")
+    finally:
+        conn.close()
+    with open(archive_tmp, 'rb+') as file:
+        os.fsync(file.fileno())
+
+
+# Restaura o banco a partir de um backup (.db ou snapshot .db.gz).
+# O backup é verificado, copiado pela API de backup para um arquivo temporário
+# ao lado do banco, gravado em disco (fsync) e renomeado por cima do atual,
+# com acesso exclusivo ao banco (database.exclusive_access): se outra tarefa
+# ou estação estiver com ele aberto, lança database.DatabaseBusy e o banco
+# atual fica intacto. Os caches são limpos, sem reiniciar o app.
+# O arquivo de consultas antigas que veio no backup substitui o atual. Um
+# backup sem ele não é restaurado enquanto houver um arquivo (RestoreError):
+# o arquivo atual não corresponde ao banco do backup.
+# Com progress (RestoreProgress), a cópia pode ser interrompida, lançando
+# RestoreCancelled antes de o banco atual ser tocado.
+def restore_from(path, full_check=False, progress=None):
+    db_path = os.path.abspath(database.database_path())
+    directory = os.path.dirname(db_path)
+    tmp_path = db_path + ".restore.tmp"
+    archive_path = os.path.abspath(archive.archive_path())
+    archive_tmp = archive_path + ".restore.tmp"
+    unpacked = None
+
+    def step(status, remaining, total):
+        if progress is not None:
+            if progress.stopped():
+                raise RestoreCancelled()
+            progress.pages, progress.total = total - remaining, total
+
+    try:
+        if path.endswith(".gz"):
+            unpacked = db_path + ".restore.unpacked"
+            with gzip.open(path, 'rb') as source, open(unpacked, 'wb') as target:
+                shutil.copyfileobj(source, target, 1024 * 1024)
+            path = unpacked
+        verify_backup(path, full_check)
+        with_archive = _has_archive(path)
+        if not with_archive and os.path.exists(archive_path):
+            raise RestoreError(f"O backup não traz o arquivo de consultas antigas, e este banco tem um "
+                               f"({archive_path}), que ficaria fora de sincronia com o banco restaurado. "
+                               f"Mova esse arquivo para outra pasta antes de restaurar.")
+
+        source = _open_readonly(path)
+        try:
+            target = sqlite3.connect(tmp_path)
+            try:
+                source.backup(target, pages=BACKUP_STEP_PAGES, progress=step)
+                target.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                target.close()
+        finally:
+            source.close()
+        if with_archive:
+            _split_archive(tmp_path, archive_tmp)
+        with open(tmp_path, 'rb+') as file:
+            os.fsync(file.fileno())
+
+        current = [archive_path] if os.path.exists(archive_path) else []
+        with database.exclusive_access(*current):
+            # Um -wal que sobrasse seria aplicado ao banco novo; sair do modo
+            # WAL já o removeu, então um que exista é de outro processo
+            if any(os.path.exists(file + "-wal") for file in [db_path] + current):
+                raise RestoreError("O banco atual ainda tem alterações pendentes (arquivo -wal). "
+                                   "Feche as outras estações e tente novamente.")
+            if with_archive:
+                os.replace(archive_tmp, archive_path)
+            os.replace(tmp_path, db_path)
+            _fsync_directory(directory)
+    finally:
+        leftovers = [tmp_path, archive_tmp, archive_tmp + "-journal"]
+        if unpacked:
+            leftovers += [unpacked, unpacked + "-wal", unpacked + "-shm"]
+        for leftover in leftovers:
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    # Backups de versões anteriores recebem as migrações que faltam
+    migrations.migrate()
+    return db_path
+
+
+# Últimos backups registrados, do mais recente para o mais antigo
+def recent_backups(limit=20):
+    return database.fetchall("""
+        SELECT created_at, path, duration_ms, size_bytes, compressed
+        FROM backup_log ORDER BY id DESC LIMIT ?
+    """, (limit,))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backup online do banco de dados do hospital.")
+    parser.add_argument("--banco", default=database.DB_PATH, help="arquivo do banco de dados")
+    commands = parser.add_subparsers(dest="command")
+
+    now = commands.add_parser("agora", help="faz um backup imediato para um arquivo .db")
+    now.add_argument("destino")
+
+    restore = commands.add_parser("restaurar", help="verifica e restaura um backup (.db ou .db.gz)")
+    restore.add_argument("origem")
+    restore.add_argument("--completa", action="store_true", help="usa integrity_check em vez de quick_check")
+
+    scheduled = commands.add_parser("agendar", help="gera snapshots compactados periodicamente")
+    scheduled.add_argument("--diretorio", default="backups")
+    scheduled.add_argument("--intervalo", type=float, default=DEFAULT_INTERVAL_MINUTES, help="minutos entre backups")
+    scheduled.add_argument("--manter", type=int, default=DEFAULT_KEEP, help="quantidade de snapshots mantidos")
+    args = parser.parse_args()
+
+    database.configure(args.banco)
+    migrations.migrate()
+    if args.command == "agora":
+        print(backup_to(args.destino))
+    elif args.command == "restaurar":
+        try:
+            print(restore_from(args.origem, args.completa))
+        except (RestoreError, database.DatabaseBusy) as e:
+            parser.exit(1, f"Erro: {e}\n")
+    elif args.command == "agendar":
+        scheduler = BackupScheduler(args.diretorio, args.intervalo, args.manter,
+                                    on_error=lambda e: print(f"Erro no backup: {e}"))
+        scheduler.start()
+        try:
+            while scheduler.running():
+                time.sleep(1)
+                if scheduler.last_path:
+                    print(scheduler.last_path)
+                    scheduler.last_path = None
+        except KeyboardInterrupt:
+            scheduler.stop()
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
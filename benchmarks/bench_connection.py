@@ -0,0 +1,109 @@
+# Micro-benchmark: conexão por chamada (padrão antigo) x conexão compartilhada.
+#
+# Uso:
+#   python benchmarks/bench_connection.py [--operacoes 2000]
+#
+# Cada cenário roda sobre um banco temporário próprio, com o mesmo esquema
+# da aplicação, e mede a latência de INSERT e SELECT por id.
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+SCHEMA = '''CREATE TABLE IF NOT EXISTS patients (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                age INTEGER,
+                address TEXT,
+                contact TEXT)'''
+INSERT = "INSERT INTO patients (name, age, address, contact) VALUES (?, ?, ?, ?)"
+SELECT = "SELECT * FROM patients WHERE id = ?"
+
+
+def per_call_insert(path, row):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute(INSERT, row)
+    conn.commit()
+    conn.close()
+
+
+def per_call_select(path, patient_id):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute(SELECT, (patient_id,))
+    cursor.fetchone()
+    conn.close()
+
+
+def shared_insert(path, row):
+    database.execute(INSERT, row)
+
+
+def shared_select(path, patient_id):
+    database.fetchone(SELECT, (patient_id,))
+
+
+def measure(func, path, args_list):
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(path, args)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    return {
+        "media_us": statistics.mean(latencies),
+        "p50_us": latencies[len(latencies) // 2],
+        "p99_us": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+def run(operations):
+    rows = [(f"Paciente {i}", 20 + i % 60, f"Rua {i}", f"1199999{i:04d}") for i in range(operations)]
+    ids = list(range(1, operations + 1))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        per_call_path = os.path.join(tmp, "per_call.db")
+        conn = sqlite3.connect(per_call_path)
+        conn.execute(SCHEMA)
+        conn.close()
+        results["por_chamada"] = {
+            "insert": measure(per_call_insert, per_call_path, rows),
+            "select": measure(per_call_select, per_call_path, ids),
+        }
+
+        shared_path = os.path.join(tmp, "shared.db")
+        database.configure(shared_path)
+        database.execute(SCHEMA)
+        results["compartilhada"] = {
+            "insert": measure(shared_insert, shared_path, rows),
+            "select": measure(shared_select, shared_path, ids),
+        }
+        database.close_all()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara conexão por chamada e conexão compartilhada.")
+    parser.add_argument("--operacoes", type=int, default=2000)
+    args = parser.parse_args()
+
+    results = run(args.operacoes)
+    print(f"{'cenário':<15}{'operação':<10}{'média (µs)':>12}{'p50 (µs)':>12}{'p99 (µs)':>12}")
+    for scenario, ops in results.items():
+        for op, stats in ops.items():
+            print(f"{scenario:<15}{op:<10}{stats['media_us']:>12.1f}{stats['p50_us']:>12.1f}{stats['p99_us']:>12.1f}")
+    for op in ("insert", "select"):
+        speedup = results["por_chamada"][op]["media_us"] / results["compartilhada"][op]["media_us"]
+        print(f"{op}: conexão compartilhada {speedup:.1f}x mais rápida")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Mede a abertura do programa (programa_hospital.py).
+#
+# Uso:
+#   python benchmarks/bench_startup.py [--pasta PASTA] [--repeticoes 20] [--saida resultado.json]
+#
+# Cada medição é um processo Python novo, com os .pyc já compilados:
+#   interpretador      python -c pass, a base descontada das demais
+#   importacao         import programa_hospital
+#   setup_database     migrate() num banco já na versão atual
+#   primeira_pintura   programa_hospital.py --medir-inicio, do início do
+#                      processo até a janela principal aparecer (só com tela)
+# A pasta deve conter o hospital.db a usar (padrão: um banco novo numa pasta
+# temporária); o programa abre o hospital.db do diretório atual.
+import argparse
+import compileall
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROGRAM = os.path.join(ROOT, "programa_hospital.py")
+
+REPETITIONS = 20
+
+SETUP_SCRIPT = """
+import time
+import migrations
+start = time.perf_counter()
+migrations.migrate()
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def _environment():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _run(args, folder):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *args], cwd=folder, env=_environment(),
+                            capture_output=True, text=True, check=True)
+    return (time.perf_counter() - start) * 1000, result.stdout
+
+
+def _stats(latencies):
+    latencies = sorted(latencies)
+    return {
+        "repeticoes": len(latencies),
+        "min_ms": round(latencies[0], 2),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "max_ms": round(latencies[-1], 2),
+    }
+
+
+def has_display():
+    if sys.platform in ("win32", "darwin"):
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def run(folder, repetitions):
+    compileall.compile_dir(ROOT, quiet=1)
+    # Banco na versão atual antes das medições
+    _run(["-c", "import migrations; migrations.migrate()"], folder)
+
+    baseline = [_run(["-c", "pass"], folder)[0] for _ in range(repetitions)]
+    base = statistics.median(baseline)
+    results = {"interpretador": _stats(baseline)}
+    imports = [_run(["-c", "import programa_hospital"], folder)[0] - base for _ in range(repetitions)]
+    results["importacao"] = _stats(imports)
+    results["setup_database"] = _stats([float(_run(["-c", SETUP_SCRIPT], folder)[1]) for _ in range(repetitions)])
+
+    if not has_display():
+        results["primeira_pintura"] = None
+        print("Sem tela disponível: a primeira pintura não foi medida.", file=sys.stderr)
+        return results
+    paints = []
+    phases = []
+    for _ in range(repetitions):
+        elapsed, output = _run([PROGRAM, "--medir-inicio"], folder)
+        timings = json.loads(output.strip().splitlines()[-1])
+        # Tempo do processo até a pintura: total menos o que veio depois dela
+        paints.append(elapsed - base - (timings["icones_ms"] - timings["primeira_pintura_ms"]))
+        phases.append(timings)
+    results["primeira_pintura"] = _stats(paints)
+    results["fases_ms"] = {name: round(statistics.median(timing[name] for timing in phases), 2)
+                           for name in phases[0]}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede o tempo de abertura do programa.")
+    parser.add_argument("--pasta", help="pasta com o hospital.db a usar (padrão: banco novo temporário)")
+    parser.add_argument("--repeticoes", type=int, default=REPETITIONS)
+    parser.add_argument("--saida", help="arquivo JSON com o resultado (padrão: só imprime)")
+    args = parser.parse_args()
+
+    if args.pasta:
+        results = run(args.pasta, args.repeticoes)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            results = run(tmp, args.repeticoes)
+
+    text = json.dumps({"python": sys.version.split()[0], "resultados": results}, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+# Benchmark das operações da interface sobre um banco do tamanho de produção.
+#
+# Uso:
+#   python benchmarks/bench_suite.py --escala 1m --saida resultado.json
+#   python benchmarks/bench_suite.py --banco dados.db --repeticoes 50 --comparar anterior.json
+#
+# Mede as consultas por trás de cada janela: listas paginadas de pacientes e
+# consultas (primeira página e páginas do meio), busca e sugestões de
+# pacientes, verificação de cadastro repetido e varredura do cadastro inteiro,
+# agendamento e busca de horários livres, exportação CSV, backup, restauração
+# e importação CSV de pacientes. Sem --banco, gera um banco sintético
+# (generate_data.py) numa pasta temporária. O banco informado não é alterado:
+# agendamentos rodam numa transação desfeita no fim, e a restauração e a
+# importação gravam numa cópia temporária (o backup fica registrado em
+# backup_log, como qualquer backup, e a busca de horários livres guarda o
+# cache de ocupação, como faz na interface).
+#
+# O resultado sai em JSON (versão do código, tamanho do banco e, por
+# operação, latências em ms), para comparar versões com --comparar.
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import availability  # noqa: E402
+import backup  # noqa: E402
+import database  # noqa: E402
+import duplicates  # noqa: E402
+import export  # noqa: E402
+import generate_data  # noqa: E402
+import importer  # noqa: E402
+import migrations  # noqa: E402
+import records  # noqa: E402
+import scheduling  # noqa: E402
+import search  # noqa: E402
+import services  # noqa: E402
+
+# Linhas por página das listas da interface (widgets.PagedTreeview)
+PAGE_SIZE = 100
+
+# Repetições das operações rápidas e das pesadas (varredura, exportação, backup,
+# restauração, importação)
+REPETITIONS = 30
+HEAVY_REPETITIONS = 3
+
+# Pacientes no CSV importado a cada repetição da importação
+IMPORT_ROWS = 20000
+
+# Variação (em vezes) a partir da qual --comparar aponta uma regressão
+REGRESSION_FACTOR = 1.2
+
+SEARCH_TERMS = ("Silva", "maria", "Oliveira Costa", "Rua das Flores", "Jardim", "Jo", "Ana Lima", "Campinas")
+
+
+class _Rollback(Exception):
+    pass
+
+
+# Executa func numa transação que é sempre desfeita
+def rolled_back(func, *args):
+    try:
+        with database.transaction():
+            result = func(*args)
+            raise _Rollback()
+    except _Rollback:
+        return result
+
+
+def _stats(latencies):
+    latencies = sorted(latencies)
+    return {
+        "repeticoes": len(latencies),
+        "min_ms": latencies[0],
+        "media_ms": statistics.mean(latencies),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[max(0, int(len(latencies) * 0.95) - 1)],
+        "max_ms": latencies[-1],
+    }
+
+
+# Mede func(*args()) repetitions vezes, depois de uma execução de aquecimento.
+# args é chamado a cada repetição para variar os parâmetros.
+def measure(func, args, repetitions, warmup=True):
+    if warmup:
+        func(*args())
+    latencies = []
+    for _ in range(repetitions):
+        call_args = args()
+        start = time.perf_counter()
+        func(*call_args)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return _stats(latencies)
+
+
+def database_info():
+    conn = database.get_connection()
+    counts = {table: conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0
+              for table in ("patients", "doctors", "appointments")}
+    counts["tamanho_bytes"] = os.path.getsize(database.database_path())
+    counts["versao_esquema"] = migrations.current_version()
+    return counts
+
+
+def code_version():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _future_slot(rng, patients, doctors):
+    day = date.today() + timedelta(days=rng.randint(1, 180))
+    return (rng.randint(1, patients), rng.randint(1, doctors), day.isoformat(),
+            f"{rng.randint(8, 16):02d}:{rng.choice((0, 15, 30, 45)):02d}", scheduling.DEFAULT_DURATION)
+
+
+def _book(patient_id, doctor_id, day, time, duration):
+    try:
+        scheduling.book(patient_id, doctor_id, day, time, duration)
+    except scheduling.SchedulingConflict:
+        pass
+
+
+# Verificação feita ao cadastrar, com os dados de um paciente já cadastrado
+def _check_duplicates(patient_id):
+    patient = records.get_patient(patient_id)
+    if patient is not None:
+        duplicates.find_duplicates(patient[1], patient[2], patient[4], exclude_id=patient_id)
+
+
+# CSV de pacientes novos (sem id), no formato aceito pela importação
+def write_patients_csv(path, rows, seed=1):
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(("Nome", "Idade", "Endereço", "Contato"))
+        for _, name, age, address, contact in generate_data.patient_rows(random.Random(seed), 1, rows):
+            writer.writerow((name, age, address, contact))
+
+
+def run(repetitions, heavy_repetitions, seed=1):
+    rng = random.Random(seed)
+    info = database_info()
+    patients, doctors, appointments = info["patients"], info["doctors"], info["appointments"]
+    specialties = availability.specialties()
+    patient_list = services.patient_list_query(search.PATIENT_FIELDS)
+    appointment_list = services.appointment_list_query(export.APPOINTMENT_FIELDS)
+    results = {}
+
+    results["view_patients.primeira_pagina"] = measure(
+        patient_list.first_page, lambda: (PAGE_SIZE,), repetitions)
+    results["view_patients.pagina_seguinte"] = measure(
+        patient_list.page_after, lambda: ((rng.randint(1, patients),), PAGE_SIZE), repetitions)
+    results["search_patients.busca"] = measure(
+        search.search_patients, lambda: (rng.choice(SEARCH_TERMS),), repetitions)
+    results["search_patients.sugestoes"] = measure(
+        search.patient_choices, lambda: (rng.choice(generate_data.FIRST_NAMES)[:rng.randint(2, 4)],), repetitions)
+    results["register_patient.verificar_repetidos"] = measure(
+        _check_duplicates, lambda: (rng.randint(1, patients),), repetitions)
+    results["schedule_appointment.agendar"] = measure(
+        rolled_back, lambda: (_book, *_future_slot(rng, patients, doctors)), repetitions)
+    if specialties:
+        results["schedule_appointment.horarios_livres"] = measure(
+            availability.next_free_slots, lambda: (rng.choice(specialties), 20), repetitions)
+    results["view_appointments.primeira_pagina"] = measure(
+        appointment_list.first_page, lambda: (PAGE_SIZE,), repetitions)
+    results["view_appointments.pagina_seguinte"] = measure(
+        appointment_list.page_after, lambda: ((rng.randint(1, max(appointments, 1)),), PAGE_SIZE), repetitions)
+    results["duplicate_patients.varredura"] = measure(
+        duplicates.find_clusters, lambda: (), heavy_repetitions, warmup=False)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "consultas.csv")
+        results["export_appointments_to_csv"] = measure(
+            export.export_appointments, lambda: (csv_path,), heavy_repetitions, warmup=False)
+        results["export_appointments_to_csv"]["linhas_por_s"] = appointments / (
+            results["export_appointments_to_csv"]["media_ms"] / 1000)
+
+        backup_path = os.path.join(tmp, "backup.db")
+        results["backup_database"] = measure(
+            backup.backup_to, lambda: (backup_path,), heavy_repetitions, warmup=False)
+
+        # A restauração troca o banco configurado, então grava numa cópia temporária
+        source = database.database_path()
+        database.configure(os.path.join(tmp, "restaurado.db"))
+        try:
+            results["restore_database"] = measure(
+                backup.restore_from, lambda: (backup_path,), heavy_repetitions, warmup=False)
+
+            # Cada repetição importa os mesmos pacientes de novo, como cadastros novos
+            import_path = os.path.join(tmp, "pacientes.csv")
+            write_patients_csv(import_path, IMPORT_ROWS, seed)
+            results["import_patients_csv"] = measure(
+                importer.import_csv, lambda: ("patients", import_path), heavy_repetitions, warmup=False)
+            results["import_patients_csv"]["linhas_por_s"] = IMPORT_ROWS / (
+                results["import_patients_csv"]["media_ms"] / 1000)
+        finally:
+            database.configure(source)
+    return info, results
+
+
+def compare(previous, current):
+    sizes = ("patients", "doctors", "appointments")
+    if any(previous.get("banco", {}).get(key) != current["banco"][key] for key in sizes):
+        print("Atenção: os resultados são de bancos de tamanhos diferentes.")
+    print(f"{'operação':<40}{'antes (ms)':>12}{'agora (ms)':>12}{'variação':>10}")
+    for name, stats in current["resultados"].items():
+        before = previous.get("resultados", {}).get(name)
+        if not before:
+            continue
+        ratio = stats["p50_ms"] / before["p50_ms"] if before["p50_ms"] else float("inf")
+        flag = "  REGRESSÃO" if ratio >= REGRESSION_FACTOR else ""
+        print(f"{name:<40}{before['p50_ms']:>12.2f}{stats['p50_ms']:>12.2f}{ratio:>9.2f}x{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das operações da interface.")
+    parser.add_argument("--banco", help="banco a medir (padrão: gera um sintético)")
+    parser.add_argument("--escala", choices=sorted(generate_data.SCALES), default="10k",
+                        help="tamanho do banco sintético")
+    parser.add_argument("--repeticoes", type=int, default=REPETITIONS)
+    parser.add_argument("--repeticoes-pesadas", type=int, default=HEAVY_REPETITIONS,
+                        help="repetições da varredura de repetidos, exportação, backup, restauração "
+                             "e importação")
+    parser.add_argument("--saida", help="arquivo JSON com o resultado (padrão: só imprime)")
+    parser.add_argument("--comparar", help="resultado JSON anterior para comparar")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.banco:
+            database.configure(args.banco)
+            migrations.migrate()
+        else:
+            path = os.path.join(tmp, f"sintetico-{args.escala}.db")
+            generate_data.generate(path, *generate_data.SCALES[args.escala])
+            database.configure(path)
+        info, results = run(args.repeticoes, args.repeticoes_pesadas)
+        database.close_all()
+
+    report = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "versao_codigo": code_version(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "escala": None if args.banco else args.escala,
+        "banco": info,
+        "resultados": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    print(text)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as file:
+            compare(json.load(file), report)
+
+
+if __name__ == "__main__":
+    main()
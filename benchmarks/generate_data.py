@@ -0,0 +1,227 @@
+# Gera um hospital.db sintético, com o esquema atual, no tamanho desejado.
+#
+# Uso:
+#   python benchmarks/generate_data.py dados.db --escala 1m
+#   python benchmarks/generate_data.py dados.db --pacientes 50000 --medicos 80 --consultas 300000
+#
+# Nomes, endereços e telefones seguem o padrão brasileiro. As consultas são
+# distribuídas de segunda a sexta nos períodos de atendimento de cada médico
+# (08:00-12:00 e 13:00-17:00), parte no passado e parte no futuro, sem horários
+# sobrepostos por médico ou por paciente. A mesma semente gera o mesmo banco.
+import argparse
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import migrations  # noqa: E402
+import names  # noqa: E402
+import reports  # noqa: E402
+import search  # noqa: E402
+from scheduling import from_minutes, to_minutes  # noqa: E402
+
+# Escalas prontas: (pacientes, médicos, consultas)
+SCALES = {
+    "10k": (2000, 20, 10000),
+    "100k": (20000, 60, 100000),
+    "1m": (200000, 200, 1000000),
+    "10m": (1000000, 1000, 10000000),
+}
+
+# Linhas gravadas por transação
+BATCH_SIZE = 50000
+
+# Fração dos horários de atendimento ocupados e fração das consultas já passadas
+FILL_RATE = 0.8
+PAST_SHARE = 0.7
+
+SLOT_MINUTES = 30
+PERIODS = (("08:00", "12:00"), ("13:00", "17:00"))
+# (início, fim) de cada horário de atendimento do dia
+SLOTS = [(from_minutes(minutes), from_minutes(minutes + SLOT_MINUTES))
+         for start, end in PERIODS for minutes in range(to_minutes(start), to_minutes(end), SLOT_MINUTES)]
+
+FIRST_NAMES = ("Maria", "José", "Ana", "João", "Francisca", "Antônio", "Antônia", "Francisco", "Adriana", "Carlos",
+               "Juliana", "Paulo", "Márcia", "Pedro", "Fernanda", "Lucas", "Patrícia", "Luiz", "Aline", "Marcos",
+               "Sandra", "Luís", "Camila", "Gabriel", "Amanda", "Rafael", "Bruna", "Daniel", "Jéssica", "Marcelo",
+               "Letícia", "Bruno", "Júlia", "Eduardo", "Luciana", "Felipe", "Vanessa", "Raimundo", "Mariana", "Rodrigo",
+               "Beatriz", "Gustavo", "Larissa", "Thiago", "Débora", "Matheus", "Renata", "Vinícius", "Tatiane", "Igor")
+SURNAMES = ("Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+            "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa",
+            "Rocha", "Dias", "Nascimento", "Andrade", "Moreira", "Nunes", "Marques", "Machado", "Mendes", "Freitas",
+            "Cardoso", "Ramos", "Gonçalves", "Santana", "Teixeira", "Araújo", "Conceição", "Melo", "Castro", "Pinto")
+STREET_TYPES = ("Rua", "Rua", "Rua", "Avenida", "Travessa", "Alameda", "Praça")
+STREET_NAMES = ("das Flores", "São João", "XV de Novembro", "Sete de Setembro", "Tiradentes", "Dom Pedro II",
+                "Santos Dumont", "Rui Barbosa", "Getúlio Vargas", "Marechal Deodoro", "Duque de Caxias",
+                "Castro Alves", "José Bonifácio", "Princesa Isabel", "das Palmeiras", "dos Andradas", "Paraná",
+                "Bahia", "Amazonas", "Brasil", "Independência", "Boa Vista", "do Comércio", "da Liberdade")
+NEIGHBORHOODS = ("Centro", "Jardim América", "Vila Nova", "Boa Vista", "Santa Cruz", "São José", "Bela Vista",
+                 "Jardim Paulista", "Vila Mariana", "Cidade Nova", "Industrial", "Santo Antônio", "Planalto")
+CITIES = (("São Paulo", "SP", 11), ("Rio de Janeiro", "RJ", 21), ("Belo Horizonte", "MG", 31),
+          ("Salvador", "BA", 71), ("Fortaleza", "CE", 85), ("Curitiba", "PR", 41), ("Recife", "PE", 81),
+          ("Porto Alegre", "RS", 51), ("Goiânia", "GO", 62), ("Campinas", "SP", 19), ("Belém", "PA", 91))
+SPECIALTIES = ("Clínica Geral", "Cardiologia", "Pediatria", "Ortopedia", "Dermatologia", "Ginecologia",
+               "Neurologia", "Oftalmologia", "Psiquiatria", "Endocrinologia", "Otorrinolaringologia", "Urologia")
+
+# Triggers por linha dispensáveis na geração: os dados já nascem sem
+# sobreposição, o mapa de ocupação começa vazio e os totais dos relatórios
+# são recalculados de uma vez no fim
+BULK_TRIGGERS = ("appointments_no_overlap_insert", "appointments_occupancy_insert", "appointments_reports_insert")
+
+
+def person_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)} {rng.choice(SURNAMES)}"
+
+
+def patient_rows(rng, first_id, count):
+    for patient_id in range(first_id, first_id + count):
+        city, state, area = rng.choice(CITIES)
+        address = (f"{rng.choice(STREET_TYPES)} {rng.choice(STREET_NAMES)}, {rng.randint(1, 3000)} - "
+                   f"{rng.choice(NEIGHBORHOODS)}, {city}/{state}")
+        contact = f"({area}) 9{rng.randint(1000, 9999)}-{rng.randint(0, 9999):04d}"
+        yield patient_id, person_name(rng), rng.randint(0, 99), address, contact
+
+
+def doctor_rows(rng, count):
+    for doctor_id in range(1, count + 1):
+        title = rng.choice(("Dr.", "Dra."))
+        yield doctor_id, f"{title} {person_name(rng)}", SPECIALTIES[doctor_id % len(SPECIALTIES)], "Seg-Sex 08:00-17:00"
+
+
+# Percorre os dias úteis e, em cada horário, os médicos; cada consulta recebe o
+# próximo paciente de uma permutação dos ids, então num mesmo horário nenhum
+# paciente se repete enquanto houver mais pacientes que médicos.
+def appointment_rows(rng, patients, doctors, count):
+    workdays_needed = int(count / (doctors * len(SLOTS) * FILL_RATE)) + 1
+    day = date.today() - timedelta(days=int(workdays_needed * PAST_SHARE * 7 / 5))
+    stride = next(n for n in range(patients // 2 + 1, patients + 1) if _coprime(n, patients)) if patients > 2 else 1
+    counter = 0
+    appointment_id = 0
+    while appointment_id < count:
+        if day.weekday() < 5:
+            iso_day = day.isoformat()
+            for start, end in SLOTS:
+                for doctor_id in range(1, doctors + 1):
+                    if rng.random() >= FILL_RATE:
+                        continue
+                    counter += 1
+                    appointment_id += 1
+                    yield (appointment_id, counter * stride % patients + 1, doctor_id, iso_day, start,
+                           SLOT_MINUTES, end)
+                    if appointment_id >= count:
+                        return
+        day += timedelta(days=1)
+
+
+def _coprime(a, b):
+    while b:
+        a, b = b, a % b
+    return a == 1
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Remove triggers por linha durante a carga e os recria depois com o mesmo SQL
+@contextmanager
+def without_triggers(conn, names):
+    saved = conn.execute(f"SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name IN "
+                         f"({', '.join('?' * len(names))})", names).fetchall()
+    for name in names:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    try:
+        yield
+    finally:
+        for (sql,) in saved:
+            conn.execute(sql)
+
+
+def _report(label, rows, started):
+    elapsed = time.perf_counter() - started
+    print(f"{label}: {rows} linhas em {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} linhas/s)")
+
+
+def generate(path, patients, doctors, appointments, seed=42):
+    rng = random.Random(seed)
+    database.configure(path)
+    migrations.migrate()
+
+    started = time.perf_counter()
+    for batch in _batches(patient_rows(rng, 1, patients), BATCH_SIZE):
+        with database.transaction() as conn:
+            with search.bulk_indexing(conn) as index:
+                conn.executemany("""INSERT INTO patients (id, name, age, address, contact, name_key, block_key, contact_key)
+                                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                                 [row + names.patient_keys(row[1], row[4]) for row in batch])
+                index(conn, [(row[0], row[1], row[3], row[4]) for row in batch])
+    _report("pacientes", patients, started)
+
+    started = time.perf_counter()
+    with database.transaction() as conn:
+        conn.executemany("INSERT INTO doctors (id, name, specialty, schedule, name_key) VALUES (?, ?, ?, ?, ?)",
+                         [row + (names.normalize(row[1]),) for row in doctor_rows(rng, doctors)])
+        conn.executemany("INSERT INTO doctor_availability (doctor_id, weekday, start_time, end_time) VALUES (?, ?, ?, ?)",
+                         [(doctor_id, weekday, start, end) for doctor_id in range(1, doctors + 1)
+                          for weekday in range(5) for start, end in PERIODS])
+    _report("médicos", doctors, started)
+
+    started = time.perf_counter()
+    conn = database.get_connection()
+    with without_triggers(conn, BULK_TRIGGERS):
+        for batch in _batches(appointment_rows(rng, patients, doctors, appointments), BATCH_SIZE):
+            with database.transaction() as conn:
+                conn.executemany("""
+                    INSERT INTO appointments (id, patient_id, doctor_id, date, time, duration, end_time)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, batch)
+    _report("consultas", appointments, started)
+
+    started = time.perf_counter()
+    reports.rebuild()
+    _report("totais dos relatórios", appointments, started)
+
+    database.execute("ANALYZE")
+    database.close_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um banco de dados sintético para benchmarks.")
+    parser.add_argument("destino", help="arquivo do banco a criar")
+    parser.add_argument("--escala", choices=sorted(SCALES), default="10k", help="tamanho pronto (consultas)")
+    parser.add_argument("--pacientes", type=int, help="substitui a quantidade de pacientes da escala")
+    parser.add_argument("--medicos", type=int, help="substitui a quantidade de médicos da escala")
+    parser.add_argument("--consultas", type=int, help="substitui a quantidade de consultas da escala")
+    parser.add_argument("--semente", type=int, default=42, help="semente dos dados aleatórios")
+    parser.add_argument("--substituir", action="store_true", help="apaga o destino se já existir")
+    args = parser.parse_args()
+
+    patients, doctors, appointments = SCALES[args.escala]
+    patients = args.pacientes or patients
+    doctors = args.medicos or doctors
+    appointments = args.consultas if args.consultas is not None else appointments
+    if doctors >= patients:
+        parser.error("é preciso haver mais pacientes que médicos")
+    if os.path.exists(args.destino):
+        if not args.substituir:
+            parser.error(f"{args.destino} já existe (use --substituir)")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.destino + suffix):
+                os.remove(args.destino + suffix)
+    generate(args.destino, patients, doctors, appointments, args.semente)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# Teste de carga da API HTTP (api.py) com vários postos simultâneos.
+#
+# Uso:
+#   python benchmarks/load_api.py [--clientes 32] [--requisicoes 200] [--escritas 0.2]
+#   python benchmarks/load_api.py --url http://127.0.0.1:8080 ...
+#
+# Sem --url, sobe a API numa thread sobre um banco temporário com alguns
+# pacientes e médicos. Cada cliente usa uma conexão keep-alive e mistura
+# leituras (lista, busca, sugestões, ficha) com cadastros e agendamentos,
+# na proporção de --escritas. Mede a vazão e a latência por tipo de operação.
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api  # noqa: E402
+import database  # noqa: E402
+import migrations  # noqa: E402
+
+SEED_PATIENTS = 20000
+SEED_DOCTORS = 50
+NAMES = ("Maria", "João", "Ana", "Pedro", "Fernanda", "Lucas", "Juliana", "Carlos")
+SURNAMES = ("Silva", "Santos", "Oliveira", "Souza", "Lima", "Costa", "Pereira", "Almeida")
+
+
+def seed(path):
+    database.configure(path)
+    migrations.migrate()
+    rng = random.Random(1)
+    with database.transaction() as conn:
+        conn.executemany("INSERT INTO patients (name, age, address, contact) VALUES (?, ?, ?, ?)",
+                         [(f"{rng.choice(NAMES)} {rng.choice(SURNAMES)} {rng.choice(SURNAMES)}",
+                           rng.randint(1, 99), f"Rua {i}", f"11 9{i:08d}") for i in range(SEED_PATIENTS)])
+        conn.executemany("INSERT INTO doctors (name, specialty, schedule) VALUES (?, ?, ?)",
+                         [(f"Dr {i}", "Clínica Geral", "08:00-17:00") for i in range(SEED_DOCTORS)])
+
+
+class Client:
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port)
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if data else {}
+        self.conn.request(method, path, data, headers)
+        response = self.conn.getresponse()
+        response.read()
+        return response.status
+
+
+def read_operation(client, rng):
+    kind = rng.choice(("lista", "busca", "sugestoes", "ficha"))
+    if kind == "lista":
+        status = client.request("GET", f"/api/patients?after={rng.randint(0, SEED_PATIENTS)}&limit=50")
+    elif kind == "busca":
+        status = client.request("GET", "/api/patients/search?q=" + quote(rng.choice(SURNAMES)) + "&limit=50")
+    elif kind == "sugestoes":
+        status = client.request("GET", "/api/patients/choices?q=" + quote(rng.choice(NAMES)[:3]))
+    else:
+        status = client.request("GET", f"/api/patients/{rng.randint(1, SEED_PATIENTS)}")
+    return kind, status
+
+
+def write_operation(client, rng, worker, counter):
+    if rng.random() < 0.5:
+        status = client.request("POST", "/api/patients", {
+            "name": f"Carga {worker} {counter}", "age": rng.randint(1, 99), "address": "Rua X", "contact": "11 0"})
+        return "cadastro", status
+    day = 1 + rng.randrange(28)
+    status = client.request("POST", "/api/appointments", {
+        "patient_id": rng.randint(1, SEED_PATIENTS), "doctor_id": rng.randint(1, SEED_DOCTORS),
+        "date": f"{day:02d}/{rng.randint(1, 12):02d}/2031", "time": f"{rng.randint(8, 17):02d}:{rng.choice((0, 30)):02d}"})
+    # 409 (horário já ocupado) é uma resposta esperada sob carga
+    return "agendamento", 201 if status == 409 else status
+
+
+def worker_run(url, worker, requests, write_ratio, results, errors):
+    rng = random.Random(worker)
+    client = Client(url)
+    for counter in range(requests):
+        start = time.perf_counter()
+        if rng.random() < write_ratio:
+            kind, status = write_operation(client, rng, worker, counter)
+        else:
+            kind, status = read_operation(client, rng)
+        results.setdefault(kind, []).append((time.perf_counter() - start) * 1000)
+        if status >= 400:
+            errors.append((kind, status))
+
+
+def run(url, clients, requests, write_ratio):
+    results = [{} for _ in range(clients)]
+    errors = []
+    threads = [threading.Thread(target=worker_run, args=(url, n, requests, write_ratio, results[n], errors))
+               for n in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    merged = {}
+    for result in results:
+        for kind, latencies in result.items():
+            merged.setdefault(kind, []).extend(latencies)
+    total = sum(len(latencies) for latencies in merged.values())
+    print(f"{total} requisições em {elapsed:.1f}s: {total / elapsed:.0f} req/s, {len(errors)} erros")
+    print(f"{'operação':<14}{'qtd':>8}{'média (ms)':>12}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    for kind, latencies in sorted(merged.items()):
+        latencies.sort()
+        print(f"{kind:<14}{len(latencies):>8}{statistics.mean(latencies):>12.2f}"
+              f"{latencies[len(latencies) // 2]:>12.2f}{latencies[max(0, int(len(latencies) * 0.99) - 1)]:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da API HTTP.")
+    parser.add_argument("--url", help="API já em execução (padrão: sobe uma sobre um banco temporário)")
+    parser.add_argument("--clientes", type=int, default=32)
+    parser.add_argument("--requisicoes", type=int, default=200, help="requisições por cliente")
+    parser.add_argument("--escritas", type=float, default=0.2, help="fração de requisições que gravam")
+    parser.add_argument("--threads", type=int, default=api.API_THREADS, help="threads da API temporária")
+    args = parser.parse_args()
+
+    if args.url:
+        run(args.url, args.clientes, args.requisicoes, args.escritas)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        seed(os.path.join(tmp, "carga.db"))
+        # Os clientes mantêm a conexão aberta, então cada um ocupa uma thread da API
+        server = api.APIServer(("127.0.0.1", 0), max(args.threads, args.clientes), quiet=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            run(f"http://127.0.0.1:{server.server_port}", args.clientes, args.requisicoes, args.escritas)
+        finally:
+            server.shutdown()
+            server.server_close()
+            database.close_all()
+
+
+if __name__ == "__main__":
+    main()
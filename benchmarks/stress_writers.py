@@ -0,0 +1,196 @@
+# Teste de estresse de várias estações gravando no mesmo arquivo de banco.
+#
+# Uso:
+#   python benchmarks/stress_writers.py [--processos 8] [--operacoes 300] [--pacientes 20]
+#                                       [--espera 2] [--tentativas 3] [--banco arquivo.db] [--saida resultado.json]
+#
+# Cada processo faz o papel de uma estação, com a sua conexão, e mistura
+# edições de um pequeno grupo de pacientes disputados (--pacientes), cadastros,
+# exclusões e agendamentos, pelas funções de services.py. As edições usam a
+# versão lida do paciente, então duas estações editando o mesmo registro não
+# podem sobrescrever uma à outra: a segunda recebe "alterado".
+#
+# Ao final confere que nenhuma edição se perdeu (a versão de cada paciente
+# disputado é 1 + as edições aceitas por todos os processos), a integridade
+# do arquivo e os totais dos relatórios. Sem --banco usa um banco temporário.
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import migrations  # noqa: E402
+import records  # noqa: E402
+import reports  # noqa: E402
+import scheduling  # noqa: E402
+import services  # noqa: E402
+
+PROCESSES = 8
+OPERATIONS = 300
+HOT_PATIENTS = 20
+DOCTORS = 20
+
+# Proporção de cada operação
+MIX = (("editar", 0.5), ("cadastrar", 0.2), ("agendar", 0.2), ("excluir", 0.1))
+
+
+def seed(path, hot_patients):
+    database.configure(path)
+    migrations.migrate()
+    with database.transaction() as conn:
+        conn.executemany("INSERT INTO patients (name, age, address, contact) VALUES (?, ?, ?, ?)",
+                         [(f"Paciente Disputado {i}", 40, f"Rua {i}", f"11 9{i:08d}") for i in range(hot_patients)])
+        conn.executemany("INSERT INTO doctors (name, specialty, schedule) VALUES (?, ?, ?)",
+                         [(f"Dr {i}", "Clínica Geral", "08:00-17:00") for i in range(DOCTORS)])
+    hot = [row[0] for row in database.fetchall("SELECT id FROM patients ORDER BY id")]
+    doctors = [row[0] for row in database.fetchall("SELECT id FROM doctors ORDER BY id")]
+    database.close_all()
+    return hot, doctors
+
+
+def _edit(rng, hot, created, doctors, updates):
+    patient_id = rng.choice(hot)
+    patient = services.get_patient(patient_id)
+    # Intervalo entre abrir a ficha e salvar, em que outra estação pode gravar
+    time.sleep(rng.uniform(0, 0.005))
+    services.update_patient(patient_id, patient[1], rng.randint(1, 99), patient[3], patient[4], patient[5])
+    updates[patient_id] += 1
+
+
+def _create(rng, hot, created, doctors, updates):
+    created.append(services.create_patient(f"Paciente Novo {rng.randint(1, 10 ** 6)}", rng.randint(1, 99),
+                                           "Rua Nova", "11 90000-0000"))
+
+
+def _schedule(rng, hot, created, doctors, updates):
+    day = rng.randint(1, 28)
+    hour, minute = rng.randint(8, 16), rng.choice((0, 30))
+    services.schedule_appointment(rng.choice(hot), rng.choice(doctors), f"{day:02d}/03/2031", f"{hour:02d}:{minute:02d}")
+
+
+def _delete(rng, hot, created, doctors, updates):
+    if not created:
+        return _create(rng, hot, created, doctors, updates)
+    patient_id = created.pop()
+    services.delete_patient(patient_id, services.get_patient(patient_id)[5])
+
+
+OPERATION_FUNCTIONS = {"editar": _edit, "cadastrar": _create, "agendar": _schedule, "excluir": _delete}
+
+
+# Uma estação: devolve (resultados por tipo, edições aceitas por paciente, latências em ms)
+def worker(path, index, operations, hot, doctors, timeout, retries, start_at):
+    database.configure(path)
+    database.configure_busy(timeout, retries)
+    rng = random.Random(index)
+    names, weights = zip(*MIX)
+    results = collections.Counter()
+    updates = collections.Counter()
+    latencies = []
+    created = []
+    time.sleep(max(0.0, start_at - time.time()))
+    for _ in range(operations):
+        name = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            OPERATION_FUNCTIONS[name](rng, hot, created, doctors, updates)
+            results["ok"] += 1
+        except records.StaleRecord:
+            results["alterado"] += 1
+        except scheduling.SchedulingConflict:
+            results["conflito_horario"] += 1
+        except database.DatabaseBusy:
+            results["ocupado"] += 1
+        except sqlite3.Error as e:
+            results[f"erro: {e}"] += 1
+        latencies.append((time.perf_counter() - start) * 1000)
+    database.close_all()
+    return dict(results), dict(updates), latencies
+
+
+def check(path, hot, updates):
+    database.configure(path)
+    lost = 0
+    for patient_id in hot:
+        version = database.fetchone("SELECT version FROM patients WHERE id = ?", (patient_id,))[0]
+        lost += abs(version - 1 - updates.get(patient_id, 0))
+    integrity = database.fetchone("PRAGMA integrity_check")[0]
+    totals = reports.verify()
+    database.close_all()
+    return {"edicoes_perdidas": lost, "integridade": integrity, "totais_divergentes": totals}
+
+
+def run(path, processes, operations, hot_patients, timeout, retries):
+    hot, doctors = seed(path, hot_patients)
+    start_at = time.time() + 1.0
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes) as pool:
+        jobs = [pool.apply_async(worker, (path, index, operations, hot, doctors, timeout, retries, start_at))
+                for index in range(processes)]
+        outcomes = [job.get() for job in jobs]
+    elapsed = time.time() - start_at
+
+    results = collections.Counter()
+    updates = collections.Counter()
+    latencies = []
+    for worker_results, worker_updates, worker_latencies in outcomes:
+        results.update(worker_results)
+        updates.update({int(key): value for key, value in worker_updates.items()})
+        latencies.extend(worker_latencies)
+    latencies.sort()
+    total = processes * operations
+    return {
+        "processos": processes,
+        "operacoes": total,
+        "duracao_s": round(elapsed, 2),
+        "operacoes_por_s": round(total / elapsed, 1),
+        "resultados": dict(results),
+        "latencia_ms": {
+            "p50": round(statistics.median(latencies), 2),
+            "p95": round(latencies[int(len(latencies) * 0.95)], 2),
+            "max": round(latencies[-1], 2),
+        },
+        "conferencia": check(path, hot, updates),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Várias estações gravando no mesmo banco ao mesmo tempo.")
+    parser.add_argument("--processos", type=int, default=PROCESSES)
+    parser.add_argument("--operacoes", type=int, default=OPERATIONS, help="operações por processo")
+    parser.add_argument("--pacientes", type=int, default=HOT_PATIENTS, help="pacientes editados por todos")
+    parser.add_argument("--espera", type=float, default=database.BUSY_TIMEOUT, help="busy timeout em segundos")
+    parser.add_argument("--tentativas", type=int, default=database.BUSY_RETRIES)
+    parser.add_argument("--banco", help="arquivo novo onde rodar o teste (padrão: temporário)")
+    parser.add_argument("--saida", help="arquivo JSON com o resultado (padrão: só imprime)")
+    args = parser.parse_args()
+
+    def measure(path):
+        return run(path, args.processos, args.operacoes, args.pacientes, args.espera, args.tentativas)
+
+    if args.banco:
+        results = measure(args.banco)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            results = measure(os.path.join(tmp, "estresse.db"))
+
+    text = json.dumps({"python": sys.version.split()[0], "resultados": results}, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    print(text)
+    if results["conferencia"]["edicoes_perdidas"] or results["conferencia"]["integridade"] != "ok":
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
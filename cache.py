@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+
+import database
+
+# Cache em memória (LRU) das leituras de cadastros, que mudam pouco e são
+# lidos com frequência.
+#
+# Cada cache pertence a uma tabela. As gravações feitas pelo próprio sistema
+# chamam invalidate(tabela, id) logo depois de gravar. Dentro de uma transação
+# o registro é descartado na hora e de novo depois do COMMIT (ou do ROLLBACK):
+# até o COMMIT, outra conexão ainda lê a linha antiga e poderia devolvê-la ao
+# cache, e a própria thread que grava poderia guardar uma linha que o ROLLBACK
+# desfaz. Gravações de outras conexões (outra estação, importação, backup
+# restaurado) são percebidas por PRAGMA data_version: quando o valor muda na
+# conexão da thread, todos os caches são esvaziados antes da próxima leitura.
+
+# Intervalo mínimo entre duas consultas a data_version na mesma thread, em
+# segundos. A consulta custa quase o mesmo que ler o registro pela chave, então
+# fazê-la a cada acerto anularia o ganho do cache.
+VERSION_CHECK_INTERVAL = 0.05
+
+_caches = []
+_local = threading.local()
+
+
+class LRUCache:
+    # keyed=False: o cache guarda valores derivados da tabela inteira
+    # (ex.: lista de especialidades) e qualquer gravação o esvazia.
+    def __init__(self, table, maxsize, keyed=True):
+        self.table = table
+        self.maxsize = maxsize
+        self.keyed = keyed
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        _caches.append(self)
+
+    # Devolve o valor de key, chamando load(key) no banco se não estiver em
+    # cache. Valores None (registro inexistente) não são guardados.
+    def get(self, key, load):
+        _check_external_changes()
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            generation = self._generation
+        value = load(key)
+        if value is not None:
+            with self._lock:
+                # Se houve invalidação durante a leitura, o valor pode estar velho
+                if generation == self._generation:
+                    self._data[key] = value
+                    if len(self._data) > self.maxsize:
+                        self._data.popitem(last=False)
+        return value
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"table": self.table, "size": len(self._data), "maxsize": self.maxsize,
+                    "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / total if total else 0.0}
+
+
+# Descarta o registro key da tabela em todos os caches (ou a tabela inteira, sem key)
+def invalidate(table, key=None):
+    _discard(table, key)
+    if database.get_connection().in_transaction:
+        pending = getattr(_local, "pending", None)
+        if pending is None:
+            pending = _local.pending = []
+        pending.append((table, key))
+
+
+def _discard(table, key):
+    for cache in _caches:
+        if cache.table == table:
+            if key is None or not cache.keyed:
+                cache.clear()
+            else:
+                cache.discard(key)
+
+
+def clear_all():
+    for cache in _caches:
+        cache.clear()
+
+
+# Repete as invalidações da transação que terminou, quando as outras conexões
+# já enxergam o resultado final
+def _transaction_ended():
+    pending = getattr(_local, "pending", None)
+    if pending:
+        _local.pending = None
+        for table, key in pending:
+            _discard(table, key)
+
+
+database.add_transaction_hooks(_transaction_ended, _transaction_ended)
+database.add_reset_hook(clear_all)
+
+
+# data_version só muda quando outra conexão grava. A primeira leitura numa
+# conexão nova também esvazia os caches, pois não há valor anterior para comparar.
+def _check_external_changes():
+    now = time.monotonic()
+    conn = database.get_connection()
+    if getattr(_local, "conn", None) is conn and now - _local.checked_at < VERSION_CHECK_INTERVAL:
+        return
+    version = conn.execute("PRAGMA data_version").fetchone()[0]
+    if getattr(_local, "conn", None) is not conn or _local.version != version:
+        clear_all()
+        _local.conn = conn
+        _local.version = version
+    _local.checked_at = now
+
+
+# Contadores de todos os caches, para diagnóstico
+def stats():
+    return [cache.stats() for cache in _caches]
@@ -0,0 +1,269 @@
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import instrumentation
+import names
+
+# Arquivo de banco de dados padrão do sistema
+DB_PATH = "hospital.db"
+
+# Pragmas aplicados em toda conexão aberta pelo sistema
+PRAGMAS = (
+    ("journal_mode", "WAL"),      # Leitores não bloqueiam o escritor
+    ("synchronous", "NORMAL"),    # Seguro com WAL e bem mais rápido que FULL
+    ("cache_size", -32000),       # Cache de páginas de ~32 MB (negativo = KiB)
+    ("mmap_size", 268435456),     # Até 256 MB lidos via memória mapeada
+    ("temp_store", "MEMORY"),     # Tabelas temporárias e ordenações em memória
+)
+
+# Quantidade de comandos preparados mantidos em cache por conexão
+STATEMENT_CACHE_SIZE = 256
+
+# Banco compartilhado por várias estações (ou processos): segundos que uma
+# conexão espera o outro escritor liberar o banco (busy timeout) e quantas
+# vezes BEGIN IMMEDIATE é tentado de novo depois disso, com esperas
+# aleatórias crescentes a partir de BUSY_RETRY_DELAY segundos
+BUSY_TIMEOUT = 2.0
+BUSY_RETRIES = 3
+BUSY_RETRY_DELAY = 0.05
+
+_db_path = DB_PATH
+_busy_timeout = BUSY_TIMEOUT
+_busy_retries = BUSY_RETRIES
+_local = threading.local()
+_lock = threading.Lock()
+_write_lock = threading.RLock()
+_connections = set()
+_generation = 0
+_reset_hooks = []
+_commit_hooks = []
+_rollback_hooks = []
+
+
+class DatabaseBusy(sqlite3.OperationalError):
+    pass
+
+
+# Troca o arquivo de banco usado pelo sistema (benchmarks, testes, restauração)
+def configure(path):
+    global _db_path
+    close_all()
+    _db_path = path
+
+
+# Ajusta a espera por outro escritor (segundos) e as novas tentativas;
+# vale para as conexões abertas depois da chamada
+def configure_busy(timeout=None, retries=None):
+    global _busy_timeout, _busy_retries
+    if timeout is not None:
+        _busy_timeout = timeout
+    if retries is not None:
+        _busy_retries = retries
+
+
+def database_path():
+    return _db_path
+
+
+# Abre uma conexão nova já ajustada com os pragmas de desempenho.
+# As conexões ficam em modo autocommit; transações são abertas com transaction().
+# Os comandos são medidos pela instrumentação (instrumentation.py).
+def connect(path=None):
+    conn = sqlite3.connect(path or _db_path,
+                           timeout=_busy_timeout,
+                           isolation_level=None,
+                           check_same_thread=False,
+                           cached_statements=STATEMENT_CACHE_SIZE,
+                           factory=instrumentation.InstrumentedConnection)
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name} = {value}")
+    register_functions(conn)
+    return conn
+
+
+# Funções SQL usadas pelo esquema (colunas calculadas name_key, block_key e
+# contact_key); toda conexão que grava essas tabelas, inclusive as abertas
+# fora deste módulo, precisa delas
+def register_functions(conn):
+    conn.create_function(names.SQL_FUNCTION, 1, names.normalize, deterministic=True)
+    conn.create_function(names.SQL_BLOCK_FUNCTION, 1, names.block, deterministic=True)
+    conn.create_function(names.SQL_CONTACT_FUNCTION, 1, names.contact_digits, deterministic=True)
+
+
+# Retorna a conexão de longa duração da thread atual, abrindo-a na primeira chamada
+def get_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.generation != _generation:
+        conn = connect()
+        with _lock:
+            _connections.add(conn)
+        _local.conn = conn
+        _local.generation = _generation
+    return conn
+
+
+# Fecha a conexão da thread atual (threads de vida curta devem chamar ao terminar)
+def close_thread_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        return
+    _local.conn = None
+    with _lock:
+        if conn not in _connections:
+            return  # Já fechada por close_all()
+        _connections.discard(conn)
+    conn.close()
+
+
+# Registra uma função chamada sempre que as conexões são fechadas por
+# close_all() (troca ou restauração do banco); usada para limpar caches.
+def add_reset_hook(func):
+    _reset_hooks.append(func)
+
+
+# Registra funções chamadas na thread que gravou logo depois do COMMIT e do
+# ROLLBACK da transação mais externa; usadas pelos avisos de alteração (events.py)
+def add_transaction_hooks(on_commit, on_rollback):
+    _commit_hooks.append(on_commit)
+    _rollback_hooks.append(on_rollback)
+
+
+# Fecha todas as conexões abertas; a próxima chamada a get_connection() reabre
+def close_all():
+    global _generation
+    with _lock:
+        _generation += 1
+        connections = list(_connections)
+        _connections.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    for func in _reset_hooks:
+        func()
+
+
+# Acesso exclusivo ao arquivo do banco durante o bloco, para substituí-lo
+# (restauração). Espera as transações das outras threads terminarem e fecha
+# a conexão da thread atual; as conexões das outras threads não são fechadas
+# por aqui, pois podem estar no meio de um comando. Em seguida tira o banco do
+# modo WAL, o que o SQLite só permite quando nenhuma outra conexão, deste ou
+# de outro processo, está aberta (e que já apaga os arquivos -wal e -shm).
+# others são outros arquivos do banco (o arquivo de consultas antigas), que
+# passam pelo mesmo processo depois do principal. Se houver alguma conexão,
+# lança DatabaseBusy sem tocar no banco. Ao sair, as conexões abertas
+# durante o bloco são descartadas e os caches limpos.
+@contextmanager
+def exclusive_access(*others):
+    with _write_lock:
+        close_thread_connection()
+        for path in (_db_path, *others):
+            if not _leave_wal(path):
+                raise DatabaseBusy("O banco de dados está aberto em outra tarefa ou estação. "
+                                   "Tente novamente quando ela terminar.")
+        try:
+            yield
+        finally:
+            close_all()
+
+
+# Tira o arquivo do modo WAL; False se outra conexão o tiver aberto
+def _leave_wal(path):
+    conn = sqlite3.connect(path, timeout=0, isolation_level=None)
+    try:
+        return conn.execute("PRAGMA journal_mode = DELETE").fetchone()[0] == "delete"
+    except sqlite3.OperationalError as e:
+        if not _is_busy(e):
+            raise
+        return False
+    finally:
+        conn.close()
+
+
+def _is_busy(error):
+    return "locked" in str(error) or "busy" in str(error)
+
+
+# Abre a transação de escrita. Outro processo gravando faz o SQLite esperar
+# até o busy timeout; se ainda assim o banco estiver ocupado, tenta de novo
+# depois de uma espera aleatória (para que as estações não voltem todas ao
+# mesmo tempo) e, esgotadas as tentativas, lança DatabaseBusy. Com
+# wait=False tenta uma única vez, sem esperar.
+def _begin(conn, wait=True):
+    if not wait:
+        previous = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+        conn.execute("PRAGMA busy_timeout = 0")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e):
+                raise
+            raise DatabaseBusy("O banco de dados está ocupado por outra estação.")
+        finally:
+            conn.execute(f"PRAGMA busy_timeout = {previous}")
+    for attempt in range(_busy_retries + 1):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e):
+                raise
+        if attempt < _busy_retries:
+            time.sleep(random.uniform(0, BUSY_RETRY_DELAY * 2 ** attempt))
+    raise DatabaseBusy("O banco de dados está ocupado por outra estação. Tente novamente em instantes.")
+
+
+# Executa um bloco dentro de uma transação de escrita (BEGIN IMMEDIATE).
+# Blocos aninhados participam da transação mais externa. As threads do
+# processo esperam a vez numa trava em vez de disputar o arquivo: o SQLite
+# resolveria a disputa com esperas e novas tentativas (busy timeout), o que
+# com muitas threads gravando ao mesmo tempo (a API HTTP) custa bem mais.
+# Entre processos a disputa fica com o busy timeout e _begin().
+# Com wait=False, para gravações dispensáveis (caches preenchidos por uma
+# leitura), lança DatabaseBusy na hora se outra thread ou estação estiver
+# gravando, em vez de esperar a vez.
+@contextmanager
+def transaction(wait=True):
+    conn = get_connection()
+    if conn.in_transaction:
+        yield conn
+        return
+    if not _write_lock.acquire(blocking=wait):
+        raise DatabaseBusy("O banco de dados está ocupado por outra tarefa.")
+    try:
+        _begin(conn, wait)
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            # Um COMMIT que falha (banco ocupado) também desfaz a transação
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for func in _rollback_hooks:
+                func()
+            raise
+    finally:
+        _write_lock.release()
+    for func in _commit_hooks:
+        func()
+
+
+def execute(sql, params=()):
+    return get_connection().execute(sql, params)
+
+
+def executemany(sql, seq_of_params):
+    return get_connection().executemany(sql, seq_of_params)
+
+
+def fetchone(sql, params=()):
+    return get_connection().execute(sql, params).fetchone()
+
+
+def fetchall(sql, params=()):
+    return get_connection().execute(sql, params).fetchall()
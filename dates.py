@@ -0,0 +1,33 @@
+from datetime import datetime
+
+# As datas das consultas ficam gravadas no banco em ISO-8601 (AAAA-MM-DD),
+# que ordena e compara corretamente como texto e aproveita os índices.
+# Na interface elas continuam sendo digitadas e exibidas como DD/MM/AAAA.
+
+BR_DATE = "%d/%m/%Y"
+ISO_DATE = "%Y-%m-%d"
+
+# Expressão SQL que exibe appointments.date como DD/MM/AAAA
+SQL_BR_DATE = "COALESCE(strftime('%d/%m/%Y', appointments.date), appointments.date)"
+
+
+# "25/12/2024" -> "2024-12-25"; lança ValueError se a data for inválida
+def to_iso(text):
+    return datetime.strptime(text.strip(), BR_DATE).strftime(ISO_DATE)
+
+
+# "2024-12-25" -> "25/12/2024"; valores fora do padrão são devolvidos como estão
+def to_br(value):
+    try:
+        return datetime.strptime(value, ISO_DATE).strftime(BR_DATE)
+    except (TypeError, ValueError):
+        return value
+
+
+# Confere se a hora está no formato HH:MM (00:00 a 23:59)
+def is_valid_time(text):
+    try:
+        datetime.strptime(text, "%H:%M")
+    except ValueError:
+        return False
+    return len(text) == 5
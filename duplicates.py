@@ -0,0 +1,351 @@
+import argparse
+import collections
+import sys
+import time
+
+import archive
+import cache
+import database
+import dates
+import events
+import export
+import migrations
+import names
+import records
+import scheduling
+
+# Pacientes cadastrados mais de uma vez.
+#
+# Dois cadastros parecem ser o mesmo paciente quando os nomes são parecidos
+# (names.similarity das chaves sem acento) e, além disso, as idades são
+# próximas ou o contato é o mesmo. CPFs diferentes separam sempre; o mesmo CPF
+# não chega a existir duas vezes (índice único).
+#
+# Comparar cada cadastro com todos os outros seria quadrático, então as
+# comparações ficam dentro de blocos (migração 15): block_key, o início do
+# primeiro e do último nome, junto com a faixa de idade, e contact_key, os
+# últimos dígitos do contato. A verificação do cadastro faz no máximo três
+# buscas nesses índices (CPF, contato e bloco com a idade). A varredura do
+# cadastro inteiro percorre os dois índices em ordem e compara cada cadastro
+# só com os anteriores do mesmo bloco (no máximo SCAN_WINDOW), então o tempo
+# cresce linearmente com o número de pacientes; os pares encontrados são
+# juntados em grupos.
+#
+# Erros de digitação no começo do primeiro e do último nome mudam o bloco: o
+# cadastro ainda é achado pelo contato, não pelo nome.
+
+# Diferença máxima de idade entre dois cadastros do mesmo paciente
+AGE_BAND = 2
+
+# Semelhança mínima dos nomes com idades próximas, e com o mesmo contato
+NAME_SIMILARITY = 0.65
+CONTACT_NAME_SIMILARITY = 0.55
+
+# Cadastros lidos por busca na verificação de um cadastro novo
+BLOCK_LIMIT = 200
+
+# Possíveis repetidos devolvidos na verificação de um cadastro
+DUPLICATE_LIMIT = 10
+
+# Cadastros anteriores do mesmo bloco comparados a cada linha na varredura
+SCAN_WINDOW = 50
+
+# Cadastros no maior grupo formado pela varredura (ver find_clusters)
+CLUSTER_LIMIT = 20
+
+# Linhas lidas do cursor por vez na varredura
+SCAN_CHUNK_SIZE = 5000
+
+# Grupos descritos por review() (a varredura conta todos)
+REVIEW_LIMIT = 500
+
+# Campos dos cadastros devolvidos: os de records.PATIENT_FIELDS sem a versão
+# (describe acrescenta as consultas do paciente, de report_patient_visits)
+CANDIDATE_FIELDS = ("id", "name", "age", "address", "contact", "cpf")
+
+
+class ScanCancelled(Exception):
+    pass
+
+
+# Semelhança mínima dos nomes para dois cadastros serem o mesmo paciente, ou
+# None se nem o contato nem a idade os aproximam
+def _threshold(age, contact_key, other_age, other_contact_key):
+    if contact_key is not None and contact_key == other_contact_key:
+        return CONTACT_NAME_SIMILARITY
+    if age is not None and other_age is not None and abs(age - other_age) <= AGE_BAND:
+        return NAME_SIMILARITY
+    return None
+
+
+# Cadastros que parecem ser o paciente com estes dados (já validados), do
+# mais para o menos parecido: [(id, nome, idade, endereço, contato, cpf)].
+# exclude_id deixa de fora o próprio cadastro, na edição.
+def find_duplicates(name, age, contact, cpf=None, exclude_id=None, limit=DUPLICATE_LIMIT):
+    key, contact_key, block = names.normalize(name), names.contact_digits(contact), names.block(name)
+    lookups = []
+    if cpf:
+        lookups.append(("cpf = ?", (cpf,)))
+    if contact_key:
+        lookups.append(("contact_key = ?", (contact_key,)))
+    if block:
+        lookups.append(("block_key = ? AND age BETWEEN ? AND ?", (block, age - AGE_BAND, age + AGE_BAND)))
+    rows = {}
+    for where, params in lookups:
+        for row in database.fetchall(f"""
+                SELECT {', '.join(CANDIDATE_FIELDS)}, name_key, contact_key FROM patients
+                WHERE {where} LIMIT ?""", params + (BLOCK_LIMIT,)):
+            rows.setdefault(row[0], row)
+    rows.pop(exclude_id, None)
+    found = []
+    for row in rows.values():
+        if cpf and row[5]:
+            similarity = 1.0 if cpf == row[5] else None
+        else:
+            threshold = _threshold(age, contact_key, row[2], row[7])
+            similarity = None if threshold is None else names.similarity(key, row[6] or "")
+            if similarity is not None and similarity < threshold:
+                similarity = None
+        if similarity is not None:
+            found.append((-similarity, row[0], row[:6]))
+    found.sort()
+    return [row for _, _, row in found[:limit]]
+
+
+# Grupos de cadastros que parecem ser o mesmo paciente, cada um com os ids em
+# ordem, ordenados pelo primeiro id. progress (export.ExportProgress) conta as
+# linhas lidas nas duas passadas, e stop() interrompe (ScanCancelled).
+#
+# Na passada pelo contato todos os cadastros de um bloco têm o mesmo contato,
+# e na passada pelo nome as idades da janela estão dentro de AGE_BAND, então
+# o resultado da comparação só depende do nome e do CPF. Cada cadastro é
+# comparado uma vez com cada par (nome, CPF) da janela, pelo seu cadastro
+# mais recente: os anteriores com o mesmo nome já foram unidos a ele.
+#
+# Os pares encontrados formam grupos por união (A com B e B com C: A, B e C).
+# Nos nomes muito comuns, esse encadeamento juntaria centenas de pessoas
+# diferentes, então um grupo não passa de CLUSTER_LIMIT cadastros: o par que
+# passaria do limite fica de fora.
+def find_clusters(progress=None):
+    progress = progress or export.ExportProgress()
+    parent, size = {}, {}
+
+    def root(patient_id):
+        parent.setdefault(patient_id, patient_id)
+        while parent[patient_id] != patient_id:
+            parent[patient_id] = parent[parent[patient_id]]
+            patient_id = parent[patient_id]
+        return patient_id
+
+    def join(patient_id, other_id):
+        first, second = root(patient_id), root(other_id)
+        if first == second or size.get(first, 1) + size.get(second, 1) > CLUSTER_LIMIT:
+            return
+        if size.get(first, 1) < size.get(second, 1):
+            first, second = second, first
+        parent[second] = first
+        size[first] = size.get(first, 1) + size.pop(second, 1)
+
+    passes = (("contact_key", "contact_key IS NOT NULL ORDER BY contact_key", None, CONTACT_NAME_SIMILARITY),
+              ("block_key", "block_key IS NOT NULL AND age IS NOT NULL ORDER BY block_key, age", AGE_BAND,
+               NAME_SIMILARITY))
+    conn = database.get_connection()
+    for column, where, band, threshold in passes:
+        cursor = conn.execute(f"SELECT id, name_key, cpf, age, {column} FROM patients WHERE {where}")
+        try:
+            # Janela: (nome, cpf, idade) em ordem de chegada; latest: (nome, cpf) ->
+            # [cadastro mais recente, quantos na janela]
+            window, latest, known = collections.deque(), {}, {}
+            block = None
+            while True:
+                rows = cursor.fetchmany(SCAN_CHUNK_SIZE)
+                if not rows:
+                    break
+                for patient_id, key, cpf, age, block_key in rows:
+                    if block_key != block:
+                        window.clear()
+                        latest.clear()
+                        known.clear()
+                        block = block_key
+                    while window and (len(window) >= SCAN_WINDOW or band is not None and age - window[0][2] > band):
+                        group = window.popleft()[:2]
+                        latest[group][1] -= 1
+                        if not latest[group][1]:
+                            del latest[group]
+                    key = key or ""
+                    # Semelhanças já calculadas com este nome (os nomes se repetem no bloco)
+                    similarities = known.setdefault(key, {})
+                    for (other_key, other_cpf), (other_id, _) in latest.items():
+                        if cpf and other_cpf and cpf != other_cpf:
+                            continue
+                        similarity = similarities.get(other_key)
+                        if similarity is None:
+                            similarity = similarities[other_key] = names.similarity(key, other_key)
+                        if similarity >= threshold:
+                            join(patient_id, other_id)
+                    group = (key, cpf)
+                    if group in latest:
+                        latest[group][0] = patient_id
+                        latest[group][1] += 1
+                    else:
+                        latest[group] = [patient_id, 1]
+                    window.append((key, cpf, age))
+                progress.rows += len(rows)
+                progress.elapsed = time.perf_counter() - progress.started
+                if progress.stopped():
+                    raise ScanCancelled()
+        finally:
+            cursor.close()
+    groups = collections.defaultdict(list)
+    for patient_id in parent:
+        groups[root(patient_id)].append(patient_id)
+    progress.elapsed = time.perf_counter() - progress.started
+    return sorted(sorted(group) for group in groups.values() if len(group) > 1)
+
+
+# Cadastros de cada grupo, na ordem dos ids:
+# [[(id, nome, idade, endereço, contato, cpf, consultas)]]
+def describe(clusters):
+    ids = [patient_id for cluster in clusters for patient_id in cluster]
+    rows = {}
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        for row in database.fetchall(f"""
+                SELECT {', '.join('p.' + field for field in CANDIDATE_FIELDS)}, COALESCE(r.visits, 0)
+                FROM patients p LEFT JOIN report_patient_visits r ON r.patient_id = p.id
+                WHERE p.id IN ({', '.join('?' * len(chunk))})""", chunk):
+            rows[row[0]] = row
+    # Cadastros excluídos depois da varredura saem do grupo
+    groups = [[rows[patient_id] for patient_id in cluster if patient_id in rows] for cluster in clusters]
+    return [group for group in groups if len(group) > 1]
+
+
+# Varre o cadastro e descreve os primeiros limit grupos: (total de grupos, grupos)
+def review(progress=None, limit=REVIEW_LIMIT):
+    clusters = find_clusters(progress)
+    return len(clusters), describe(clusters[:limit])
+
+
+# Passa as consultas arquivadas de remove_ids para keep_id numa transação
+# própria: em WAL o COMMIT não é atômico entre arquivos anexados (ver
+# archive.py). conn é a conexão com o arquivo anexado (None sem arquivo).
+# Devolve [(id da consulta, paciente anterior)] para desfazer.
+def _repoint_archived(conn, keep_id, remove_ids):
+    if conn is None:
+        return []
+    marks = ", ".join("?" * len(remove_ids))
+    with database.transaction():
+        moved = conn.execute(f"""SELECT id, patient_id FROM archive.archived_appointments
+                                 WHERE patient_id IN ({marks})""", remove_ids).fetchall()
+        conn.execute(f"UPDATE archive.archived_appointments SET patient_id = ? WHERE patient_id IN ({marks})",
+                     (keep_id, *remove_ids))
+    return moved
+
+
+# Junta os cadastros remove_ids ao cadastro keep_id: as consultas, ativas e
+# arquivadas, e os totais dos relatórios passam para keep_id, que recebe o
+# CPF de um dos outros se não tinha, e os outros são excluídos. Duas consultas
+# no mesmo horário impedem a junção (scheduling.SchedulingConflict): uma delas
+# precisa ser excluída antes. Devolve quantas consultas mudaram de cadastro.
+#
+# As arquivadas mudam primeiro e voltam se a junção falhar; se o programa cair
+# entre as duas transações, o histórico já aparece no cadastro que fica e
+# repetir a junção conclui o resto.
+def merge_patients(keep_id, remove_ids):
+    keep_id = int(keep_id)
+    remove_ids = sorted({int(patient_id) for patient_id in remove_ids} - {keep_id})
+    if not remove_ids:
+        raise ValueError("Escolha ao menos um cadastro para juntar ao que fica.")
+    marks = ", ".join("?" * len(remove_ids))
+    with archive.attached(create=False) as archive_conn:
+        archived = _repoint_archived(archive_conn, keep_id, remove_ids)
+        try:
+            with database.transaction() as conn:
+                keep = conn.execute("SELECT cpf FROM patients WHERE id = ?", (keep_id,)).fetchone()
+                if keep is None:
+                    raise ValueError("O cadastro que ficaria foi excluído.")
+                removed = conn.execute(f"SELECT id, cpf FROM patients WHERE id IN ({marks})", remove_ids).fetchall()
+                appointments = conn.execute(f"""SELECT id, date, time, end_time FROM appointments
+                                                WHERE patient_id IN ({marks}) ORDER BY date, time""",
+                                            remove_ids).fetchall()
+                # Os triggers também recusariam a sobreposição; a verificação antes dá a data na mensagem
+                for appointment_id, day, start, end in appointments:
+                    if end is not None and scheduling.find_conflict(conn, "patient_id", keep_id, day, start, end):
+                        raise scheduling.SchedulingConflict(
+                            f"Os cadastros têm consultas no mesmo horário em {dates.to_br(day)}, às {start}. "
+                            "Exclua uma delas antes de juntar os cadastros.")
+                    conn.execute("UPDATE appointments SET patient_id = ?, version = version + 1 WHERE id = ?",
+                                 (keep_id, appointment_id))
+                # Os triggers dos totais já passaram as consultas ativas; o que
+                # sobra nos cadastros excluídos são as arquivadas
+                visits, last_date, archived_last_date = conn.execute(f"""
+                    SELECT SUM(visits), MAX(last_date), MAX(archived_last_date)
+                    FROM report_patient_visits WHERE patient_id IN ({marks})""", remove_ids).fetchone()
+                if visits:
+                    conn.execute("""
+                        INSERT INTO report_patient_visits (patient_id, visits, last_date, archived_last_date)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT (patient_id) DO UPDATE SET
+                            visits = visits + excluded.visits,
+                            last_date = NULLIF(MAX(COALESCE(last_date, ''), COALESCE(excluded.last_date, '')), ''),
+                            archived_last_date = NULLIF(MAX(COALESCE(archived_last_date, ''),
+                                                            COALESCE(excluded.archived_last_date, '')), '')
+                    """, (keep_id, visits, last_date, archived_last_date))
+                    conn.execute(f"DELETE FROM report_patient_visits WHERE patient_id IN ({marks})", remove_ids)
+                for patient_id, _ in removed:
+                    records.delete_patient(patient_id)
+                cpf = next((cpf for _, cpf in removed if cpf), None)
+                if keep[0] is None and cpf is not None:
+                    conn.execute("UPDATE patients SET cpf = ?, version = version + 1 WHERE id = ?", (cpf, keep_id))
+                    cache.invalidate("patients", keep_id)
+                    events.publish("patients", keep_id, events.UPDATE)
+                if appointments:
+                    events.publish("appointments", None, events.RELOAD)
+        except BaseException:
+            if archived:
+                with database.transaction() as conn:
+                    conn.executemany("UPDATE archive.archived_appointments SET patient_id = ? WHERE id = ?",
+                                     [(patient_id, appointment_id) for appointment_id, patient_id in archived])
+            raise
+    return len(appointments) + len(archived)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pacientes cadastrados mais de uma vez.")
+    parser.add_argument("--banco", default=database.DB_PATH, help="arquivo do banco de dados")
+    commands = parser.add_subparsers(dest="command")
+
+    commands.add_parser("verificar", help="procura no cadastro inteiro os grupos de cadastros repetidos")
+
+    merge = commands.add_parser("mesclar", help="junta cadastros repetidos num só")
+    merge.add_argument("--manter", type=int, required=True, help="id do cadastro que fica")
+    merge.add_argument("--remover", type=int, nargs="+", required=True, help="ids dos cadastros juntados a ele")
+    args = parser.parse_args()
+
+    database.configure(args.banco)
+    migrations.migrate()
+    if args.command == "verificar":
+        progress = export.ExportProgress()
+        try:
+            clusters = find_clusters(progress)
+        except KeyboardInterrupt:
+            parser.exit(1, "Interrompido.\n")
+        print("grupo;id;nome;idade;endereço;contato;cpf;consultas")
+        for start in range(0, len(clusters), REVIEW_LIMIT):
+            for number, group in enumerate(describe(clusters[start:start + REVIEW_LIMIT]), start + 1):
+                for row in group:
+                    print(";".join(str("" if value is None else value) for value in (number,) + tuple(row)))
+        print(f"{len(clusters)} grupos em {progress.rows} linhas lidas ({progress.elapsed:.1f}s).", file=sys.stderr)
+    elif args.command == "mesclar":
+        try:
+            moved = merge_patients(args.manter, args.remover)
+        except (ValueError, scheduling.SchedulingConflict) as e:
+            parser.exit(1, f"{e}\n")
+        print(f"{len(set(args.remover) - {args.manter})} cadastros juntados ao paciente {args.manter}; "
+              f"{moved} consultas transferidas.")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import threading
+
+import database
+
+# Avisos de alteração de registros, para as janelas abertas atualizarem só a
+# linha alterada em vez de recarregar a lista inteira.
+#
+# Cada gravação feita pelo sistema publica (tabela, id, operação). Dentro de
+# uma transação, os avisos ficam guardados e só são entregues depois do
+# COMMIT (e descartados no ROLLBACK), então ninguém vê uma alteração que não
+# chegou ao banco. Os assinantes são chamados na thread que gravou; quem
+# precisa da thread da interface deve repassar o aviso (widgets.PagedTreeview
+# usa executor.call_in_ui).
+#
+# id None com RELOAD avisa que muitas linhas mudaram de uma vez (importação);
+# tabela None vale para todas as tabelas (banco restaurado ou trocado).
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+RELOAD = "reload"
+
+_subscribers = []
+_lock = threading.Lock()
+_local = threading.local()
+
+
+# Chama callback(tabela, id, operação) a cada alteração em table (ou em
+# qualquer tabela, sem table). Devolve o que deve ser passado a unsubscribe.
+def subscribe(callback, table=None):
+    subscription = (table, callback)
+    with _lock:
+        _subscribers.append(subscription)
+    return subscription
+
+
+def unsubscribe(subscription):
+    with _lock:
+        if subscription in _subscribers:
+            _subscribers.remove(subscription)
+
+
+def publish(table, row_id, op):
+    if database.get_connection().in_transaction:
+        pending = getattr(_local, "pending", None)
+        if pending is None:
+            pending = _local.pending = []
+        pending.append((table, row_id, op))
+    else:
+        _deliver([(table, row_id, op)])
+
+
+def _deliver(changes):
+    with _lock:
+        subscribers = list(_subscribers)
+    for table, row_id, op in changes:
+        for wanted, callback in subscribers:
+            if wanted is None or table is None or wanted == table:
+                callback(table, row_id, op)
+
+
+def _committed():
+    pending = getattr(_local, "pending", None)
+    if pending:
+        _local.pending = None
+        _deliver(pending)
+
+
+def _rolled_back():
+    _local.pending = None
+
+
+database.add_transaction_hooks(_committed, _rolled_back)
+database.add_reset_hook(lambda: _deliver([(None, None, RELOAD)]))
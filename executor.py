@@ -0,0 +1,191 @@
+import queue
+import sys
+import threading
+from tkinter import messagebox
+
+import database
+
+# Executor de tarefas de banco de dados fora da thread do Tkinter.
+#
+# As tarefas rodam, uma de cada vez, numa thread trabalhadora com a sua própria
+# conexão (o que também serializa as escritas). Os resultados voltam para a
+# thread da interface por polling com root.after, onde os callbacks são chamados.
+# Enquanto uma janela tem tarefas pendentes, ela mostra o cursor de espera; ao
+# ser fechada, as tarefas dela são canceladas.
+#
+# Tarefas longas que não escrevem no banco (exportação, backup) podem rodar
+# numa thread dedicada, para não segurar a fila das demais.
+
+# Intervalo de verificação dos resultados, em milissegundos
+POLL_INTERVAL = 30
+
+_root = None
+_jobs = queue.Queue()
+_results = queue.Queue()
+_worker = None
+_busy = {}
+_watched = set()
+# Protege Job.conn: a conexão só é interrompida enquanto a tarefa ainda a usa
+_conn_lock = threading.Lock()
+
+
+class Job:
+    def __init__(self, func, args, kwargs, on_success, on_error, owner):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_success = on_success
+        self.on_error = on_error
+        self.owner = owner
+        self.cancelled = False
+        self.done = False
+        self.conn = None
+
+    # Cancela a tarefa: se ainda não começou, é descartada; se está rodando,
+    # o comando SQL em andamento é interrompido. Os callbacks não são chamados.
+    # A conexão da thread trabalhadora é compartilhada: um cancelamento que
+    # chega depois do fim da tarefa não pode interromper a tarefa seguinte.
+    def cancel(self):
+        self.cancelled = True
+        with _conn_lock:
+            if self.conn is not None:
+                self.conn.interrupt()
+
+
+def _default_error(error):
+    messagebox.showerror("Erro", f"Ocorreu um erro ao acessar o banco de dados: {error}")
+
+
+def _run(job):
+    if job.cancelled:
+        _results.put((job, None, None))
+        return
+    job.conn = database.get_connection()
+    try:
+        result, error = job.func(*job.args, **job.kwargs), None
+    except Exception as e:
+        result, error = None, e
+    finally:
+        with _conn_lock:
+            job.conn = None
+    _results.put((job, result, error))
+
+
+def _work():
+    while True:
+        _run(_jobs.get())
+
+
+def _run_dedicated(job):
+    try:
+        _run(job)
+    finally:
+        database.close_thread_connection()
+
+
+# Inicia a thread trabalhadora e o polling de resultados na janela principal
+def start(root):
+    global _root, _worker
+    _root = root
+    if _worker is None:
+        _worker = threading.Thread(target=_work, name="db-executor", daemon=True)
+        _worker.start()
+    root.after(POLL_INTERVAL, _poll)
+
+
+# Um callback que falha é relatado como os demais erros do Tkinter, sem
+# derrubar o polling nem os resultados que ainda estão na fila
+def _poll():
+    try:
+        while True:
+            try:
+                job, result, error = _results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                _finish(job, result, error)
+            except Exception:
+                _root.report_callback_exception(*sys.exc_info())
+    finally:
+        _root.after(POLL_INTERVAL, _poll)
+
+
+def _finish(job, result, error):
+    job.done = True
+    _release(job)
+    if job.cancelled:
+        return
+    if error is None:
+        if job.on_success is not None:
+            job.on_success(result)
+    else:
+        (job.on_error or _default_error)(error)
+
+
+def _acquire(job):
+    owner = job.owner
+    jobs = _busy.setdefault(owner, [])
+    if not jobs:
+        owner.configure(cursor="watch")
+    jobs.append(job)
+    if owner is not _root and owner not in _watched:
+        _watched.add(owner)
+        owner.bind("<Destroy>", lambda event: _on_destroy(owner, event), add="+")
+
+
+def _release(job):
+    jobs = _busy.get(job.owner)
+    if jobs is None:
+        return
+    jobs.remove(job)
+    if not jobs:
+        del _busy[job.owner]
+        try:
+            job.owner.configure(cursor="")
+        except Exception:
+            pass  # Janela já fechada
+
+
+def _on_destroy(owner, event):
+    if event.widget is owner:
+        _watched.discard(owner)
+        cancel(owner)
+
+
+# Agenda func(*args, **kwargs) na thread trabalhadora.
+# on_success(resultado) e on_error(exceção) rodam depois na thread da interface.
+# owner é a janela que mostra o indicador de espera e cujo fechamento cancela a
+# tarefa (a janela principal, se omitido). Com dedicated=True a tarefa roda numa
+# thread própria em vez da fila compartilhada. Sem start(), roda na hora.
+def submit(func, *args, on_success=None, on_error=None, owner=None, dedicated=False, **kwargs):
+    job = Job(func, args, kwargs, on_success, on_error, owner if owner is not None else _root)
+    if _root is None:
+        try:
+            result, error = func(*args, **kwargs), None
+        except Exception as e:
+            result, error = None, e
+        job.owner = None
+        _finish(job, result, error)
+        return job
+    _acquire(job)
+    if dedicated:
+        threading.Thread(target=_run_dedicated, args=(job,), name="db-dedicated", daemon=True).start()
+    else:
+        _jobs.put(job)
+    return job
+
+
+# Agenda func(*args) na thread da interface; pode ser chamada de qualquer
+# thread (ex.: avisos de alteração publicados pela thread trabalhadora)
+def call_in_ui(func, *args):
+    job = Job(None, args, {}, lambda _: func(*args), None, None)
+    if _root is None:
+        _finish(job, None, None)
+    else:
+        _results.put((job, None, None))
+
+
+# Cancela todas as tarefas pendentes de uma janela
+def cancel(owner):
+    for job in list(_busy.get(owner, [])):
+        job.cancel()
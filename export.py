@@ -0,0 +1,107 @@
+import csv
+import os
+import threading
+import time
+
+import database
+from dates import SQL_BR_DATE
+
+# Consultas com os nomes de paciente e médico, usada na lista e na exportação
+APPOINTMENT_FIELDS = ["appointments.id", "patients.name", "doctors.name", SQL_BR_DATE, "appointments.time"]
+APPOINTMENT_JOIN = """appointments
+        JOIN patients ON appointments.patient_id = patients.id
+        JOIN doctors ON appointments.doctor_id = doctors.id"""
+# O mesmo com as consultas arquivadas; exige o arquivo anexado (archive.attached)
+ALL_APPOINTMENT_JOIN = "all_appointments AS " + APPOINTMENT_JOIN
+
+CSV_HEADER = ["ID", "Paciente", "Médico", "Data", "Hora"]
+
+# Quantidade de linhas lidas do cursor e gravadas no arquivo por vez
+EXPORT_CHUNK_SIZE = 5000
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+# Andamento de uma exportação. É atualizado pela thread que exporta e lido
+# pela interface; stop() pede o cancelamento no próximo bloco.
+class ExportProgress:
+    def __init__(self):
+        self.rows = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def stopped(self):
+        return self._stop.is_set()
+
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+# Monta o WHERE dos filtros opcionais. As datas chegam como AAAA-MM-DD.
+def _filters(date_from=None, date_to=None, doctor_id=None, patient_id=None):
+    conditions, params = [], []
+    if date_from:
+        conditions.append("appointments.date >= ?")
+        params.append(date_from)
+    if date_to:
+        conditions.append("appointments.date <= ?")
+        params.append(date_to)
+    if doctor_id is not None:
+        conditions.append("appointments.doctor_id = ?")
+        params.append(doctor_id)
+    if patient_id is not None:
+        conditions.append("appointments.patient_id = ?")
+        params.append(patient_id)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return where, params
+
+
+def has_appointments(archived=False, **filters):
+    where, params = _filters(**filters)
+    join = ALL_APPOINTMENT_JOIN if archived else APPOINTMENT_JOIN
+    return database.fetchone(f"SELECT 1 FROM {join}{where} LIMIT 1", params) is not None
+
+
+# Grava as consultas em CSV no arquivo já aberto, lendo o cursor em blocos de
+# chunk_size linhas, de modo que o uso de memória não depende do tamanho da
+# tabela. Também serve para enviar o CSV direto numa resposta HTTP.
+# archived inclui as consultas arquivadas (ver archive.export_appointments).
+def write_appointments(file, progress=None, chunk_size=EXPORT_CHUNK_SIZE, archived=False, **filters):
+    progress = progress or ExportProgress()
+    where, params = _filters(**filters)
+    join = ALL_APPOINTMENT_JOIN if archived else APPOINTMENT_JOIN
+    cursor = database.get_connection().execute(
+        f"SELECT {', '.join(APPOINTMENT_FIELDS)} FROM {join}{where} ORDER BY appointments.id", params)
+    try:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        while True:
+            if progress.stopped():
+                raise ExportCancelled()
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            writer.writerows(rows)
+            progress.rows += len(rows)
+            progress.elapsed = time.perf_counter() - progress.started
+    finally:
+        cursor.close()
+    return progress.rows
+
+
+# Grava as consultas no arquivo file_path.
+# Se for cancelada, o arquivo parcial é removido e ExportCancelled é lançada.
+def export_appointments(file_path, progress=None, chunk_size=EXPORT_CHUNK_SIZE, archived=False, **filters):
+    try:
+        with open(file_path, mode='w', newline='', encoding='utf-8') as file:
+            return write_appointments(file, progress, chunk_size, archived, **filters)
+    except BaseException:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
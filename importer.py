@@ -0,0 +1,303 @@
+import argparse
+import csv
+import os
+import sqlite3
+import time
+
+import database
+import events
+import migrations
+import names
+import scheduling
+import search
+import validation
+from export import ExportProgress
+
+# Importação em massa de pacientes, médicos e consultas a partir de CSV.
+#
+# O arquivo é lido em streaming e cada linha passa pelas mesmas regras das
+# janelas de cadastro (validation.py). As linhas válidas são gravadas com
+# executemany em lotes de IMPORT_BATCH_SIZE, um lote por transação, de modo
+# que a memória usada não depende do tamanho do arquivo e outras gravações
+# podem acontecer entre um lote e outro. As linhas recusadas vão para um
+# arquivo ao lado do original, com o número da linha e o motivo.
+#
+# A primeira linha é o cabeçalho. As colunas são reconhecidas pelo nome (sem
+# diferenciar maiúsculas) e a coluna ID é opcional: com ela os ids do sistema
+# antigo são mantidos, o que permite importar as consultas depois.
+
+# Linhas gravadas por transação
+IMPORT_BATCH_SIZE = 20000
+
+# Colunas aceitas por tipo de cadastro: nome da coluna -> campo
+PATIENT_COLUMNS = {"id": "id", "nome": "name", "idade": "age", "endereço": "address", "endereco": "address",
+                   "contato": "contact", "cpf": "cpf"}
+DOCTOR_COLUMNS = {"id": "id", "nome": "name", "especialidade": "specialty", "horário de trabalho": "schedule",
+                  "horario de trabalho": "schedule", "horário": "schedule", "horario": "schedule"}
+APPOINTMENT_COLUMNS = {"id": "id", "id paciente": "patient_id", "id médico": "doctor_id", "id medico": "doctor_id",
+                       "data": "date", "hora": "time", "duração": "duration", "duracao": "duration"}
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+# Andamento de uma importação: rows conta as linhas gravadas e rejected as recusadas
+class ImportProgress(ExportProgress):
+    def __init__(self):
+        super().__init__()
+        self.rejected = 0
+
+
+def _parse_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError("ID inválido.")
+
+
+# O CPF é opcional; um CPF que já está no cadastro é recusado pelo índice único.
+# As chaves do nome e do contato vão no INSERT: sem elas, o trigger grava as
+# chaves com um UPDATE da própria linha a cada inserção, muitas vezes mais lento.
+def _patient_row(name, age, address, contact, cpf):
+    values = validation.validate_patient(name, age, address, contact)
+    return values + (validation.validate_cpf(cpf),) + names.patient_keys(values[0], values[3])
+
+
+def _doctor_row(name, specialty, schedule):
+    values = validation.validate_doctor(name, specialty, schedule)
+    return values + (names.normalize(values[0]),)
+
+
+def _appointment_row(patient_id, doctor_id, date, time, duration):
+    patient_id, doctor_id = _parse_id(patient_id), _parse_id(doctor_id)
+    date, time, duration, end = validation.validate_appointment(
+        date, time, duration or str(scheduling.DEFAULT_DURATION))
+    return patient_id, doctor_id, date, time, duration, end
+
+
+# Consultas que apontam para pacientes ou médicos inexistentes são recusadas.
+# Os ids do lote são conferidos com poucas consultas IN, não linha a linha.
+# Devolve as linhas aceitas e as recusadas [(linha, valores lidos, motivo)].
+def _check_references(conn, batch):
+    missing = set()
+    for table, position in (("patients", 1), ("doctors", 2)):
+        wanted = list({values[position] for _, _, values in batch})
+        existing = set()
+        for start in range(0, len(wanted), 500):
+            chunk = wanted[start:start + 500]
+            existing.update(row[0] for row in conn.execute(
+                f"SELECT id FROM {table} WHERE id IN ({', '.join('?' * len(chunk))})", chunk))
+        missing.update((table, value) for value in wanted if value not in existing)
+    if not missing:
+        return batch, []
+    kept, refused = [], []
+    for line, row, values in batch:
+        if ("patients", values[1]) in missing:
+            refused.append((line, row, "Paciente não encontrado."))
+        elif ("doctors", values[2]) in missing:
+            refused.append((line, row, "Médico não encontrado."))
+        else:
+            kept.append((line, row, values))
+    return kept, refused
+
+
+# Pacientes entram no índice de busca em lote, não pelo trigger linha a linha
+def _index_patients(index, conn, inserted):
+    index(conn, [(values[0], values[1], values[3], values[4]) for values in inserted])
+
+
+# Tipo de cadastro -> (colunas aceitas, campos lidos na ordem da validação,
+# campos obrigatórios no cabeçalho, validação, tabela, campos gravados depois do id)
+KINDS = {
+    "patients": (PATIENT_COLUMNS, ("name", "age", "address", "contact", "cpf"), ("name", "age", "address", "contact"),
+                 _patient_row, "patients",
+                 ("name", "age", "address", "contact", "cpf", "name_key", "block_key", "contact_key")),
+    "doctors": (DOCTOR_COLUMNS, ("name", "specialty", "schedule"), ("name", "specialty", "schedule"),
+                _doctor_row, "doctors", ("name", "specialty", "schedule", "name_key")),
+    "appointments": (APPOINTMENT_COLUMNS, ("patient_id", "doctor_id", "date", "time", "duration"),
+                     ("patient_id", "doctor_id", "date", "time"),
+                     _appointment_row, "appointments", ("patient_id", "doctor_id", "date", "time", "duration", "end_time")),
+}
+
+
+def _open_csv(path):
+    file = open(path, newline='', encoding='utf-8-sig')
+    sample = file.readline()
+    file.seek(0)
+    # Planilhas em português costumam salvar CSV com ponto e vírgula
+    delimiter = ";" if sample.count(";") > sample.count(",") else ","
+    return file, csv.reader(file, delimiter=delimiter)
+
+
+class _Rejects:
+    def __init__(self, path, header):
+        self.path = path
+        self.header = header
+        self.file = None
+        self.writer = None
+
+    def add(self, line, row, reason):
+        if self.writer is None:
+            self.file = open(self.path, 'w', newline='', encoding='utf-8')
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(["Linha", "Erro"] + self.header)
+        self.writer.writerow([line, reason] + row)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+# O banco recusou uma linha do lote; a transação dele é desfeita
+class _BatchRefused(Exception):
+    pass
+
+
+# Grava as linhas, devolvendo os valores gravados. Com one_by_one=False o lote
+# vai num executemany e uma linha recusada (id repetido, conflito de horário)
+# lança _BatchRefused; _write então refaz o lote linha a linha, separando as
+# recusadas. Não se usa SAVEPOINT: com temp_store=MEMORY o diário do
+# savepoint fica em memória e o custo cresce com o quadrado das páginas
+# alteradas, e um lote de 10 mil pacientes levava minutos.
+def _insert(conn, sql, batch, rejects, progress, one_by_one):
+    if not one_by_one:
+        try:
+            conn.executemany(sql, [values for _, _, values in batch])
+        except sqlite3.IntegrityError:
+            raise _BatchRefused()
+        progress.rows += len(batch)
+        return [values for _, _, values in batch]
+    inserted = []
+    for line, row, values in batch:
+        try:
+            conn.execute(sql, values)
+        except sqlite3.IntegrityError as e:
+            rejects.add(line, row, str(e))
+            progress.rejected += 1
+        else:
+            inserted.append(values)
+            progress.rows += 1
+    return inserted
+
+
+# Grava um lote numa transação. Linhas sem id recebem os próximos ids da
+# tabela (a transação de escrita garante que ninguém mais os usa), de modo
+# que os ids de todas as linhas gravadas são conhecidos.
+def _write(kind, batch, rejects, progress):
+    try:
+        _write_batch(kind, batch, rejects, progress, one_by_one=False)
+    except _BatchRefused:
+        _write_batch(kind, batch, rejects, progress, one_by_one=True)
+
+
+def _write_batch(kind, batch, rejects, progress, one_by_one):
+    table, fields = KINDS[kind][4:]
+    refused = []
+    sql = f"INSERT INTO {table} (id, {', '.join(fields)}) VALUES ({', '.join('?' * (len(fields) + 1))})"
+    with database.transaction() as conn:
+        if any(values[0] is None for _, _, values in batch):
+            next_id = conn.execute(f"""
+                SELECT MAX(COALESCE((SELECT MAX(id) FROM {table}), 0),
+                           COALESCE((SELECT seq FROM sqlite_sequence WHERE name = ?), 0)) + 1
+            """, (table,)).fetchone()[0]
+            numbered = []
+            for line, row, values in batch:
+                if values[0] is None:
+                    values = (next_id,) + values[1:]
+                    next_id += 1
+                numbered.append((line, row, values))
+            batch = numbered
+        if kind == "appointments":
+            batch, refused = _check_references(conn, batch)
+        if kind == "patients":
+            with search.bulk_indexing(conn) as index:
+                _index_patients(index, conn, _insert(conn, sql, batch, rejects, progress, one_by_one))
+        else:
+            _insert(conn, sql, batch, rejects, progress, one_by_one)
+    # Só depois do COMMIT: um lote refeito linha a linha não as recusa duas vezes
+    for line, row, reason in refused:
+        rejects.add(line, row, reason)
+    progress.rejected += len(refused)
+
+
+# Importa o CSV em path para o cadastro kind ("patients", "doctors" ou
+# "appointments"). Devolve o ImportProgress com as linhas gravadas e recusadas;
+# as recusadas ficam em rejects_path (por padrão, <arquivo>.rejeitados.csv).
+# Se for cancelada, os lotes já gravados permanecem e ImportCancelled é lançada.
+def import_csv(kind, path, rejects_path=None, progress=None, batch_size=IMPORT_BATCH_SIZE):
+    columns, inputs, required, validate = KINDS[kind][:4]
+    progress = progress or ImportProgress()
+    rejects_path = rejects_path or os.path.splitext(path)[0] + ".rejeitados.csv"
+    file, reader = _open_csv(path)
+    try:
+        header = next(reader, [])
+        mapping = [columns.get(name.strip().lower()) for name in header]
+        missing = [field for field in required if field not in mapping]
+        if missing:
+            labels = [name for name, field in columns.items() if field in missing]
+            raise ValueError(f"O arquivo não tem as colunas obrigatórias: {', '.join(labels)}.")
+
+        # Posição de cada campo na linha (None para campos opcionais ausentes)
+        positions = [mapping.index(field) if field in mapping else None for field in inputs]
+        id_position = mapping.index("id") if "id" in mapping else None
+        rejects = _Rejects(rejects_path, header)
+        try:
+            batch = []
+            for row in reader:
+                if not any(row):
+                    continue
+                try:
+                    if len(row) != len(header):
+                        raise ValueError("Quantidade de colunas diferente do cabeçalho.")
+                    row_id = _parse_id(row[id_position]) if id_position is not None else None
+                    values = (row_id,) + tuple(validate(*[row[position] if position is not None else ""
+                                                          for position in positions]))
+                except ValueError as e:
+                    rejects.add(reader.line_num, row, str(e))
+                    progress.rejected += 1
+                    continue
+                batch.append((reader.line_num, row, values))
+                if len(batch) >= batch_size:
+                    if progress.stopped():
+                        raise ImportCancelled()
+                    _write(kind, batch, rejects, progress)
+                    batch = []
+                    progress.elapsed = time.perf_counter() - progress.started
+            if batch:
+                _write(kind, batch, rejects, progress)
+        finally:
+            rejects.close()
+            # Um único aviso para a importação inteira: as listas abertas recarregam
+            if progress.rows:
+                events.publish(KINDS[kind][4], None, events.RELOAD)
+    finally:
+        file.close()
+    progress.elapsed = time.perf_counter() - progress.started
+    return progress
+
+
+KIND_NAMES = {"pacientes": "patients", "medicos": "doctors", "consultas": "appointments"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importação em massa de cadastros a partir de CSV.")
+    parser.add_argument("--banco", default=database.DB_PATH, help="arquivo do banco de dados")
+    parser.add_argument("tipo", choices=sorted(KIND_NAMES), help="cadastro a importar")
+    parser.add_argument("arquivo", help="arquivo CSV com cabeçalho")
+    parser.add_argument("--rejeitados", help="arquivo CSV para as linhas recusadas")
+    parser.add_argument("--lote", type=int, default=IMPORT_BATCH_SIZE, help="linhas gravadas por transação")
+    args = parser.parse_args()
+
+    database.configure(args.banco)
+    migrations.migrate()
+    try:
+        progress = import_csv(KIND_NAMES[args.tipo], args.arquivo, args.rejeitados, batch_size=args.lote)
+    except (OSError, ValueError) as e:
+        parser.exit(1, f"Erro: {e}\n")
+    print(f"{progress.rows} linhas importadas e {progress.rejected} recusadas "
+          f"em {progress.elapsed:.1f}s ({progress.rows_per_second():.0f} linhas/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+
+# Instrumentação das consultas SQL.
+#
+# Todas as conexões do sistema são abertas com InstrumentedConnection
+# (database.connect). Com a instrumentação ligada, cada comando é cronometrado
+# do execute até a última linha lida do cursor, e as estatísticas ficam
+# agrupadas pelo texto do comando (espaços normalizados e listas de "?"
+# resumidas): execuções, tempo total e máximo, linhas e um histograma de
+# latência. Comandos acima de SLOW_QUERY_MS entram no log de consultas lentas
+# com o EXPLAIN QUERY PLAN e o texto já com os valores (capturado pelo
+# set_trace_callback do sqlite3). Os valores são dados de pacientes (nomes,
+# CPF, contatos): ficam só na memória, para a janela de diagnóstico, e não vão
+# para o arquivo de log, o dump nem a API. Ligada, custa alguns
+# microssegundos por comando e por linha lida com for; desligada, uma chamada
+# Python a mais por comando.
+
+# Tempo a partir do qual um comando é considerado lento (ms)
+SLOW_QUERY_MS = 100.0
+
+# Quantidade de consultas lentas mantidas em memória
+SLOW_LOG_SIZE = 200
+
+# Arquivo em que cada consulta lenta é acrescentada (uma linha JSON, com o
+# texto normalizado, sem valores); None, o padrão, não grava arquivo
+SLOW_LOG_PATH = None
+
+# Limites superiores das faixas do histograma de latência (ms)
+HISTOGRAM_BOUNDS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+_enabled = True
+_threshold_ms = SLOW_QUERY_MS
+_log_path = SLOW_LOG_PATH
+_lock = threading.RLock()
+_local = threading.local()
+_stats = {}
+_slow = deque(maxlen=SLOW_LOG_SIZE)
+_started = time.time()
+_normalized = {}
+
+_PLACEHOLDER_LIST = re.compile(r"\?(\s*,\s*\?)+")
+_EXPLAINABLE = {"SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH"}
+
+
+def enabled():
+    return _enabled
+
+
+# Liga ou desliga a instrumentação e ajusta o limite e o arquivo do log de lentas
+def configure(enabled=None, threshold_ms=None, log_path=False):
+    global _enabled, _threshold_ms, _log_path
+    if enabled is not None:
+        _enabled = enabled
+    if threshold_ms is not None:
+        _threshold_ms = float(threshold_ms)
+    if log_path is not False:
+        _log_path = log_path
+
+
+def threshold_ms():
+    return _threshold_ms
+
+
+def reset():
+    global _started
+    with _lock:
+        _stats.clear()
+        _slow.clear()
+        _started = time.time()
+
+
+# "SELECT  *\n FROM t WHERE id IN (?, ?, ?)" -> "SELECT * FROM t WHERE id IN (?, ...)"
+def normalize(sql):
+    text = _normalized.get(sql)
+    if text is None:
+        text = _PLACEHOLDER_LIST.sub("?, ...", " ".join(sql.split()))
+        if len(_normalized) > 5000:
+            _normalized.clear()
+        _normalized[sql] = text
+    return text
+
+
+# Texto com os valores do último comando iniciado na thread. Comandos internos
+# (do FTS5, de triggers) chegam comentados com "--" e são ignorados.
+def _trace(expanded_sql):
+    if not expanded_sql.startswith("--"):
+        _local.last_sql = expanded_sql
+
+
+def _explain(conn, sql, params):
+    words = sql.split(None, 1)
+    if not words or words[0].upper() not in _EXPLAINABLE:
+        return []
+    try:
+        # Cursor comum: o próprio EXPLAIN não entra nas estatísticas
+        rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except (sqlite3.Error, ValueError):
+        return []
+    return [row[-1] for row in rows]
+
+
+# Soma a execução às estatísticas do comando; expanded_sql é None em executemany,
+# que não tem um só conjunto de valores
+def _record(conn, sql, params, expanded_sql, elapsed, rows):
+    ms = elapsed * 1000
+    text = normalize(sql)
+    bucket = bisect_left(HISTOGRAM_BOUNDS, ms)
+    with _lock:
+        stat = _stats.get(text)
+        if stat is None:
+            stat = _stats[text] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0,
+                                   "histogram": [0] * (len(HISTOGRAM_BOUNDS) + 1)}
+        stat["count"] += 1
+        stat["total_ms"] += ms
+        stat["rows"] += max(rows, 0)
+        stat["histogram"][bucket] += 1
+        if ms > stat["max_ms"]:
+            stat["max_ms"] = ms
+    if ms < _threshold_ms:
+        return
+    entry = {
+        "when": datetime.now().isoformat(timespec="seconds"),
+        "ms": round(ms, 3),
+        "rows": rows,
+        "sql": text,
+        "expanded_sql": expanded_sql,
+        "plan": _explain(conn, sql, params) if expanded_sql is not None else [],
+    }
+    with _lock:
+        _slow.append(entry)
+        if _log_path:
+            try:
+                with open(_log_path, "a", encoding="utf-8") as file:
+                    file.write(json.dumps(_without_values(entry), ensure_ascii=False) + "\n")
+            except OSError:
+                pass
+
+
+# Cursor que mede o comando até a última linha ser lida (ou o cursor ser
+# fechado ou descartado) e conta as linhas devolvidas ou alteradas
+class _TimedCursor(sqlite3.Cursor):
+    _sql = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        self._sql, self._params, self._rows = sql, parameters, 0
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self._elapsed = time.perf_counter() - start
+            # O trace roda no primeiro passo do comando, dentro do execute
+            self._expanded = getattr(_local, "last_sql", None)
+            if self.description is None:
+                self._rows = self.rowcount
+                self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        # Sem trace linha a linha: numa importação seriam milhões de chamadas
+        self.connection.set_trace_callback(None)
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            if self.connection._traced:
+                self.connection.set_trace_callback(_trace)
+            _record(self.connection, sql, (), None, time.perf_counter() - start, self.rowcount)
+        return self
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._elapsed += time.perf_counter() - start
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._elapsed += time.perf_counter() - start
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed(super().fetchmany, size)
+        self._rows += len(rows)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._elapsed += time.perf_counter() - start
+            self._finish()
+            raise
+        self._elapsed += time.perf_counter() - start
+        self._rows += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _finish(self):
+        if self._sql is not None:
+            sql, self._sql = self._sql, None
+            _record(self.connection, sql, self._params, self._expanded, self._elapsed, self._rows)
+
+
+# Conexão cujos cursores são cronometrados enquanto a instrumentação está ligada
+class InstrumentedConnection(sqlite3.Connection):
+    _traced = False
+
+    def cursor(self, factory=None):
+        if factory is not None:
+            return super().cursor(factory)
+        if not _enabled:
+            if self._traced:
+                self.set_trace_callback(None)
+                self._traced = False
+            return super().cursor()
+        if not self._traced:
+            self.set_trace_callback(_trace)
+            self._traced = True
+        return super().cursor(_TimedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# Limite superior da faixa do histograma em que cai o percentil (nunca acima do máximo medido)
+def _percentile(stat, fraction):
+    seen = 0
+    for bucket, count in enumerate(stat["histogram"]):
+        seen += count
+        if seen >= stat["count"] * fraction:
+            return min(HISTOGRAM_BOUNDS[bucket], stat["max_ms"]) if bucket < len(HISTOGRAM_BOUNDS) else stat["max_ms"]
+    return stat["max_ms"]
+
+
+# Estatísticas por comando, dos que somam mais tempo para os que somam menos
+def statement_stats(limit=None):
+    with _lock:
+        items = [(text, dict(stat, histogram=list(stat["histogram"]))) for text, stat in _stats.items()]
+    items.sort(key=lambda item: item[1]["total_ms"], reverse=True)
+    result = []
+    for text, stat in items[:limit]:
+        stat["sql"] = text
+        stat["mean_ms"] = stat["total_ms"] / stat["count"]
+        stat["p50_ms"] = _percentile(stat, 0.5)
+        stat["p95_ms"] = _percentile(stat, 0.95)
+        result.append(stat)
+    return result
+
+
+def _without_values(entry):
+    return {key: value for key, value in entry.items() if key != "expanded_sql"}
+
+
+# Consultas lentas, da mais recente para a mais antiga; com with_values, com
+# o texto com os valores usados (expanded_sql), que não deve sair do processo
+def slow_queries(with_values=False):
+    with _lock:
+        entries = list(reversed(_slow))
+    return entries if with_values else [_without_values(entry) for entry in entries]
+
+
+# Grava estatísticas e consultas lentas em JSON; extra acrescenta outras seções
+def dump(path, extra=None):
+    report = {
+        "since": datetime.fromtimestamp(_started).isoformat(timespec="seconds"),
+        "dumped_at": datetime.now().isoformat(timespec="seconds"),
+        "enabled": _enabled,
+        "slow_query_ms": _threshold_ms,
+        "histogram_bounds_ms": list(HISTOGRAM_BOUNDS),
+        "statements": statement_stats(),
+        "slow_queries": slow_queries(),
+    }
+    report.update(extra or {})
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2, default=str)
+    return path
@@ -0,0 +1,469 @@
+import sqlite3
+
+import database
+import names
+
+# Migrações do esquema do banco de dados.
+#
+# Cada migração é registrada em MIGRATIONS como (versão, descrição, função).
+# A função recebe a conexão e roda dentro de uma transação; a versão aplicada
+# fica gravada em schema_version, então cada migração roda uma única vez.
+# Novas migrações devem ser sempre adicionadas ao final da lista.
+
+
+def _create_base_tables(conn):
+    cursor = conn.cursor()
+    cursor.execute('''CREATE TABLE IF NOT EXISTS patients (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT NOT NULL,
+                        age INTEGER,
+                        address TEXT,
+                        contact TEXT)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS doctors (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT NOT NULL,
+                        specialty TEXT,
+                        schedule TEXT)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS appointments (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        patient_id INTEGER,
+                        doctor_id INTEGER,
+                        date TEXT,
+                        time TEXT,
+                        FOREIGN KEY(patient_id) REFERENCES patients(id),
+                        FOREIGN KEY(doctor_id) REFERENCES doctors(id))''')
+    # Tabela de usuários para login (opcional)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS users (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        username TEXT NOT NULL UNIQUE,
+                        password TEXT NOT NULL)''')
+    # Inserir usuário padrão se não existir
+    cursor.execute("SELECT 1 FROM users LIMIT 1")
+    if cursor.fetchone() is None:
+        cursor.execute("INSERT INTO users (username, password) VALUES (?, ?)", ("admin", "admin"))
+
+
+# Índices usados pelos JOINs de consultas e pelas buscas por médico/data
+def _add_appointment_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_appointments_patient ON appointments (patient_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_appointments_doctor ON appointments (doctor_id, date, time)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_appointments_date_time ON appointments (date, time)")
+
+
+# Índice por nome dos médicos para ordenação e buscas por prefixo; os
+# pacientes são ordenados e buscados pela chave do nome (migração 14), e cada
+# índice a mais pesa em toda inserção
+def _add_name_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_doctors_name ON doctors (name)")
+
+
+def fts5_available(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)")
+    except Exception:
+        return False
+    conn.execute("DROP TABLE temp._fts5_probe")
+    return True
+
+
+# Tokenizador trigram do FTS5 (SQLite 3.34 ou mais novo)
+def trigram_available(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._trigram_probe USING fts5(x, tokenize='trigram')")
+    except Exception:
+        return False
+    conn.execute("DROP TABLE temp._trigram_probe")
+    return True
+
+
+# Índice de texto completo sobre nome, endereço e contato dos pacientes,
+# mantido em sincronia com a tabela patients por triggers; o de alteração só
+# refaz a linha quando muda um dos campos indexados. Enquanto há uma linha em
+# patients_bulk_indexing, os triggers de inserção dos índices de busca não
+# fazem nada: a importação em massa indexa o lote de uma vez
+# (search.bulk_indexing). Se o SQLite não tiver FTS5 a migração não cria o
+# índice e a busca continua usando LIKE.
+def _add_patient_fts(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS patients_bulk_indexing (active INTEGER PRIMARY KEY)")
+    if not fts5_available(conn):
+        return
+    conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS patients_fts USING fts5(
+                        name, address, contact,
+                        content='patients', content_rowid='id',
+                        tokenize='unicode61 remove_diacritics 2',
+                        prefix='2 3')''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS patients_fts_insert AFTER INSERT ON patients
+                    WHEN NOT EXISTS (SELECT 1 FROM patients_bulk_indexing) BEGIN
+                        INSERT INTO patients_fts (rowid, name, address, contact)
+                        VALUES (new.id, new.name, new.address, new.contact);
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS patients_fts_delete AFTER DELETE ON patients BEGIN
+                        INSERT INTO patients_fts (patients_fts, rowid, name, address, contact)
+                        VALUES ('delete', old.id, old.name, old.address, old.contact);
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS patients_fts_update AFTER UPDATE OF name, address, contact ON patients BEGIN
+                        INSERT INTO patients_fts (patients_fts, rowid, name, address, contact)
+                        VALUES ('delete', old.id, old.name, old.address, old.contact);
+                        INSERT INTO patients_fts (rowid, name, address, contact)
+                        VALUES (new.id, new.name, new.address, new.contact);
+                    END''')
+    conn.execute("INSERT INTO patients_fts (patients_fts) VALUES ('rebuild')")
+
+
+# Registro de cada backup: duração, páginas copiadas e tamanho do arquivo
+def _add_backup_log(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS backup_log (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                        path TEXT NOT NULL,
+                        pages INTEGER,
+                        duration_ms REAL,
+                        size_bytes INTEGER,
+                        compressed INTEGER NOT NULL DEFAULT 0)''')
+
+
+# Datas das consultas de DD/MM/AAAA para ISO-8601 (AAAA-MM-DD), que pode ser
+# comparada por intervalo e ordenada pelo índice (date, time). Valores fora do
+# padrão antigo ficam como estão.
+def _appointment_dates_to_iso(conn):
+    conn.execute("""UPDATE appointments
+                    SET date = substr(date, 7, 4) || '-' || substr(date, 4, 2) || '-' || substr(date, 1, 2)
+                    WHERE date GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]'""")
+
+
+# Conflito com a consulta do mesmo médico (ou paciente) que começa logo antes
+# do fim da nova; os intervalos de um mesmo dono no dia não se sobrepõem.
+_CONFLICT_CHECK = """
+    SELECT RAISE(ABORT, 'Conflito de horário: {label} já tem consulta neste horário')
+    WHERE (SELECT end_time FROM appointments
+           WHERE {column} = NEW.{column} AND date = NEW.date AND time < NEW.end_time AND id IS NOT NEW.id
+           ORDER BY time DESC LIMIT 1) > NEW.time;
+"""
+
+
+# Duração e horário de término das consultas, índice de intervalos por
+# paciente e triggers que impedem agendar dois horários sobrepostos
+def _add_appointment_intervals(conn):
+    conn.execute("ALTER TABLE appointments ADD COLUMN duration INTEGER NOT NULL DEFAULT 30")
+    conn.execute("ALTER TABLE appointments ADD COLUMN end_time TEXT")
+    minutes = "MIN(CAST(substr(time, 1, 2) AS INTEGER) * 60 + CAST(substr(time, 4, 2) AS INTEGER) + duration, 1440)"
+    conn.execute(f"""UPDATE appointments
+                     SET end_time = printf('%02d:%02d', {minutes} / 60, {minutes} % 60)
+                     WHERE time GLOB '[0-9][0-9]:[0-9][0-9]'""")
+    conn.execute("DROP INDEX IF EXISTS idx_appointments_patient")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_appointments_patient_date_time ON appointments (patient_id, date, time)")
+    checks = (_CONFLICT_CHECK.format(column="doctor_id", label="o médico")
+              + _CONFLICT_CHECK.format(column="patient_id", label="o paciente"))
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS appointments_no_overlap_insert
+                     BEFORE INSERT ON appointments WHEN NEW.end_time IS NOT NULL BEGIN {checks} END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS appointments_no_overlap_update
+                     BEFORE UPDATE OF patient_id, doctor_id, date, time, end_time ON appointments
+                     WHEN NEW.end_time IS NOT NULL BEGIN {checks} END""")
+
+
+# Agenda estruturada dos médicos: duração do horário, períodos semanais,
+# exceções por data e o mapa de ocupação por dia usado na busca de horários
+def _add_doctor_availability(conn):
+    conn.execute("ALTER TABLE doctors ADD COLUMN slot_minutes INTEGER NOT NULL DEFAULT 30")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_doctors_specialty ON doctors (specialty, name)")
+    conn.execute('''CREATE TABLE IF NOT EXISTS doctor_availability (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        doctor_id INTEGER NOT NULL,
+                        weekday INTEGER NOT NULL CHECK (weekday BETWEEN 0 AND 6),
+                        start_time TEXT NOT NULL,
+                        end_time TEXT NOT NULL CHECK (end_time > start_time),
+                        FOREIGN KEY(doctor_id) REFERENCES doctors(id))''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_doctor_availability_doctor ON doctor_availability (doctor_id, weekday)")
+    # available = 0 bloqueia o período (ou o dia todo, sem horários);
+    # available = 1 acrescenta um período fora da agenda semanal
+    conn.execute('''CREATE TABLE IF NOT EXISTS availability_exceptions (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        doctor_id INTEGER NOT NULL,
+                        date TEXT NOT NULL,
+                        start_time TEXT,
+                        end_time TEXT,
+                        available INTEGER NOT NULL DEFAULT 0,
+                        FOREIGN KEY(doctor_id) REFERENCES doctors(id))''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_availability_exceptions_doctor_date ON availability_exceptions (doctor_id, date)")
+    # Bitmap dos blocos de 5 minutos ocupados por consultas em cada dia. É
+    # preenchido sob demanda pela busca e descartado pelos triggers abaixo
+    # sempre que uma consulta do médico naquele dia muda.
+    conn.execute('''CREATE TABLE IF NOT EXISTS appointment_occupancy (
+                        doctor_id INTEGER NOT NULL,
+                        date TEXT NOT NULL,
+                        bitmap BLOB NOT NULL,
+                        PRIMARY KEY (doctor_id, date)) WITHOUT ROWID''')
+    for statement in (
+        """CREATE TRIGGER IF NOT EXISTS appointments_occupancy_insert AFTER INSERT ON appointments BEGIN
+               DELETE FROM appointment_occupancy WHERE doctor_id = NEW.doctor_id AND date = NEW.date;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS appointments_occupancy_delete AFTER DELETE ON appointments BEGIN
+               DELETE FROM appointment_occupancy WHERE doctor_id = OLD.doctor_id AND date = OLD.date;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS appointments_occupancy_update
+           AFTER UPDATE OF doctor_id, date, time, end_time ON appointments BEGIN
+               DELETE FROM appointment_occupancy WHERE doctor_id = OLD.doctor_id AND date = OLD.date;
+               DELETE FROM appointment_occupancy WHERE doctor_id = NEW.doctor_id AND date = NEW.date;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS doctors_availability_delete AFTER DELETE ON doctors BEGIN
+               DELETE FROM doctor_availability WHERE doctor_id = OLD.id;
+               DELETE FROM availability_exceptions WHERE doctor_id = OLD.id;
+               DELETE FROM appointment_occupancy WHERE doctor_id = OLD.id;
+           END""",
+    ):
+        conn.execute(statement)
+
+
+# Índice por nome dos médicos sem diferenciar maiúsculas, para a busca por
+# prefixo (intervalo no índice, já em ordem alfabética)
+def _add_nocase_name_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_doctors_name_nocase ON doctors (name COLLATE NOCASE)")
+
+
+# Tabelas de totais dos relatórios (reports.py): recalculadas por inteiro
+# com REPORT_REBUILD e mantidas pelos triggers abaixo a cada alteração.
+# {appointments} é a origem das consultas: a tabela ou, com o arquivo de
+# consultas antigas anexado, a visão all_appointments (archive.py).
+REPORT_REBUILD = (
+    "DELETE FROM report_doctor_daily",
+    "DELETE FROM report_doctor_monthly",
+    "DELETE FROM report_patient_visits",
+    """INSERT INTO report_doctor_daily (doctor_id, date, appointments, minutes)
+       SELECT doctor_id, date, COUNT(*), SUM(duration) FROM {appointments} GROUP BY doctor_id, date""",
+    """INSERT INTO report_doctor_monthly (doctor_id, month, appointments, minutes)
+       SELECT doctor_id, substr(date, 1, 7), SUM(appointments), SUM(minutes)
+       FROM report_doctor_daily GROUP BY doctor_id, substr(date, 1, 7)""",
+    """INSERT INTO report_patient_visits (patient_id, visits, last_date)
+       SELECT patient_id, COUNT(*), MAX(date) FROM {appointments} GROUP BY patient_id""",
+)
+
+# Soma (sign = +1, row = NEW) ou subtrai (sign = -1, row = OLD) uma consulta dos totais
+_REPORT_ADD = """
+    INSERT INTO report_doctor_daily (doctor_id, date, appointments, minutes) VALUES (NEW.doctor_id, NEW.date, 1, NEW.duration)
+    ON CONFLICT (doctor_id, date) DO UPDATE SET appointments = appointments + 1, minutes = minutes + excluded.minutes;
+    INSERT INTO report_doctor_monthly (doctor_id, month, appointments, minutes)
+    VALUES (NEW.doctor_id, substr(NEW.date, 1, 7), 1, NEW.duration)
+    ON CONFLICT (doctor_id, month) DO UPDATE SET appointments = appointments + 1, minutes = minutes + excluded.minutes;
+    INSERT INTO report_patient_visits (patient_id, visits, last_date) VALUES (NEW.patient_id, 1, NEW.date)
+    ON CONFLICT (patient_id) DO UPDATE SET visits = visits + 1, last_date = MAX(last_date, excluded.last_date);
+"""
+# Na exclusão a última consulta do paciente ({last_date}) é relida pelo índice (patient_id, date, time)
+_LAST_VISIT = "(SELECT MAX(date) FROM appointments WHERE patient_id = OLD.patient_id)"
+_REPORT_REMOVE = """
+    UPDATE report_doctor_daily SET appointments = appointments - 1, minutes = minutes - OLD.duration
+    WHERE doctor_id = OLD.doctor_id AND date = OLD.date;
+    DELETE FROM report_doctor_daily WHERE doctor_id = OLD.doctor_id AND date = OLD.date AND appointments <= 0;
+    UPDATE report_doctor_monthly SET appointments = appointments - 1, minutes = minutes - OLD.duration
+    WHERE doctor_id = OLD.doctor_id AND month = substr(OLD.date, 1, 7);
+    DELETE FROM report_doctor_monthly WHERE doctor_id = OLD.doctor_id AND month = substr(OLD.date, 1, 7) AND appointments <= 0;
+    UPDATE report_patient_visits SET visits = visits - 1,
+        last_date = {last_date}
+    WHERE patient_id = OLD.patient_id;
+    DELETE FROM report_patient_visits WHERE patient_id = OLD.patient_id AND visits <= 0;
+"""
+
+
+# Totais de consultas por médico e dia, por médico e mês e por paciente,
+# mantidos por triggers, para relatórios que não varrem appointments
+def _add_report_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS report_doctor_daily (
+                        doctor_id INTEGER NOT NULL,
+                        date TEXT NOT NULL,
+                        appointments INTEGER NOT NULL,
+                        minutes INTEGER NOT NULL,
+                        PRIMARY KEY (doctor_id, date)) WITHOUT ROWID''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_report_doctor_daily_date ON report_doctor_daily (date)")
+    conn.execute('''CREATE TABLE IF NOT EXISTS report_doctor_monthly (
+                        doctor_id INTEGER NOT NULL,
+                        month TEXT NOT NULL,
+                        appointments INTEGER NOT NULL,
+                        minutes INTEGER NOT NULL,
+                        PRIMARY KEY (doctor_id, month)) WITHOUT ROWID''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_report_doctor_monthly_month ON report_doctor_monthly (month)")
+    conn.execute('''CREATE TABLE IF NOT EXISTS report_patient_visits (
+                        patient_id INTEGER PRIMARY KEY,
+                        visits INTEGER NOT NULL,
+                        last_date TEXT)''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_report_patient_visits_visits ON report_patient_visits (visits DESC, patient_id)")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS appointments_reports_insert
+                     AFTER INSERT ON appointments BEGIN {_REPORT_ADD} END""")
+    _create_report_remove_triggers(conn, _LAST_VISIT)
+    for sql in REPORT_REBUILD:
+        conn.execute(sql.format(appointments="appointments"))
+
+
+# when restringe as exclusões que tiram a consulta dos totais
+def _create_report_remove_triggers(conn, last_date, when=""):
+    remove = _REPORT_REMOVE.format(last_date=last_date)
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS appointments_reports_delete
+                     AFTER DELETE ON appointments {when} BEGIN {remove} END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS appointments_reports_update
+                     AFTER UPDATE OF patient_id, doctor_id, date, duration ON appointments
+                     BEGIN {remove} {_REPORT_ADD} END""")
+
+
+# Arquivo de consultas antigas (archive.py): a última consulta arquivada de
+# cada paciente fica nos totais, para que excluir a última consulta ativa não
+# apague a data da última visita de quem só tem consultas no arquivo. Os ids
+# de um lote sendo arquivado ficam em archive_moving durante a transação que
+# os apaga do banco principal, e o trigger de exclusão dos totais ignora
+# essas linhas, sem que o arquivamento precise mexer no esquema (removendo e
+# recriando o trigger a cada lote, as outras conexões teriam de relê-lo).
+def _add_archived_last_date(conn):
+    conn.execute("ALTER TABLE report_patient_visits ADD COLUMN archived_last_date TEXT")
+    conn.execute("CREATE TABLE IF NOT EXISTS archive_moving (id INTEGER PRIMARY KEY)")
+    conn.execute("DROP TRIGGER IF EXISTS appointments_reports_delete")
+    conn.execute("DROP TRIGGER IF EXISTS appointments_reports_update")
+    _create_report_remove_triggers(conn, f"COALESCE({_LAST_VISIT}, archived_last_date)",
+                                   "WHEN NOT EXISTS (SELECT 1 FROM archive_moving WHERE id = OLD.id)")
+
+
+# Número de versão de pacientes, médicos e consultas, incrementado a cada
+# alteração. Uma edição só é gravada se a versão ainda for a que foi lida
+# (records.StaleRecord), para que uma estação não sobrescreva sem saber o
+# que outra gravou. ADD COLUMN com valor padrão não reescreve as tabelas.
+def _add_record_versions(conn):
+    for table in ("patients", "doctors", "appointments"):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+
+# Ordenação das listas pelos títulos das colunas (services.*_ORDERS): nome e
+# data já têm índice; a idade ganha o seu, que junto com o rowid dá a ordem
+# (age, id) da paginação sem ordenar a tabela
+def _add_list_sort_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_patients_age ON patients (age)")
+
+
+# Chave de busca dos nomes (names.normalize) em patients e doctors, com
+# índice, e índice de trigramas das chaves dos pacientes para achar trechos
+# do nome e tolerar erros de digitação (search.py). name_key é uma coluna
+# comum, calculada uma vez na gravação com a função normalize_name: não custa
+# nada nas leituras e ordenações. O sistema grava a chave junto com o nome
+# (records.py, importer.py); o trigger de inserção só a calcula quando a
+# gravação não a trouxe (programas externos), pois o UPDATE da própria linha
+# a cada inserção deixa a importação em massa muitas vezes mais lenta. O
+# índice de trigramas guarda só em que linhas cada trigrama aparece
+# (detail='none'), o que basta para o LIKE que confere cada candidata. Sem o
+# tokenizador trigram a busca por trechos percorre a tabela.
+def _add_name_keys(conn):
+    for table in ("patients", "doctors"):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN name_key TEXT")
+        conn.execute(f"UPDATE {table} SET name_key = {names.SQL_FUNCTION}(name)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_name_key ON {table} (name_key)")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_name_key_insert
+                         AFTER INSERT ON {table} WHEN new.name_key IS NULL BEGIN
+                             UPDATE {table} SET name_key = {names.SQL_FUNCTION}(new.name) WHERE id = new.id;
+                         END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_name_key_update
+                         AFTER UPDATE OF name ON {table} BEGIN
+                             UPDATE {table} SET name_key = {names.SQL_FUNCTION}(new.name) WHERE id = new.id;
+                         END""")
+    if not trigram_available(conn):
+        return
+    conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS patients_name_trigram USING fts5(
+                        name_key,
+                        content='patients', content_rowid='id',
+                        tokenize='trigram', detail='none')''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS patients_name_trigram_insert AFTER INSERT ON patients
+                     WHEN NOT EXISTS (SELECT 1 FROM patients_bulk_indexing) BEGIN
+                         INSERT INTO patients_name_trigram (rowid, name_key)
+                         VALUES (new.id, {names.SQL_FUNCTION}(new.name));
+                     END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS patients_name_trigram_delete AFTER DELETE ON patients BEGIN
+                        INSERT INTO patients_name_trigram (patients_name_trigram, rowid, name_key)
+                        VALUES ('delete', old.id, old.name_key);
+                    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS patients_name_trigram_update AFTER UPDATE OF name ON patients BEGIN
+                         INSERT INTO patients_name_trigram (patients_name_trigram, rowid, name_key)
+                         VALUES ('delete', old.id, old.name_key);
+                         INSERT INTO patients_name_trigram (rowid, name_key)
+                         VALUES (new.id, {names.SQL_FUNCTION}(new.name));
+                     END''')
+    conn.execute("INSERT INTO patients_name_trigram (patients_name_trigram) VALUES ('rebuild')")
+
+
+# CPF dos pacientes, com índice único, e chaves de bloco para achar cadastros
+# repetidos (duplicates.py): block_key com a idade, num índice só, e
+# contact_key. Como name_key, são colunas comuns gravadas junto com o cadastro
+# (names.patient_keys); os triggers de name_key dos pacientes dão lugar a um
+# par que calcula as três chaves num único UPDATE, o de inserção só quando a
+# gravação não trouxe name_key (programas externos).
+def _add_patient_duplicate_keys(conn):
+    for column in ("cpf", "block_key", "contact_key"):
+        conn.execute(f"ALTER TABLE patients ADD COLUMN {column} TEXT")
+    conn.execute(f"""UPDATE patients SET block_key = {names.SQL_BLOCK_FUNCTION}(name),
+                                         contact_key = {names.SQL_CONTACT_FUNCTION}(contact)""")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_patients_cpf ON patients (cpf)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_patients_block ON patients (block_key, age)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_patients_contact_key ON patients (contact_key)")
+    conn.execute("DROP TRIGGER IF EXISTS patients_name_key_insert")
+    conn.execute("DROP TRIGGER IF EXISTS patients_name_key_update")
+    keys = f"""UPDATE patients SET name_key = {names.SQL_FUNCTION}(new.name),
+                                   block_key = {names.SQL_BLOCK_FUNCTION}(new.name),
+                                   contact_key = {names.SQL_CONTACT_FUNCTION}(new.contact)
+               WHERE id = new.id;"""
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS patients_keys_insert
+                     AFTER INSERT ON patients WHEN new.name_key IS NULL BEGIN {keys} END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS patients_keys_update
+                     AFTER UPDATE OF name, contact ON patients BEGIN {keys} END""")
+
+
+MIGRATIONS = [
+    (1, "Tabelas iniciais e usuário padrão", _create_base_tables),
+    (2, "Índices de consultas por paciente, médico e data", _add_appointment_indexes),
+    (3, "Índice por nome dos médicos", _add_name_indexes),
+    (4, "Busca de texto completo (FTS5) de pacientes", _add_patient_fts),
+    (5, "Registro de backups", _add_backup_log),
+    (6, "Datas das consultas em ISO-8601", _appointment_dates_to_iso),
+    (7, "Duração das consultas e bloqueio de horários sobrepostos", _add_appointment_intervals),
+    (8, "Agenda estruturada dos médicos e mapa de ocupação", _add_doctor_availability),
+    (9, "Índice de nome dos médicos sem diferenciar maiúsculas", _add_nocase_name_indexes),
+    (10, "Totais de consultas para relatórios", _add_report_tables),
+    (11, "Última consulta arquivada nos totais por paciente", _add_archived_last_date),
+    (12, "Versão dos registros para edição concorrente", _add_record_versions),
+    (13, "Índice de pacientes por idade para ordenar as listas", _add_list_sort_indexes),
+    (14, "Chave de nome sem acentos e índice de trigramas", _add_name_keys),
+    (15, "CPF e chaves de bloco para achar pacientes repetidos", _add_patient_duplicate_keys),
+]
+
+
+def _ensure_version_table(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+                        version INTEGER PRIMARY KEY,
+                        description TEXT NOT NULL,
+                        applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)''')
+
+
+def current_version(conn=None):
+    conn = conn or database.get_connection()
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def latest_version():
+    return MIGRATIONS[-1][0]
+
+
+# Aplica, em ordem, as migrações ainda não registradas em schema_version.
+# Cada migração roda na sua própria transação; a versão é conferida de novo
+# dentro dela para que duas estações iniciando juntas não apliquem a mesma duas vezes.
+def migrate():
+    conn = database.get_connection()
+    # Caminho rápido da abertura do programa: banco já na versão atual
+    try:
+        if current_version(conn) == latest_version():
+            return latest_version()
+    except sqlite3.OperationalError:
+        pass
+    _ensure_version_table(conn)
+    applied = current_version(conn)
+    for version, description, apply in MIGRATIONS:
+        if version <= applied:
+            continue
+        with database.transaction():
+            if current_version(conn) >= version:
+                continue
+            apply(conn)
+            conn.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                         (version, description))
+    return current_version(conn)
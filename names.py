@@ -0,0 +1,96 @@
+import functools
+import re
+import unicodedata
+
+# Chave de busca dos nomes de pacientes e médicos: sem acentos, sem diferença
+# entre maiúsculas e minúsculas e com os espaços normalizados
+# ("  JOÃO da  Conceição" -> "joao da conceicao"). O banco guarda a chave na
+# coluna name_key, calculada pela função SQL normalize_name (registrada em
+# toda conexão por database.py), então a busca compara chave com chave.
+#
+# Aqui também ficam as chaves de bloco dos pacientes, que separam os
+# cadastros em grupos pequenos onde procurar repetidos (duplicates.py):
+# block_key, com o início do primeiro e do último nome, e contact_key, com os
+# últimos dígitos do contato.
+
+# Nomes das funções no SQLite
+SQL_FUNCTION = "normalize_name"
+SQL_BLOCK_FUNCTION = "name_block"
+SQL_CONTACT_FUNCTION = "contact_digits"
+
+# Letras do primeiro e do último nome na chave de bloco
+BLOCK_PREFIX = 3
+
+# Dígitos finais do contato comparados: o número sem DDD e sem o nono dígito
+CONTACT_DIGITS = 8
+
+# Conjuntos de trigramas mantidos em cache por trigrams()
+TRIGRAM_CACHE_SIZE = 4096
+
+# Partículas que não distinguem pessoas ("Maria da Silva" e "Maria Silva")
+PARTICLES = frozenset(("da", "das", "de", "do", "dos", "e"))
+
+
+# Cada caractere já visto -> sua forma sem acento e minúscula ("Ã" -> "a").
+# A chave é calculada a cada leitura de name_key fora dos índices (ex.: ao
+# ordenar um filtro pela chave), então a decomposição fica em cache e o texto
+# todo é convertido de uma vez por str.translate.
+class _Folding(dict):
+    def __missing__(self, code):
+        decomposed = unicodedata.normalize("NFKD", unicodedata.normalize("NFKD", chr(code)).casefold())
+        folded = self[code] = "".join(char for char in decomposed if not unicodedata.combining(char))
+        return folded
+
+
+_FOLDING = _Folding()
+
+
+def normalize(text):
+    if text is None:
+        return None
+    text = str(text)
+    text = text.casefold() if text.isascii() else text.translate(_FOLDING)
+    return " ".join(text.split())
+
+
+# Palavras da chave de um texto digitado, sem os curingas do LIKE (% e _)
+def words(text):
+    return re.sub(r"[%_]", "", normalize(text) or "").split()
+
+
+# Trigramas de uma chave, com espaço nas pontas para valorizar início e fim.
+# Os nomes se repetem muito (e, na busca de repetidos, vêm agrupados pela
+# chave de bloco), então os conjuntos mais recentes ficam em cache.
+@functools.lru_cache(maxsize=TRIGRAM_CACHE_SIZE)
+def trigrams(key):
+    padded = f" {key} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+# Semelhança entre duas chaves (0 a 1): trigramas em comum sobre o total
+def similarity(a, b):
+    first, second = trigrams(a), trigrams(b)
+    common = len(first & second)
+    total = len(first) + len(second) - common
+    return common / total if total else 0.0
+
+
+# Chave de bloco de um nome: o início do primeiro e do último nome, sem as
+# partículas ("Maria da Conceição Silva" -> "mar sil")
+def block(text):
+    parts = [word for word in (normalize(text) or "").split() if word not in PARTICLES]
+    if not parts:
+        return None
+    return f"{parts[0][:BLOCK_PREFIX]} {parts[-1][:BLOCK_PREFIX]}"
+
+
+# Chaves gravadas junto com um paciente: (name_key, block_key, contact_key)
+def patient_keys(name, contact):
+    return normalize(name), block(name), contact_digits(contact)
+
+
+# Chave de um contato: os últimos dígitos ("(11) 9 8765-4321" -> "87654321"),
+# ou None quando não há dígitos suficientes (e-mail, texto livre)
+def contact_digits(text):
+    digits = re.sub(r"\D", "", str(text or ""))
+    return digits[-CONTACT_DIGITS:] if len(digits) >= CONTACT_DIGITS else None
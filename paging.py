@@ -0,0 +1,106 @@
+import database
+import dates
+import names
+
+
+# Consulta paginada por chave (keyset pagination).
+#
+# Em vez de OFFSET, cada página continua a partir da última linha já vista
+# (WHERE (ordem, id) > (?, ?) ORDER BY ordem, id LIMIT ?), então o custo de
+# buscar uma página não depende de quantas linhas vieram antes dela.
+# Cada linha é devolvida como (valores, cursor), onde o cursor são os valores
+# das expressões de ordenação daquela linha. Com descending, todas as
+# expressões (inclusive a chave) ficam em ordem decrescente.
+class KeysetQuery:
+    def __init__(self, columns, from_clause, key="id", where=None, params=(), order=None, descending=False):
+        self.columns = list(columns)
+        self.from_clause = from_clause
+        self.key = key
+        self.where = where
+        self.params = tuple(params)
+        # A chave única sempre entra por último para desempatar a ordenação
+        self.order = list(order or []) + [key]
+        self.descending = descending
+
+    # A mesma consulta ordenada por order (ou pela ordem atual, se None) e
+    # restrita também por conditions (trechos de WHERE com os seus params);
+    # usada pelas grades que ordenam e filtram pelas colunas
+    def refine(self, order=None, descending=False, conditions=(), params=()):
+        where = [self.where] if self.where else []
+        where += list(conditions)
+        return KeysetQuery(self.columns, self.from_clause, self.key,
+                           " AND ".join(f"({condition})" for condition in where) or None,
+                           self.params + tuple(params), self.order[:-1] if order is None else order, descending)
+
+    def _select(self, cursor, backward, limit):
+        descending = backward != self.descending
+        conditions = [self.where] if self.where else []
+        params = list(self.params)
+        if cursor is not None:
+            operator = "<" if descending else ">"
+            if len(self.order) == 1:
+                conditions.append(f"{self.order[0]} {operator} ?")
+                params.extend(cursor)
+            else:
+                # A primeira expressão sozinha (redundante) permite ao SQLite
+                # começar a leitura do índice no cursor, o que ele não faz com
+                # a comparação de linhas quando a ordem atravessa um JOIN ou
+                # usa o rowid implícito do índice
+                conditions.append(f"{self.order[0]} {operator}= ?")
+                conditions.append(f"({', '.join(self.order)}) {operator} ({', '.join('?' * len(self.order))})")
+                params.append(cursor[0])
+                params.extend(cursor)
+        direction = " DESC" if descending else ""
+        sql = f"SELECT {', '.join(self.columns + self.order)} FROM {self.from_clause}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(f"({condition})" for condition in conditions)
+        sql += f" ORDER BY {', '.join(expr + direction for expr in self.order)} LIMIT ?"
+        params.append(limit)
+        width = len(self.columns)
+        return [(row[:width], row[width:]) for row in database.fetchall(sql, params)]
+
+    # A linha (valores, cursor) de chave key_value, ou None se ela não existe ou
+    # não satisfaz o filtro; usada para aplicar a uma lista aberta a alteração
+    # de uma única linha, com o custo de uma busca pela chave.
+    def row(self, key_value):
+        conditions = ([self.where] if self.where else []) + [f"{self.key} = ?"]
+        sql = (f"SELECT {', '.join(self.columns + self.order)} FROM {self.from_clause} "
+               f"WHERE {' AND '.join(f'({condition})' for condition in conditions)}")
+        row = database.fetchone(sql, self.params + (key_value,))
+        if row is None:
+            return None
+        width = len(self.columns)
+        return row[:width], row[width:]
+
+    def first_page(self, limit):
+        return self._select(None, False, limit)
+
+    def page_after(self, cursor, limit):
+        return self._select(cursor, False, limit)
+
+    def page_before(self, cursor, limit):
+        rows = self._select(cursor, True, limit)
+        rows.reverse()
+        return rows
+
+
+# Trecho de WHERE (e params) do filtro de uma coluna a partir do texto
+# digitado. kind "text": começa com o texto (a expressão deve ter COLLATE
+# NOCASE para não diferenciar maiúsculas; com um índice NOCASE, o intervalo
+# percorre só o trecho necessário); "name": começa com o texto, comparando
+# chaves sem acentos (a expressão deve ser uma coluna name_key, ver names.py);
+# "number": igual; "date": o dia DD/MM/AAAA.
+def column_filter(expression, kind, text):
+    text = text.strip()
+    if kind == "number":
+        if not text.isdigit():
+            raise ValueError("O filtro de uma coluna numérica deve ser um número.")
+        return f"{expression} = ?", [int(text)]
+    if kind == "date":
+        try:
+            return f"{expression} = ?", [dates.to_iso(text)]
+        except ValueError:
+            raise ValueError("Formato de data inválido no filtro. Use DD/MM/AAAA.")
+    if kind == "name":
+        text = names.normalize(text)
+    return f"{expression} >= ? AND {expression} < ?", [text, text + "\U0010ffff"]
@@ -0,0 +1,128 @@
+import cache
+import database
+import events
+import names
+
+# Leitura e gravação de pacientes e médicos, com cache das leituras por id.
+# Toda gravação nessas tabelas feita pelo sistema deve passar por aqui (ou
+# chamar cache.invalidate e events.publish) para que o cache não devolva dados
+# antigos e as janelas abertas recebam a alteração.
+#
+# Alterações e exclusões recebem opcionalmente a versão (coluna version) lida
+# quando o registro foi aberto: se outra estação gravou depois disso, nada é
+# gravado e StaleRecord é lançada, em vez de uma edição apagar a outra.
+
+PATIENT_FIELDS = "id, name, age, address, contact, version, cpf"
+DOCTOR_FIELDS = "id, name, specialty, schedule, slot_minutes, version"
+
+STALE_MESSAGES = {
+    "patients": "O paciente foi alterado em outra estação depois de aberto. Abra-o de novo para ver os dados atuais.",
+    "doctors": "O médico foi alterado em outra estação depois de aberto. Abra-o de novo para ver os dados atuais.",
+    "appointments": "A consulta foi alterada em outra estação depois de aberta. Abra-a de novo para ver os dados atuais.",
+}
+
+# Tamanho máximo de cada cache (em registros)
+RECORD_CACHE_SIZE = 2000
+NAME_CACHE_SIZE = 20000
+
+_patients = cache.LRUCache("patients", RECORD_CACHE_SIZE)
+_patient_names = cache.LRUCache("patients", NAME_CACHE_SIZE)
+_doctors = cache.LRUCache("doctors", RECORD_CACHE_SIZE)
+_doctor_names = cache.LRUCache("doctors", NAME_CACHE_SIZE)
+
+
+class StaleRecord(Exception):
+    pass
+
+
+# Executa sql (UPDATE ou DELETE) no registro record_id, só se a versão ainda
+# for version (quando informada). Devolve quantas linhas foram gravadas.
+def write_version(table, sql, params, record_id, version=None):
+    sql += " WHERE id = ?"
+    params = tuple(params) + (record_id,)
+    if version is not None:
+        try:
+            version = int(version)
+        except (TypeError, ValueError):
+            raise ValueError("A versão do registro deve ser um número.")
+        sql += " AND version = ?"
+        params += (version,)
+    rows = database.execute(sql, params).rowcount
+    if rows == 0 and version is not None:
+        raise StaleRecord(STALE_MESSAGES[table])
+    return rows
+
+
+def get_patient(patient_id):
+    return _patients.get(int(patient_id), lambda key: database.fetchone(
+        f"SELECT {PATIENT_FIELDS} FROM patients WHERE id = ?", (key,)))
+
+
+def patient_name(patient_id):
+    return _patient_names.get(int(patient_id), lambda key: _name("patients", key))
+
+
+def add_patient(name, age, address, contact, cpf=None):
+    patient_id = database.execute("""INSERT INTO patients (name, age, address, contact, cpf, name_key, block_key,
+                                                           contact_key)
+                                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                                  (name, age, address, contact, cpf, *names.patient_keys(name, contact))).lastrowid
+    cache.invalidate("patients", patient_id)
+    events.publish("patients", patient_id, events.INSERT)
+    return patient_id
+
+
+def update_patient(patient_id, name, age, address, contact, cpf, version=None):
+    write_version("patients", "UPDATE patients SET name = ?, age = ?, address = ?, contact = ?, cpf = ?, "
+                              "version = version + 1",
+                  (name, age, address, contact, cpf), patient_id, version)
+    cache.invalidate("patients", int(patient_id))
+    events.publish("patients", int(patient_id), events.UPDATE)
+
+
+def delete_patient(patient_id, version=None):
+    write_version("patients", "DELETE FROM patients", (), patient_id, version)
+    cache.invalidate("patients", int(patient_id))
+    events.publish("patients", int(patient_id), events.DELETE)
+
+
+def get_doctor(doctor_id):
+    return _doctors.get(int(doctor_id), lambda key: database.fetchone(
+        f"SELECT {DOCTOR_FIELDS} FROM doctors WHERE id = ?", (key,)))
+
+
+def doctor_name(doctor_id):
+    return _doctor_names.get(int(doctor_id), lambda key: _name("doctors", key))
+
+
+def add_doctor(name, specialty, schedule):
+    doctor_id = database.execute("INSERT INTO doctors (name, specialty, schedule, name_key) VALUES (?, ?, ?, ?)",
+                                 (name, specialty, schedule, names.normalize(name))).lastrowid
+    cache.invalidate("doctors", doctor_id)
+    events.publish("doctors", doctor_id, events.INSERT)
+    return doctor_id
+
+
+def update_doctor(doctor_id, name, specialty, schedule, version=None):
+    write_version("doctors", "UPDATE doctors SET name = ?, specialty = ?, schedule = ?, version = version + 1",
+                  (name, specialty, schedule), doctor_id, version)
+    cache.invalidate("doctors", int(doctor_id))
+    events.publish("doctors", int(doctor_id), events.UPDATE)
+
+
+def update_doctor_slot(doctor_id, minutes, version=None):
+    write_version("doctors", "UPDATE doctors SET slot_minutes = ?, version = version + 1",
+                  (minutes,), doctor_id, version)
+    cache.invalidate("doctors", int(doctor_id))
+    events.publish("doctors", int(doctor_id), events.UPDATE)
+
+
+def delete_doctor(doctor_id, version=None):
+    write_version("doctors", "DELETE FROM doctors", (), doctor_id, version)
+    cache.invalidate("doctors", int(doctor_id))
+    events.publish("doctors", int(doctor_id), events.DELETE)
+
+
+def _name(table, key):
+    row = database.fetchone(f"SELECT name FROM {table} WHERE id = ?", (key,))
+    return row[0] if row else None
@@ -0,0 +1,168 @@
+import argparse
+from contextlib import contextmanager
+
+import archive
+import database
+import dates
+import migrations
+
+# Relatórios de consultas a partir de tabelas de totais.
+#
+# Os totais ficam em report_doctor_daily (consultas e minutos por médico e
+# dia), report_doctor_monthly (por médico e mês, AAAA-MM) e
+# report_patient_visits (consultas e data da última por paciente). Triggers
+# em appointments (migração 10) os mantêm a cada inserção, alteração e
+# exclusão, então os relatórios leem só os totais, pela chave primária, e
+# não dependem de quantas consultas há no histórico. rebuild() recalcula
+# tudo a partir de appointments (carga inicial ou conferência).
+#
+# As consultas movidas para o arquivo (archive.py) continuam nos totais; com o
+# arquivo presente, rebuild() e verify() contam também as arquivadas.
+
+# Quantidade máxima de linhas devolvidas por relatório
+REPORT_LIMIT = 1000
+
+# Triggers que mantêm os totais; cargas em massa podem removê-los e chamar rebuild()
+REPORT_TRIGGERS = ("appointments_reports_insert", "appointments_reports_delete", "appointments_reports_update")
+
+
+# Origem das consultas para recalcular ou conferir os totais; com o arquivo,
+# ele fica anexado durante o bloco
+@contextmanager
+def _source():
+    with archive.attached(create=False) as conn:
+        yield "appointments" if conn is None else "all_appointments"
+
+
+# Recalcula as tabelas de totais a partir das consultas (roda numa transação)
+def rebuild():
+    with _source() as source, database.transaction() as conn:
+        for sql in migrations.REPORT_REBUILD:
+            conn.execute(sql.format(appointments=source))
+        if source != "appointments":
+            conn.execute("""UPDATE report_patient_visits SET archived_last_date = (
+                                SELECT MAX(date) FROM archive.archived_appointments a
+                                WHERE a.patient_id = report_patient_visits.patient_id)""")
+
+
+# Compara os totais gravados com uma contagem direta das consultas
+# (varre a tabela inteira). Devolve as tabelas com diferença.
+def verify():
+    checks = {
+        "report_doctor_daily": """
+            SELECT doctor_id, date, COUNT(*), SUM(duration) FROM {appointments} GROUP BY doctor_id, date
+            EXCEPT SELECT doctor_id, date, appointments, minutes FROM report_doctor_daily""",
+        "report_doctor_monthly": """
+            SELECT doctor_id, substr(date, 1, 7), COUNT(*), SUM(duration) FROM {appointments}
+            GROUP BY doctor_id, substr(date, 1, 7)
+            EXCEPT SELECT doctor_id, month, appointments, minutes FROM report_doctor_monthly""",
+        "report_patient_visits": """
+            SELECT patient_id, COUNT(*), MAX(date) FROM {appointments} GROUP BY patient_id
+            EXCEPT SELECT patient_id, visits, last_date FROM report_patient_visits""",
+    }
+    counts = {"report_doctor_daily": "SELECT COUNT(DISTINCT doctor_id || ' ' || date) FROM {appointments}",
+              "report_doctor_monthly": "SELECT COUNT(DISTINCT doctor_id || ' ' || substr(date, 1, 7)) FROM {appointments}",
+              "report_patient_visits": "SELECT COUNT(DISTINCT patient_id) FROM {appointments}"}
+    differences = []
+    with _source() as source:
+        for table, sql in checks.items():
+            stored = database.fetchone(f"SELECT COUNT(*) FROM {table}")[0]
+            sql, count = sql.format(appointments=source), counts[table].format(appointments=source)
+            if database.fetchone(sql) is not None or stored != database.fetchone(count)[0]:
+                differences.append(table)
+    return differences
+
+
+# Consultas por médico e dia no período (datas AAAA-MM-DD):
+# [(data DD/MM/AAAA, médico, especialidade, consultas, minutos)]
+def doctor_daily(date_from, date_to, doctor_id=None, limit=REPORT_LIMIT):
+    sql = """SELECT r.date, d.name, d.specialty, r.appointments, r.minutes
+             FROM report_doctor_daily r JOIN doctors d ON d.id = r.doctor_id
+             WHERE r.date BETWEEN ? AND ?"""
+    params = [date_from, date_to]
+    if doctor_id is not None:
+        sql += " AND r.doctor_id = ?"
+        params.append(doctor_id)
+    sql += " ORDER BY r.date, d.name LIMIT ?"
+    params.append(limit)
+    return [(dates.to_br(day),) + tuple(rest) for day, *rest in database.fetchall(sql, params)]
+
+
+# Consultas por especialidade e mês no período (meses AAAA-MM):
+# [(mês MM/AAAA, especialidade, consultas, minutos)]
+def specialty_monthly(month_from, month_to, limit=REPORT_LIMIT):
+    rows = database.fetchall("""
+        SELECT r.month, d.specialty, SUM(r.appointments), SUM(r.minutes)
+        FROM report_doctor_monthly r JOIN doctors d ON d.id = r.doctor_id
+        WHERE r.month BETWEEN ? AND ?
+        GROUP BY r.month, d.specialty
+        ORDER BY r.month, d.specialty LIMIT ?""", (month_from, month_to, limit))
+    return [(f"{month[5:7]}/{month[:4]}",) + tuple(rest) for month, *rest in rows]
+
+
+# Pacientes com mais consultas: [(id, nome, consultas, última consulta DD/MM/AAAA)].
+# CROSS JOIN fixa a ordem: percorre o índice por visitas e para no limite.
+def top_patients(limit=REPORT_LIMIT):
+    rows = database.fetchall("""
+        SELECT r.patient_id, p.name, r.visits, r.last_date
+        FROM report_patient_visits r CROSS JOIN patients p ON p.id = r.patient_id
+        ORDER BY r.visits DESC, r.patient_id LIMIT ?""", (limit,))
+    return [(patient_id, name, visits, dates.to_br(last_date)) for patient_id, name, visits, last_date in rows]
+
+
+# "03/2024" -> "2024-03"; lança ValueError se o mês for inválido
+def to_month(text):
+    return dates.to_iso("01/" + text.strip())[:7]
+
+
+def _print(rows):
+    for row in rows:
+        print(";".join(str(value) for value in row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatórios de consultas a partir das tabelas de totais.")
+    parser.add_argument("--banco", default=database.DB_PATH, help="arquivo do banco de dados")
+    commands = parser.add_subparsers(dest="command")
+
+    commands.add_parser("recalcular", help="recalcula os totais a partir de todas as consultas")
+    commands.add_parser("conferir", help="compara os totais com uma contagem direta das consultas")
+
+    daily = commands.add_parser("medicos-dia", help="consultas por médico e dia")
+    daily.add_argument("de", help="data inicial DD/MM/AAAA")
+    daily.add_argument("ate", help="data final DD/MM/AAAA")
+    daily.add_argument("--medico", type=int, help="id do médico")
+
+    monthly = commands.add_parser("especialidades-mes", help="consultas por especialidade e mês")
+    monthly.add_argument("de", help="mês inicial MM/AAAA")
+    monthly.add_argument("ate", help="mês final MM/AAAA")
+
+    patients = commands.add_parser("pacientes", help="pacientes com mais consultas")
+    patients.add_argument("--limite", type=int, default=50)
+    args = parser.parse_args()
+
+    database.configure(args.banco)
+    migrations.migrate()
+    try:
+        if args.command == "recalcular":
+            rebuild()
+            print("Totais recalculados.")
+        elif args.command == "conferir":
+            differences = verify()
+            if differences:
+                parser.exit(1, f"Totais divergentes: {', '.join(differences)} (use recalcular)\n")
+            print("Totais conferem com as consultas.")
+        elif args.command == "medicos-dia":
+            _print(doctor_daily(dates.to_iso(args.de), dates.to_iso(args.ate), args.medico))
+        elif args.command == "especialidades-mes":
+            _print(specialty_monthly(to_month(args.de), to_month(args.ate)))
+        elif args.command == "pacientes":
+            _print(top_patients(args.limite))
+        else:
+            parser.print_help()
+    except ValueError:
+        parser.exit(2, "Erro: data inválida. Use DD/MM/AAAA (ou MM/AAAA nos meses).\n")
+
+
+if __name__ == "__main__":
+    main()
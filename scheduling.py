@@ -0,0 +1,79 @@
+import sqlite3
+
+import database
+import events
+
+# Agendamento de consultas com detecção de conflitos.
+#
+# Cada consulta ocupa o intervalo [time, end_time) no dia date. Os índices
+# (doctor_id, date, time) e (patient_id, date, time) funcionam como um índice
+# de intervalos por médico e por paciente: como os intervalos de um mesmo
+# médico no dia não se sobrepõem, basta olhar a consulta que começa logo
+# antes do fim do novo horário (uma busca O(log n) no índice) para saber se
+# há conflito. Os triggers criados na migração 7 repetem essa verificação
+# dentro do banco, como garantia para gravações feitas fora deste módulo.
+
+# Duração padrão de uma consulta, em minutos
+DEFAULT_DURATION = 30
+
+
+class SchedulingConflict(Exception):
+    pass
+
+
+# "09:30" -> 570
+def to_minutes(time):
+    hours, minutes = time.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+# 570 -> "09:30"
+def from_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def end_time(time, duration):
+    end = to_minutes(time) + duration
+    if end > 24 * 60:
+        raise ValueError("A consulta não pode terminar depois da meia-noite.")
+    return from_minutes(end)
+
+
+# Devolve (id, time, end_time) da consulta de owner_column = owner_id que se
+# sobrepõe ao intervalo [start, end) em date, ou None se o horário está livre.
+def find_conflict(conn, owner_column, owner_id, date, start, end, exclude_id=None):
+    row = conn.execute(f"""
+        SELECT id, time, end_time FROM appointments
+        WHERE {owner_column} = ? AND date = ? AND time < ? AND id IS NOT ?
+        ORDER BY time DESC LIMIT 1
+    """, (owner_id, date, end, exclude_id)).fetchone()
+    if row is not None and row[2] > start:
+        return row
+    return None
+
+
+def _check(conn, patient_id, doctor_id, date, start, end, exclude_id=None):
+    conflict = find_conflict(conn, "doctor_id", doctor_id, date, start, end, exclude_id)
+    if conflict:
+        raise SchedulingConflict(f"O médico já tem uma consulta das {conflict[1]} às {conflict[2]} neste dia.")
+    conflict = find_conflict(conn, "patient_id", patient_id, date, start, end, exclude_id)
+    if conflict:
+        raise SchedulingConflict(f"O paciente já tem uma consulta das {conflict[1]} às {conflict[2]} neste dia.")
+
+
+# Agenda uma consulta (date em AAAA-MM-DD, time em HH:MM) e devolve o id.
+# A verificação e a inserção acontecem na mesma transação de escrita.
+def book(patient_id, doctor_id, date, time, duration=DEFAULT_DURATION):
+    end = end_time(time, duration)
+    try:
+        with database.transaction() as conn:
+            _check(conn, patient_id, doctor_id, date, time, end)
+            cursor = conn.execute("""
+                INSERT INTO appointments (patient_id, doctor_id, date, time, duration, end_time)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (patient_id, doctor_id, date, time, duration, end))
+            events.publish("appointments", cursor.lastrowid, events.INSERT)
+            return cursor.lastrowid
+    except sqlite3.IntegrityError as e:
+        # Outro processo gravou no mesmo horário e o trigger barrou a inserção
+        raise SchedulingConflict(str(e))
@@ -0,0 +1,278 @@
+import re
+from contextlib import contextmanager
+
+import database
+import names
+from paging import KeysetQuery
+
+PATIENT_FIELDS = ("id", "name", "age", "address", "contact")
+
+# Quantidade máxima de resultados devolvidos por uma busca
+SEARCH_LIMIT = 500
+
+# Peso de cada coluna do índice no ranking (nome, endereço, contato)
+RANK_WEIGHTS = (10.0, 2.0, 1.0)
+
+# Palavras com menos letras não são corrigidas (variantes demais, pouco úteis)
+TYPO_MIN_LENGTH = 4
+
+# Resultados da busca tolerante a erros de digitação na janela de busca
+TYPO_LIMIT = 50
+
+# Candidatas do índice de trigramas conferidas por variante de uma palavra
+# com erro de digitação (ver _names_with_typo)
+TYPO_CANDIDATES = 300
+
+# Índice de trigramas das chaves dos nomes de pacientes (migrations.py)
+TRIGRAM_JOIN = "patients_name_trigram JOIN patients ON patients.id = patients_name_trigram.rowid"
+
+_fts_enabled = None
+_trigram_enabled = None
+
+
+def _table_exists(name):
+    return database.fetchone("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)) is not None
+
+
+# Indica se o índice patients_fts existe neste banco (o resultado fica em cache)
+def fts_enabled():
+    global _fts_enabled
+    if _fts_enabled is None:
+        _fts_enabled = _table_exists("patients_fts")
+    return _fts_enabled
+
+
+# Indica se o índice de trigramas dos nomes existe (SQLite 3.34 ou mais novo)
+def trigram_enabled():
+    global _trigram_enabled
+    if _trigram_enabled is None:
+        _trigram_enabled = _table_exists("patients_name_trigram")
+    return _trigram_enabled
+
+
+# Esquece o que foi detectado sobre o banco (ex.: depois de uma restauração)
+def reset_cache():
+    global _fts_enabled, _trigram_enabled
+    _fts_enabled = None
+    _trigram_enabled = None
+
+
+database.add_reset_hook(reset_cache)
+
+
+# Converte o texto digitado em uma consulta FTS5: cada palavra vira um prefixo
+# entre aspas e todas precisam aparecer ("jo sil" -> "jo"* "sil"*).
+def build_fts_query(term):
+    tokens = re.findall(r"\w+", term)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+# Consulta paginada de pacientes por nome, endereço ou contato, do mais para
+# o menos relevante. Sem termo, lista todos os pacientes por id. Se nenhuma
+# palavra casar, procura os trechos digitados dentro do nome e, por último,
+# tolera um erro de digitação (ver _names_with_typo). fields escolhe as colunas
+# de patients trazidas em cada linha.
+def patient_search_query(term, fields=PATIENT_FIELDS):
+    query = build_fts_query(term)
+    if not query:
+        return KeysetQuery(fields, "patients")
+    if fts_enabled() and database.fetchone("SELECT 1 FROM patients_fts WHERE patients_fts MATCH ? LIMIT 1", (query,)):
+        return KeysetQuery([f"patients.{field}" for field in fields],
+                           "patients_fts JOIN patients ON patients.id = patients_fts.rowid",
+                           key="patients.id",
+                           where="patients_fts MATCH ?",
+                           params=(query,),
+                           order=[f"bm25(patients_fts, {', '.join(map(str, RANK_WEIGHTS))})"])
+    if trigram_enabled():
+        return _patient_name_query(names.words(term), fields)
+    # SQLite sem FTS5: varredura com LIKE apenas na chave do nome
+    return KeysetQuery(fields, "patients", where="name_key LIKE ?", params=(f"%{names.normalize(term)}%",))
+
+
+# Pacientes cujo nome contém as palavras digitadas, pelo índice de trigramas;
+# se nenhum contiver, os parecidos com o texto, em ordem alfabética
+def _patient_name_query(words, fields=PATIENT_FIELDS):
+    patterns = [f"%{word}%" for word in words]
+    match = _trigram_match(patterns)
+    if match and _names_like("patients", patterns, 1):
+        return KeysetQuery([f"patients.{field}" for field in fields], TRIGRAM_JOIN,
+                           key="patients.id",
+                           where=" AND ".join(["patients_name_trigram MATCH ?"] +
+                                              ["patients.name_key LIKE ?"] * len(patterns)),
+                           params=(match, *patterns))
+    ids = [row[0] for row in _names_with_typo("patients", words, TYPO_LIMIT)]
+    return KeysetQuery(fields, "patients",
+                       where=f"id IN ({', '.join('?' * len(ids))})" if ids else "0",
+                       params=ids, order=["name_key"])
+
+
+def search_patients(term, limit=SEARCH_LIMIT):
+    return [values for values, _ in patient_search_query(term).first_page(limit)]
+
+
+# Inserção em massa de pacientes, dentro de uma transação já aberta em conn.
+# A linha gravada em patients_bulk_indexing faz os triggers de inserção dos
+# índices de busca pularem as linhas (migrations.py), e as linhas gravadas
+# são passadas a index(conn, [(id, nome, endereço, contato), ...]), que as
+# indexa de uma vez (várias vezes mais rápido). A linha é apagada na mesma
+# transação, então nenhuma outra conexão a vê, e o esquema não muda (o que
+# obrigaria as outras conexões a reprepararem os seus comandos). As chaves de
+# nome e contato devem ir no INSERT (names.patient_keys); sem elas, o trigger
+# de inserção as calcula.
+@contextmanager
+def bulk_indexing(conn):
+    conn.execute("INSERT INTO patients_bulk_indexing (active) VALUES (1)")
+
+    def index(conn, rows):
+        if fts_enabled():
+            index_patients(conn, rows)
+        if trigram_enabled():
+            index_patient_names(conn, rows)
+
+    try:
+        yield index
+    finally:
+        conn.execute("DELETE FROM patients_bulk_indexing")
+
+
+def index_patients(conn, rows):
+    conn.executemany("INSERT INTO patients_fts (rowid, name, address, contact) VALUES (?, ?, ?, ?)", rows)
+
+
+def index_patient_names(conn, rows):
+    conn.executemany("INSERT INTO patients_name_trigram (rowid, name_key) VALUES (?, ?)",
+                     [(row[0], names.normalize(row[1])) for row in rows])
+
+
+# Quantidade de sugestões mostradas pelos campos de escolha de paciente/médico
+PICKER_LIMIT = 20
+
+
+# Nomes que começam com o texto digitado, em ordem alfabética. O intervalo
+# [chave, chave + maior caractere) percorre só o trecho necessário do índice
+# por name_key, sem diferenciar acentos nem maiúsculas.
+def _names_by_prefix(table, key, limit):
+    return database.fetchall(f"""
+        SELECT id, name FROM {table}
+        WHERE name_key >= ? AND name_key < ?
+        ORDER BY name_key LIMIT ?
+    """, (key, key + "\U0010ffff", limit))
+
+
+# Trigramas que acham no índice as chaves que casam com padrões LIKE: todos
+# os de cada trecho sem curingas com 3 letras ou mais. Com detail='none' o
+# índice só intersecta listas de linhas, e cada trigrama a mais deixa menos
+# candidatas para o LIKE conferir; um trigrama que não aparece em nome nenhum
+# encerra a busca na hora. Sem nenhum trigrama (só palavras curtas) devolve
+# "", e o índice não tem como ajudar.
+def _trigram_match(patterns):
+    grams = []
+    for pattern in patterns:
+        for part in re.split(r"[%_]", pattern):
+            grams += [part[i:i + 3] for i in range(len(part) - 2)]
+    return " ".join('"' + gram.replace('"', '""') + '"' for gram in dict.fromkeys(grams))
+
+
+# (id, nome) das linhas de table cuja chave casa com todos os padrões LIKE.
+# Nos pacientes, o índice de trigramas escolhe as candidatas e o LIKE as
+# confere; padrões sem trigramas não são buscados, para não percorrer a
+# tabela. candidates limita quantas candidatas são conferidas; o CROSS JOIN
+# mantém a subconsulta como co-rotina, que para assim que limit linhas casam,
+# em vez de materializar todas as candidatas antes. Os médicos são poucos e
+# são percorridos.
+def _names_like(table, patterns, limit, candidates=None):
+    conditions = " AND ".join(f"{table}.name_key LIKE ?" for _ in patterns)
+    if table != "patients":
+        return database.fetchall(f"SELECT id, name FROM {table} WHERE {conditions} ORDER BY name_key LIMIT ?",
+                                 (*patterns, limit))
+    match = _trigram_match(patterns)
+    if not match:
+        return []
+    if candidates is None:
+        return database.fetchall(f"""
+            SELECT patients.id, patients.name FROM {TRIGRAM_JOIN}
+            WHERE patients_name_trigram MATCH ? AND {conditions} LIMIT ?
+        """, (match, *patterns, limit))
+    return database.fetchall(f"""
+        SELECT patients.id, patients.name
+        FROM (SELECT rowid FROM patients_name_trigram WHERE patients_name_trigram MATCH ? LIMIT ?) AS candidates
+        CROSS JOIN patients ON patients.id = candidates.rowid
+        WHERE {conditions} LIMIT ?
+    """, (match, candidates, *patterns, limit))
+
+
+# Padrões LIKE de uma palavra com um erro de digitação desfeito: uma letra
+# trocada, a mais, a menos ou duas letras vizinhas invertidas. Ficam só os
+# que o índice de trigramas consegue buscar.
+def _typo_patterns(word):
+    variants = set()
+    for i in range(len(word)):
+        variants.add(word[:i] + "_" + word[i + 1:])
+        variants.add(word[:i] + word[i + 1:])
+        variants.add(word[:i] + word[i + 1:i + 2] + word[i:i + 1] + word[i + 2:])
+    for i in range(1, len(word)):
+        variants.add(word[:i] + "_" + word[i:])
+    variants.discard(word)
+    return [f"%{variant}%" for variant in sorted(variants) if _trigram_match([variant])]
+
+
+# Nomes que casam com as palavras digitadas depois de corrigir um erro de
+# digitação numa delas, do mais para o menos parecido com o texto. Só são
+# corrigidas as palavras que não aparecem em nenhum nome, e cada variante é
+# uma busca no índice ("joao slva" -> "%joao%" e "%s_lva%", "%silva%"...).
+def _names_with_typo(table, words, limit):
+    patterns = [f"%{word}%" for word in words]
+    rows = {}
+    for index, word in enumerate(words):
+        if len(word) < TYPO_MIN_LENGTH or _names_like(table, [patterns[index]], 1):
+            continue
+        others = patterns[:index] + patterns[index + 1:]
+        for variant in _typo_patterns(word):
+            for row in _names_like(table, others + [variant], limit, candidates=TYPO_CANDIDATES):
+                rows.setdefault(row[0], row)
+    key = " ".join(words)
+    return sorted(rows.values(), key=lambda row: (-names.similarity(names.normalize(row[1]), key), row[1]))[:limit]
+
+
+# Acrescenta a rows as linhas de more que ainda não estão lá, até limit
+def _extend(rows, more, limit):
+    seen = {row[0] for row in rows}
+    return rows + [row for row in more if row[0] not in seen][:limit - len(rows)]
+
+
+# Sugestões para os campos de paciente e médico, sem diferenciar acentos nem
+# maiúsculas: primeiro os nomes que começam com o texto; se faltarem, os que
+# contêm cada palavra digitada em qualquer ponto ("silva jo" acha "João da
+# Silva"); se nada casar, os parecidos, tolerando um erro de digitação.
+def _choices(table, term, limit):
+    key = names.normalize(term)
+    if not key:
+        return []
+    rows = _names_by_prefix(table, key, limit)
+    words = names.words(term)
+    if len(rows) < limit and words:
+        rows = _extend(rows, _names_like(table, [f"%{word}%" for word in words], limit), limit)
+    if not rows and words:
+        rows = _names_with_typo(table, words, limit)
+    return rows
+
+
+def patient_choices(term, limit=PICKER_LIMIT):
+    if trigram_enabled():
+        return _choices("patients", term, limit)
+    # Sem o índice de trigramas: prefixo e, pelo índice FTS, pacientes em que
+    # alguma palavra do nome começa com o texto (ex.: sobrenomes)
+    key = names.normalize(term)
+    if not key:
+        return []
+    rows = _names_by_prefix("patients", key, limit)
+    query = build_fts_query(term)
+    if len(rows) < limit and query and fts_enabled():
+        rows = _extend(rows, database.fetchall("""
+            SELECT rowid, name FROM patients_fts WHERE patients_fts MATCH ? LIMIT ?
+        """, ("name : (" + query + ")", limit)), limit)
+    return rows
+
+
+def doctor_choices(term, limit=PICKER_LIMIT):
+    return _choices("doctors", term, limit)
@@ -0,0 +1,311 @@
+import availability
+import cache
+import database
+import events
+import export
+import records
+import scheduling
+import search
+import validation
+from dates import SQL_BR_DATE
+from paging import KeysetQuery
+
+# Operações do sistema sem dependência da interface gráfica.
+#
+# São usadas pela janela Tkinter e pela API HTTP (api.py), e podem ser
+# chamadas de qualquer thread: cada thread usa a sua conexão e as gravações
+# passam por database.transaction(), que as serializa dentro do processo.
+# Os dados chegam como texto, do jeito que foram digitados, e são validados
+# pelas mesmas regras das janelas; erros de validação lançam ValueError e
+# registros inexistentes lançam NotFound. Alterações e exclusões aceitam a
+# versão lida do registro (o campo version); se outra estação o alterou
+# depois disso, lançam records.StaleRecord e nada é gravado.
+
+# Nomes dos campos das linhas devolvidas (as chaves dos objetos da API)
+PATIENT_FIELDS = ("id", "name", "age", "address", "contact", "version", "cpf")
+DUPLICATE_FIELDS = ("id", "name", "age", "address", "contact", "cpf")
+DOCTOR_FIELDS = ("id", "name", "specialty", "schedule", "slot_minutes", "version")
+APPOINTMENT_FIELDS = ("id", "patient_id", "patient_name", "doctor_id", "doctor_name", "date", "time", "duration",
+                      "version")
+
+# Colunas de uma consulta com os nomes de paciente e médico, na ordem de APPOINTMENT_FIELDS
+APPOINTMENT_COLUMNS = ("appointments.id", "appointments.patient_id", "patients.name", "appointments.doctor_id",
+                       "doctors.name", SQL_BR_DATE, "appointments.time", "appointments.duration",
+                       "appointments.version")
+
+# Ordenações das listas por campo: as expressões de ORDER BY, antes da chave.
+# Cada uma percorre um índice (na lista de consultas, o da chave do nome em patients
+# ou doctors seguido do índice da consulta por paciente ou médico), então a
+# primeira página sai sem ordenar a tabela inteira.
+PATIENT_ORDERS = {"id": [], "name": ["patients.name_key"], "age": ["patients.age"]}
+DOCTOR_ORDERS = {"id": [], "name": ["doctors.name_key"], "specialty": ["doctors.specialty", "doctors.name"]}
+APPOINTMENT_ORDERS = {
+    "id": [],
+    "patient_name": ["patients.name_key", "patients.id", "appointments.date", "appointments.time"],
+    "doctor_name": ["doctors.name_key", "doctors.id", "appointments.date", "appointments.time"],
+    "date": ["appointments.date", "appointments.time"],
+}
+
+# Filtros das listas por campo: (expressão, tipo), ver paging.column_filter
+PATIENT_FILTERS = {
+    "id": ("patients.id", "number"),
+    "name": ("patients.name_key", "name"),
+    "age": ("patients.age", "number"),
+    "address": ("patients.address COLLATE NOCASE", "text"),
+    "contact": ("patients.contact", "text"),
+}
+DOCTOR_FILTERS = {
+    "id": ("doctors.id", "number"),
+    "name": ("doctors.name_key", "name"),
+    "specialty": ("doctors.specialty COLLATE NOCASE", "text"),
+    "schedule": ("doctors.schedule", "text"),
+}
+APPOINTMENT_FILTERS = {
+    "id": ("appointments.id", "number"),
+    "patient_name": ("patients.name_key", "name"),
+    "doctor_name": ("doctors.name_key", "name"),
+    "date": ("appointments.date", "date"),
+    "time": ("appointments.time", "text"),
+}
+
+# Tamanho padrão e máximo de uma página de listagem
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class NotFound(Exception):
+    pass
+
+
+# Consultas das listas paginadas por id (as grades da interface mostram menos colunas)
+def patient_list_query(columns=PATIENT_FIELDS):
+    return KeysetQuery(columns, "patients")
+
+
+def doctor_list_query(columns=DOCTOR_FIELDS):
+    return KeysetQuery(columns, "doctors")
+
+
+def appointment_list_query(columns=APPOINTMENT_COLUMNS, **filters):
+    where, params = export._filters(**filters)
+    return KeysetQuery(columns, export.APPOINTMENT_JOIN, key="appointments.id",
+                       where=where[len(" WHERE "):] or None, params=params)
+
+
+def _page(query, after, limit):
+    limit = max(1, min(int(limit or PAGE_SIZE), MAX_PAGE_SIZE))
+    rows = query.page_after((int(after),), limit) if after else query.first_page(limit)
+    return [values for values, _ in rows]
+
+
+# Os valores podem chegar como números ou nulos (JSON); a validação espera texto
+def _text(*values):
+    return ["" if value is None else str(value) for value in values]
+
+
+def has_patients():
+    return database.fetchone("SELECT 1 FROM patients LIMIT 1") is not None
+
+
+def has_doctors():
+    return database.fetchone("SELECT 1 FROM doctors LIMIT 1") is not None
+
+
+# Pacientes
+
+def list_patients(after=None, limit=PAGE_SIZE):
+    return _page(patient_list_query(), after, limit)
+
+
+def get_patient(patient_id):
+    patient = records.get_patient(patient_id)
+    if patient is None:
+        raise NotFound("Paciente não encontrado.")
+    return patient
+
+
+# O CPF é opcional e não se repete: o índice único também recusaria, mas a
+# verificação antes diz qual paciente já o tem
+def _check_cpf(conn, cpf, patient_id=None):
+    row = conn.execute("SELECT id FROM patients WHERE cpf = ? AND id IS NOT ?", (cpf, patient_id)).fetchone()
+    if row is not None:
+        raise ValueError(f"Este CPF já está no cadastro do paciente {row[0]}.")
+
+
+def create_patient(name, age, address, contact, cpf=None):
+    values = validation.validate_patient(*_text(name, age, address, contact))
+    cpf = validation.validate_cpf(*_text(cpf))
+    with database.transaction() as conn:
+        if cpf:
+            _check_cpf(conn, cpf)
+        return records.add_patient(*values, cpf=cpf)
+
+
+# cpf None mantém o CPF do cadastro; vazio o apaga
+def update_patient(patient_id, name, age, address, contact, version=None, cpf=None):
+    values = validation.validate_patient(*_text(name, age, address, contact))
+    keep_cpf = cpf is None
+    cpf = validation.validate_cpf(*_text(cpf))
+    with database.transaction() as conn:
+        current = get_patient(patient_id)
+        if keep_cpf:
+            cpf = current[6]
+        elif cpf:
+            _check_cpf(conn, cpf, patient_id)
+        records.update_patient(patient_id, *values, cpf, version=version)
+
+
+def delete_patient(patient_id, version=None):
+    with database.transaction():
+        get_patient(patient_id)
+        records.delete_patient(patient_id, version)
+
+
+# Cadastros que parecem ser o mesmo paciente (ver duplicates.find_duplicates);
+# exclude_id deixa de fora o cadastro em edição
+def patient_duplicates(name, age, address, contact, cpf=None, exclude_id=None):
+    import duplicates  # Carregado só aqui: não pesa na abertura do programa
+    name, age, _, contact = validation.validate_patient(*_text(name, age, address, contact))
+    cpf = validation.validate_cpf(*_text(cpf))
+    return duplicates.find_duplicates(name, age, contact, cpf, exclude_id=None if exclude_id is None else int(exclude_id))
+
+
+# Junta os cadastros remove_ids ao keep_id (ver duplicates.merge_patients)
+def merge_patients(keep_id, remove_ids):
+    import duplicates
+    for patient_id in [keep_id, *remove_ids]:
+        get_patient(int(patient_id))
+    return duplicates.merge_patients(keep_id, remove_ids)
+
+
+def search_patients(term, limit=search.SEARCH_LIMIT):
+    return search.search_patients(term, max(1, min(int(limit), search.SEARCH_LIMIT)))
+
+
+def patient_choices(term, limit=search.PICKER_LIMIT):
+    return search.patient_choices(term, limit)
+
+
+# Médicos
+
+def list_doctors(after=None, limit=PAGE_SIZE):
+    return _page(doctor_list_query(), after, limit)
+
+
+def get_doctor(doctor_id):
+    doctor = records.get_doctor(doctor_id)
+    if doctor is None:
+        raise NotFound("Médico não encontrado.")
+    return doctor
+
+
+def create_doctor(name, specialty, schedule):
+    values = validation.validate_doctor(*_text(name, specialty, schedule))
+    with database.transaction():
+        return records.add_doctor(*values)
+
+
+def update_doctor(doctor_id, name, specialty, schedule, version=None):
+    values = validation.validate_doctor(*_text(name, specialty, schedule))
+    with database.transaction():
+        get_doctor(doctor_id)
+        records.update_doctor(doctor_id, *values, version=version)
+
+
+def delete_doctor(doctor_id, version=None):
+    with database.transaction():
+        get_doctor(doctor_id)
+        records.delete_doctor(doctor_id, version)
+
+
+# Agenda do médico (availability.py). A duração do horário muda o cadastro do
+# médico e aceita a versão lida, como update_doctor.
+def set_slot_minutes(doctor_id, minutes, version=None):
+    try:
+        minutes = int(minutes)
+    except (TypeError, ValueError):
+        raise ValueError("Informe a duração do horário em minutos.")
+    with database.transaction():
+        get_doctor(doctor_id)
+        availability.set_slot_minutes(doctor_id, minutes, version)
+
+
+def add_availability_period(doctor_id, weekday, start, end):
+    with database.transaction():
+        get_doctor(doctor_id)
+        return availability.add_period(doctor_id, weekday, *_text(start, end))
+
+
+def remove_availability_period(period_id):
+    with database.transaction():
+        if not availability.remove_period(period_id):
+            raise NotFound("Horário não encontrado.")
+
+
+def add_availability_exception(doctor_id, date, start=None, end=None, available=False):
+    with database.transaction():
+        get_doctor(doctor_id)
+        return availability.add_exception(doctor_id, date, start, end, available)
+
+
+def remove_availability_exception(exception_id):
+    with database.transaction():
+        if not availability.remove_exception(exception_id):
+            raise NotFound("Exceção não encontrada.")
+
+
+def doctor_choices(term, limit=search.PICKER_LIMIT):
+    return search.doctor_choices(term, limit)
+
+
+def specialties():
+    return availability.specialties()
+
+
+# Consultas
+
+def list_appointments(after=None, limit=PAGE_SIZE, **filters):
+    return _page(appointment_list_query(**filters), after, limit)
+
+
+def get_appointment(appointment_id):
+    row = database.fetchone(f"SELECT {', '.join(APPOINTMENT_COLUMNS)} FROM {export.APPOINTMENT_JOIN} "
+                            "WHERE appointments.id = ?", (appointment_id,))
+    if row is None:
+        raise NotFound("Consulta não encontrada.")
+    return row
+
+
+# Agenda uma consulta (data em DD/MM/AAAA, hora em HH:MM) e devolve o id.
+# Conflitos de horário lançam scheduling.SchedulingConflict.
+def schedule_appointment(patient_id, doctor_id, date, time, duration=scheduling.DEFAULT_DURATION):
+    date, time, duration, _ = validation.validate_appointment(*_text(date, time, duration))
+    try:
+        patient_id, doctor_id = int(patient_id), int(doctor_id)
+    except (TypeError, ValueError):
+        raise ValueError("ID do paciente e do médico devem ser números.")
+    with database.transaction():
+        get_patient(patient_id)
+        get_doctor(doctor_id)
+        return scheduling.book(patient_id, doctor_id, date, time, duration)
+
+
+def delete_appointment(appointment_id, version=None):
+    with database.transaction():
+        if database.fetchone("SELECT 1 FROM appointments WHERE id = ?", (appointment_id,)) is None:
+            raise NotFound("Consulta não encontrada.")
+        records.write_version("appointments", "DELETE FROM appointments", (), appointment_id, version)
+        events.publish("appointments", int(appointment_id), events.DELETE)
+
+
+def free_slots(specialty, count=10):
+    return availability.next_free_slots(specialty, max(1, min(int(count), 100)))
+
+
+# Exporta as consultas em CSV para um arquivo já aberto (filtros com datas AAAA-MM-DD)
+def export_appointments(file, progress=None, chunk_size=export.EXPORT_CHUNK_SIZE, **filters):
+    return export.write_appointments(file, progress, chunk_size, **filters)
+
+
+def cache_stats():
+    return cache.stats()
@@ -0,0 +1,67 @@
+import re
+
+import dates
+import scheduling
+
+# Regras de validação dos cadastros, usadas pelas janelas e pela importação.
+# Cada função recebe os valores como texto e devolve os valores prontos para
+# gravar, ou lança ValueError com a mensagem a mostrar ao usuário.
+
+REQUIRED_MESSAGE = "Por favor, preencha todos os campos."
+
+
+def _clean(*values):
+    return [(value or "").strip() for value in values]
+
+
+def validate_patient(name, age, address, contact):
+    name, age, address, contact = _clean(name, age, address, contact)
+    if not (name and age and address and contact):
+        raise ValueError(REQUIRED_MESSAGE)
+    try:
+        age = int(age)
+    except ValueError:
+        raise ValueError("A idade deve ser um número.")
+    return name, age, address, contact
+
+
+# CPF opcional, digitado com ou sem pontuação. Devolve os 11 dígitos, ou None
+# se ficou em branco.
+def validate_cpf(cpf):
+    cpf = (cpf or "").strip()
+    if not cpf:
+        return None
+    digits = re.sub(r"[.\-\s]", "", cpf)
+    if not (len(digits) == 11 and digits.isascii() and digits.isdigit()):
+        raise ValueError("CPF inválido. Informe os 11 dígitos.")
+    # Dígitos verificadores; números com todos os dígitos iguais passam na conta, mas não existem
+    for size in (9, 10):
+        check = sum(int(digit) * weight for digit, weight in zip(digits, range(size + 1, 1, -1))) * 10 % 11 % 10
+        if check != int(digits[size]) or len(set(digits)) == 1:
+            raise ValueError("CPF inválido: confira os números digitados.")
+    return digits
+
+
+def validate_doctor(name, specialty, schedule):
+    name, specialty, schedule = _clean(name, specialty, schedule)
+    if not (name and specialty and schedule):
+        raise ValueError(REQUIRED_MESSAGE)
+    return name, specialty, schedule
+
+
+# Data em DD/MM/AAAA, hora em HH:MM e duração em minutos.
+# Devolve (data AAAA-MM-DD, hora, duração, hora de término).
+def validate_appointment(date, time, duration):
+    date, time, duration = _clean(date, time, duration)
+    if not (date and time and duration):
+        raise ValueError(REQUIRED_MESSAGE)
+    try:
+        date = dates.to_iso(date)
+    except ValueError:
+        raise ValueError("Formato de data inválido. Use DD/MM/AAAA.")
+    if not dates.is_valid_time(time):
+        raise ValueError("Formato de hora inválido. Use HH:MM.")
+    if not duration.isdigit() or int(duration) <= 0:
+        raise ValueError("Duração inválida. Informe os minutos da consulta.")
+    duration = int(duration)
+    return date, time, duration, scheduling.end_time(time, duration)
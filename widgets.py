@@ -0,0 +1,443 @@
+from collections import deque
+from tkinter import Toplevel, StringVar, Listbox, messagebox
+from tkinter import ttk
+
+import events
+import executor
+import paging
+
+
+# Treeview paginada: busca páginas de uma KeysetQuery conforme o usuário rola
+# e mantém no máximo max_pages páginas na memória. Ao passar do limite, a
+# página mais distante da área visível é descartada e volta a ser buscada
+# se o usuário rolar de volta. As páginas são buscadas pelo executor, sem
+# bloquear a interface.
+#
+# columns: lista de (identificador, título, largura, alinhamento).
+# O iid de cada item é o id da linha (primeiro valor), o que permite
+# localizar e remover linhas diretamente. hidden nomeia valores que a
+# consulta traz depois das colunas sem que sejam mostrados (ex.: a versão da
+# linha, passada ao deletar); são lidos com tree.set(iid, identificador).
+#
+# Com table, a grade assina os avisos de alteração dessa tabela (events.py) e
+# aplica cada um só à linha alterada: busca a linha pela chave na consulta
+# atual e a insere, atualiza, reposiciona ou remove entre as páginas
+# carregadas, sem recarregar a lista.
+#
+# orders ({coluna: expressões de ORDER BY}) torna clicáveis os títulos dessas
+# colunas: cada clique alterna entre ordem crescente, decrescente e a ordem
+# da consulta. filters ({coluna: (expressão, tipo)}, ver paging.column_filter)
+# põe acima da grade um campo de filtro para cada coluna. Ordenação e filtros
+# refazem a consulta no banco (KeysetQuery.refine); nada é ordenado em memória.
+class PagedTreeview(ttk.Frame):
+    def __init__(self, master, columns, query=None, page_size=100, max_pages=4, table=None,
+                 orders=None, filters=None, hidden=(), **kwargs):
+        super().__init__(master, **kwargs)
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.base_query = None
+        self.query = None
+        self.orders = orders or {}
+        self.filters = filters or {}
+        self._headings = {column[0]: column[1] for column in columns}
+        self._sort = None
+        self._descending = False
+        self._conditions = []
+        self._params = []
+
+        self._filter_entries = {}
+        if self.filters:
+            bar = ttk.Frame(self)
+            bar.pack(side='top', fill='x', pady=(0, 5))
+            for identifier, heading, _, _ in columns:
+                if identifier in self.filters:
+                    ttk.Label(bar, text=f"{heading}:").pack(side='left', padx=(5, 2))
+                    entry = ttk.Entry(bar, width=10)
+                    entry.pack(side='left')
+                    entry.bind("<Return>", lambda event: self.apply_filters())
+                    self._filter_entries[identifier] = entry
+            ttk.Button(bar, text="Filtrar", command=self.apply_filters, width=8).pack(side='left', padx=5)
+            ttk.Button(bar, text="Limpar", command=self.clear_filters, width=8).pack(side='left')
+
+        self.tree = ttk.Treeview(self, columns=[column[0] for column in columns] + list(hidden),
+                                 displaycolumns=[column[0] for column in columns], show='headings')
+        for identifier, heading, width, anchor in columns:
+            if identifier in self.orders:
+                self.tree.heading(identifier, text=heading, command=lambda column=identifier: self.sort_by(column))
+            else:
+                self.tree.heading(identifier, text=heading)
+            self.tree.column(identifier, width=width, anchor=anchor)
+
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.tree.pack(side='left', fill='both', expand=True)
+        self.scrollbar.pack(side='right', fill='y')
+
+        # Cada página é [cursor da primeira linha, cursor da última linha, iids]
+        self._pages = deque()
+        self._cursors = {}
+        self._at_start = True
+        self._at_end = True
+        self._job = None
+
+        self._subscription = None
+        if table is not None:
+            self._subscription = events.subscribe(
+                lambda table, row_id, op: executor.call_in_ui(self._on_change, row_id, op), table)
+
+        if query is not None:
+            self.reload(query)
+
+    # Limpa a grade e carrega a primeira página da consulta (nova ou atual).
+    # on_loaded é chamado depois que a primeira página chega.
+    def reload(self, query=None, on_loaded=None):
+        if query is not None:
+            self.base_query = query
+        self.query = self.base_query.refine(self.orders[self._sort] if self._sort else None, self._descending,
+                                            self._conditions, self._params)
+        self.tree.delete(*self.tree.get_children())
+        self._pages.clear()
+        self._cursors.clear()
+        self._at_start = True
+        self._at_end = False
+        self._fetch(self.query.first_page, (), self._append, on_loaded)
+
+    # Clique no título: crescente, decrescente e de volta à ordem da consulta
+    def sort_by(self, column):
+        if self._sort != column:
+            self._sort, self._descending = column, False
+        elif not self._descending:
+            self._descending = True
+        else:
+            self._sort, self._descending = None, False
+        for identifier in self.orders:
+            arrow = (" ▼" if self._descending else " ▲") if identifier == self._sort else ""
+            self.tree.heading(identifier, text=self._headings[identifier] + arrow)
+        if self.base_query is not None:
+            self.reload()
+
+    def apply_filters(self):
+        conditions, params = [], []
+        try:
+            for identifier, entry in self._filter_entries.items():
+                if entry.get().strip():
+                    condition, values = paging.column_filter(*self.filters[identifier], entry.get())
+                    conditions.append(condition)
+                    params.extend(values)
+        except ValueError as e:
+            messagebox.showerror("Erro", str(e))
+            return
+        self._conditions, self._params = conditions, params
+        if self.base_query is not None:
+            self.reload()
+
+    def clear_filters(self):
+        for entry in self._filter_entries.values():
+            entry.delete(0, 'end')
+        self.apply_filters()
+
+    def destroy(self):
+        if self._subscription is not None:
+            events.unsubscribe(self._subscription)
+            self._subscription = None
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+        super().destroy()
+
+    def is_empty(self):
+        return not self.tree.get_children()
+
+    # Remove uma linha já exibida (ex.: depois de deletá-la do banco)
+    def remove(self, iid):
+        if not self.tree.exists(iid):
+            return
+        self.tree.delete(iid)
+        self._cursors.pop(iid, None)
+        for page in self._pages:
+            if iid in page[2]:
+                page[2].remove(iid)
+                break
+
+    # Aplica um aviso de alteração (chamado na thread da interface)
+    def _on_change(self, row_id, op):
+        if not self.winfo_exists() or self.query is None:
+            return
+        if row_id is None:
+            self.reload()
+        elif op == events.DELETE:
+            self.remove(str(row_id))
+        else:
+            executor.submit(self.query.row, row_id, on_success=lambda row: self._place(str(row_id), row),
+                            owner=self.winfo_toplevel())
+
+    # Põe a linha na posição dada pelo cursor, se ela cai no trecho carregado;
+    # fora dele, será buscada quando o usuário rolar até lá
+    def _place(self, iid, row):
+        if row is None:
+            self.remove(iid)
+            return
+        values, cursor = row
+        if self.tree.exists(iid) and self._cursors[iid] == cursor:
+            self.tree.item(iid, values=values)
+            return
+        self.remove(iid)
+        if not self._pages:
+            if self._at_start and self._at_end:
+                self._cursors[iid] = cursor
+                self._insert("end", values)
+                self._pages.append([cursor, cursor, [iid]])
+            return
+        if ((self._before(cursor, self._pages[0][0]) and not self._at_start)
+                or (self._before(self._pages[-1][1], cursor) and not self._at_end)):
+            return
+        offset = 0
+        for page in self._pages:
+            if not self._before(page[1], cursor) or page is self._pages[-1]:
+                break
+            offset += len(page[2])
+        position = sum(1 for other in page[2] if self._before(self._cursors[other], cursor))
+        anchor = self._first_visible()
+        page[2].insert(position, iid)
+        self._cursors[iid] = cursor
+        self._insert(offset + position, values)
+        if self._before(cursor, page[0]):
+            page[0] = cursor
+        if self._before(page[1], cursor):
+            page[1] = cursor
+        self._restore_view(anchor)
+
+    # Se a linha de cursor a vem antes da de cursor b na ordem da consulta
+    def _before(self, a, b):
+        return a > b if self.query.descending else a < b
+
+    def _append(self, rows):
+        if len(rows) < self.page_size:
+            self._at_end = True
+        if not rows:
+            return
+        iids = [self._insert("end", values) for values, _ in rows]
+        self._cursors.update(zip(iids, (cursor for _, cursor in rows)))
+        self._pages.append([rows[0][1], rows[-1][1], iids])
+        if len(self._pages) > self.max_pages:
+            self._drop(self._pages.popleft())
+            self._at_start = False
+
+    def _prepend(self, rows):
+        if len(rows) < self.page_size:
+            self._at_start = True
+        if not rows:
+            return
+        anchor = self._first_visible()
+        iids = [self._insert(index, values) for index, (values, _) in enumerate(rows)]
+        self._cursors.update(zip(iids, (cursor for _, cursor in rows)))
+        self._pages.appendleft([rows[0][1], rows[-1][1], iids])
+        if len(self._pages) > self.max_pages:
+            self._drop(self._pages.pop())
+            self._at_end = False
+        self._restore_view(anchor)
+
+    def _insert(self, index, values):
+        return self.tree.insert("", index, iid=str(values[0]), values=values)
+
+    def _drop(self, page):
+        anchor = self._first_visible()
+        existing = [iid for iid in page[2] if self.tree.exists(iid)]
+        for iid in page[2]:
+            self._cursors.pop(iid, None)
+        if existing:
+            self.tree.delete(*existing)
+        self._restore_view(anchor)
+
+    def _first_visible(self):
+        return self.tree.identify_row(0) or None
+
+    # Mantém na tela a mesma linha depois de inserir/remover itens acima dela
+    def _restore_view(self, anchor):
+        if anchor and self.tree.exists(anchor):
+            total = len(self.tree.get_children())
+            self.tree.yview_moveto(self.tree.index(anchor) / max(total, 1))
+
+    # Busca uma página no executor; uma nova busca cancela a anterior
+    def _fetch(self, method, args, apply, on_loaded=None):
+        if self._job is not None:
+            self._job.cancel()
+
+        def loaded(rows):
+            self._job = None
+            apply(rows)
+            if on_loaded is not None:
+                on_loaded()
+
+        job = executor.submit(method, *args, self.page_size, on_success=loaded, owner=self.winfo_toplevel())
+        self._job = None if job.done else job
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._job is None and self.query is not None:
+            if float(last) > 0.9 and not self._at_end:
+                self._load_next()
+            elif float(first) < 0.1 and not self._at_start:
+                self._load_previous()
+
+    def _load_next(self):
+        if self._pages:
+            self._fetch(self.query.page_after, (self._pages[-1][1],), self._append)
+        else:
+            self._fetch(self.query.first_page, (), self._append)
+
+    def _load_previous(self):
+        if self._pages:
+            self._fetch(self.query.page_before, (self._pages[0][0],), self._prepend)
+
+
+# Janela de andamento de uma operação longa, com botão de cancelar.
+# status() é consultada a cada interval ms e devolve o texto a exibir.
+class ProgressDialog(Toplevel):
+    def __init__(self, master, title, status, on_cancel, interval=200):
+        super().__init__(master)
+        self.title(title)
+        self.geometry("400x160")
+        self.configure(background='#f0f0f0')
+        self.transient(master)
+        self.status = status
+        self.interval = interval
+
+        frame = ttk.Frame(self, padding=20)
+        frame.pack(expand=True, fill='both')
+
+        self.text = StringVar(self, value=status())
+        ttk.Label(frame, textvariable=self.text).pack(pady=5)
+
+        self.bar = ttk.Progressbar(frame, mode='indeterminate', length=300)
+        self.bar.pack(pady=5)
+        self.bar.start(10)
+
+        self.btn_cancel = ttk.Button(frame, text="Cancelar", command=self._cancel, width=20)
+        self.btn_cancel.pack(pady=5)
+        self.on_cancel = on_cancel
+        self.protocol("WM_DELETE_WINDOW", self._cancel)
+
+        self._after = self.after(self.interval, self._refresh)
+
+    def _refresh(self):
+        self.text.set(self.status())
+        self._after = self.after(self.interval, self._refresh)
+
+    def _cancel(self):
+        self.btn_cancel.configure(state='disabled')
+        self.text.set("Cancelando...")
+        self.on_cancel()
+
+    def close(self):
+        self.after_cancel(self._after)
+        self.destroy()
+
+
+# Campo de escolha com sugestões enquanto se digita. A cada tecla, depois de
+# delay ms sem digitar, fetch(texto) roda no executor e devolve no máximo uma
+# página de (id, rótulo); uma busca nova cancela a anterior. A lista de
+# sugestões flutua abaixo do campo. O id escolhido fica em selected_id
+# (None enquanto nada for escolhido) e on_select(id, rótulo) é chamado.
+class Typeahead(ttk.Frame):
+    def __init__(self, master, fetch, width=30, delay=250, on_select=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.fetch = fetch
+        self.delay = delay
+        self.on_select = on_select
+        self.selected_id = None
+        self._choices = []
+        self._after = None
+        self._job = None
+
+        self.text = StringVar(self)
+        self.entry = ttk.Entry(self, textvariable=self.text, width=width)
+        self.entry.pack(fill='x')
+        self.listbox = Listbox(self.winfo_toplevel(), height=8, activestyle='dotbox', exportselection=False)
+
+        self.entry.bind("<KeyRelease>", self._on_key)
+        self.entry.bind("<Down>", self._focus_list)
+        self.entry.bind("<Escape>", lambda event: self._hide())
+        self.entry.bind("<FocusOut>", lambda event: self.after(150, self._hide_unless_focused))
+        self.listbox.bind("<ButtonRelease-1>", self._choose)
+        self.listbox.bind("<Return>", self._choose)
+        self.listbox.bind("<Escape>", lambda event: (self._hide(), self.entry.focus_set()))
+
+    def get(self):
+        return self.selected_id
+
+    # Define a escolha sem buscar (ex.: preenchida a partir de outra tela)
+    def set(self, item_id, label):
+        self.selected_id = item_id
+        self.text.set(label)
+        self._hide()
+
+    def destroy(self):
+        self._cancel()
+        self.listbox.destroy()
+        super().destroy()
+
+    def _cancel(self):
+        if self._after is not None:
+            self.after_cancel(self._after)
+            self._after = None
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+
+    def _on_key(self, event):
+        if event.keysym in ("Down", "Up", "Return", "Escape", "Tab"):
+            return
+        self.selected_id = None
+        self._cancel()
+        self._after = self.after(self.delay, self._search)
+
+    def _search(self):
+        self._after = None
+        term = self.text.get()
+
+        def loaded(choices):
+            self._job = None
+            # Descarta resultados de um texto que já mudou
+            if term == self.text.get():
+                self._show(choices)
+
+        job = executor.submit(self.fetch, term, on_success=loaded, owner=self.winfo_toplevel())
+        self._job = None if job.done else job
+
+    def _show(self, choices):
+        self._choices = choices
+        self.listbox.delete(0, 'end')
+        if not choices:
+            self._hide()
+            return
+        for _, label in choices:
+            self.listbox.insert('end', label)
+        self.listbox.configure(height=min(len(choices), 8))
+        self.listbox.place(in_=self.entry, x=0, rely=1, relwidth=1, bordermode='outside')
+        self.listbox.lift()
+
+    def _hide(self):
+        self.listbox.place_forget()
+
+    def _hide_unless_focused(self):
+        if self.focus_get() is not self.listbox:
+            self._hide()
+
+    def _focus_list(self, event):
+        if self._choices and self.listbox.winfo_ismapped():
+            self.listbox.focus_set()
+            self.listbox.selection_clear(0, 'end')
+            self.listbox.selection_set(0)
+            self.listbox.activate(0)
+
+    def _choose(self, event):
+        selection = self.listbox.curselection()
+        if not selection:
+            return
+        item_id, label = self._choices[selection[0]]
+        self.set(item_id, label)
+        self.entry.focus_set()
+        self.entry.icursor('end')
+        if self.on_select is not None:
+            self.on_select(item_id, label)